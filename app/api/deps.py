@@ -3,19 +3,26 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import verify_api_key
 from app.core.exceptions import AuthenticationError
+from app.core.timing import phase
+from app.core.tracing import traced
 from app.db.session import get_db_session
+from app.domain.merchant import MerchantDomain
 from app.repositories.merchant_repository import MerchantRepository
-from app.db.models.merchant import Merchant
 
 
+@traced("auth.get_current_merchant")
 async def get_current_merchant(
     api_key: str = Depends(verify_api_key),
     db: AsyncSession = Depends(get_db_session),
-) -> Merchant:
+) -> MerchantDomain:
     """
     Resolves the authenticated merchant from API key.
+
+    Served from the in-process auth cache when possible; the session only
+    checks out a connection on a cache miss.
     """
-    merchant = await MerchantRepository.get_by_api_key(db, api_key)
+    with phase("auth"):
+        merchant = await MerchantRepository.get_snapshot_by_api_key(db, api_key)
 
     if not merchant or not merchant.is_active:
         raise AuthenticationError("Invalid or inactive API key")
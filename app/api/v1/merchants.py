@@ -2,15 +2,18 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_merchant
-from app.db.models.merchant import Merchant
 from app.db.session import get_db_session
+from app.domain.merchant import MerchantDomain
+from app.schemas.merchant import WebhookBatchingRequest
+from app.schemas.simulation import SimulationProfileSchema
+from app.services.merchant_service import MerchantService
 
 router = APIRouter()
 
 
 @router.get("/me")
 async def get_merchant_profile(
-    merchant: Merchant = Depends(get_current_merchant),
+    merchant: MerchantDomain = Depends(get_current_merchant),
 ):
     """
     Returns authenticated merchant profile.
@@ -20,6 +23,48 @@ async def get_merchant_profile(
         "name": merchant.name,
         "email": merchant.email,
         "webhook_url": merchant.webhook_url,
+        "webhook_batching": merchant.webhook_batching,
         "is_active": merchant.is_active,
         "created_at": merchant.created_at,
+        "simulation_profile": (
+            merchant.simulation_profile.to_dict()
+            if merchant.simulation_profile
+            else None
+        ),
     }
+
+
+@router.put("/me/simulation-profile")
+async def set_simulation_profile(
+    profile: SimulationProfileSchema | None = None,
+    merchant: MerchantDomain = Depends(get_current_merchant),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """
+    Sets the default simulation profile for the merchant's payments.
+    An empty body clears it.
+    """
+    updated = await MerchantService.set_simulation_profile(
+        db=db,
+        merchant_id=merchant.id,
+        profile=profile.model_dump(mode="json") if profile else None,
+    )
+    return {"simulation_profile": updated.simulation_profile}
+
+
+@router.put("/me/webhook-batching")
+async def set_webhook_batching(
+    body: WebhookBatchingRequest,
+    merchant: MerchantDomain = Depends(get_current_merchant),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """
+    Enables or disables batched webhook delivery: events for the endpoint
+    are POSTed together as a JSON array.
+    """
+    updated = await MerchantService.set_webhook_batching(
+        db=db,
+        merchant_id=merchant.id,
+        enabled=body.enabled,
+    )
+    return {"webhook_batching": updated.webhook_batching}
@@ -1,16 +1,82 @@
-from fastapi import APIRouter, Depends, Header
+from datetime import datetime
+from typing import Literal, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_merchant
-from app.core.rate_limiter import rate_limit_dependency
-from app.db.models.merchant import Merchant
-from app.db.session import get_db_session
-from app.schemas.payment import PaymentCreateRequest
+from app.core.rate_limiter import enforce_rate_limit, rate_limit_dependency
+from app.core.config import get_settings
+from app.db.session import get_db_session, session_scope
+from app.domain.enums import PaymentStatus
+from app.domain.merchant import MerchantDomain
+from app.schemas.payment import (
+    PaymentBatchCaptureRequest,
+    PaymentBatchCreateRequest,
+    PaymentCreateRequest,
+)
 from app.services.payment_service import PaymentService
+from app.utils.pagination import decode_cursor
+
+settings = get_settings()
 
 router = APIRouter()
 
 
+@router.get("")
+async def list_payments(
+    limit: int = Query(50, ge=1, le=settings.LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    status: Optional[PaymentStatus] = None,
+    currency: Optional[str] = Query(None, min_length=3, max_length=3),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    format: Literal["json", "ndjson"] = "json",
+    merchant: MerchantDomain = Depends(get_current_merchant),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """
+    Lists payments newest first.
+
+    `format=json` returns one keyset page; pass `next_cursor` back as
+    `cursor` for the next one. `format=ndjson` streams every matching
+    payment, one JSON object per line.
+    """
+    filters = {
+        "status": status.value if status else None,
+        "currency": currency,
+        "created_from": created_from,
+        "created_to": created_to,
+    }
+
+    if format == "json":
+        return await PaymentService.list_payments(
+            db=db,
+            merchant=merchant,
+            limit=limit,
+            cursor=cursor,
+            **filters,
+        )
+
+    # Decoded up front: once streaming starts the 200 is already sent
+    after = decode_cursor(cursor) if cursor else None
+
+    async def stream():
+        # Own session: the request-scoped one may end before the body is sent
+        async with session_scope() as stream_db:
+            async for chunk in PaymentService.stream_payments_ndjson(
+                db=stream_db,
+                merchant=merchant,
+                after=after,
+                **filters,
+            ):
+                yield chunk
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.post(
     "",
     dependencies=[Depends(rate_limit_dependency)],
@@ -18,26 +84,75 @@ router = APIRouter()
 async def create_payment(
     request: PaymentCreateRequest,
     idempotency_key: str = Header(..., alias="Idempotency-Key"),
-    merchant: Merchant = Depends(get_current_merchant),
+    merchant: MerchantDomain = Depends(get_current_merchant),
     db: AsyncSession = Depends(get_db_session),
 ):
     """
     Creates a new payment.
+
+    Idempotent replays return the original response body verbatim.
     """
-    payment = await PaymentService.create_payment(
+    body = await PaymentService.create_payment_response(
         db=db,
         merchant=merchant,
         request=request,
         idempotency_key=idempotency_key,
     )
 
-    return payment
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("/batch")
+async def create_payments_batch(
+    request: PaymentBatchCreateRequest,
+    http_request: Request,
+    merchant: MerchantDomain = Depends(get_current_merchant),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """
+    Creates up to BATCH_MAX_ITEMS payments in one request.
+
+    Every item has its own idempotency key; results are reported per item
+    in request order. Each item costs one rate limit token.
+    """
+    await enforce_rate_limit(http_request, cost=len(request.items))
+
+    body = await PaymentService.create_payments_batch(
+        db=db,
+        merchant=merchant,
+        items=request.items,
+    )
+
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("/batch/capture")
+async def capture_payments_batch(
+    request: PaymentBatchCaptureRequest,
+    http_request: Request,
+    merchant: MerchantDomain = Depends(get_current_merchant),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """
+    Captures many authorized payments at once.
+
+    Results are reported per payment id; ids that are unknown or not
+    AUTHORIZED fail without affecting the rest. Each id costs one rate
+    limit token.
+    """
+    await enforce_rate_limit(http_request, cost=len(request.payment_ids))
+
+    return await PaymentService.capture_payments_batch(
+        db=db,
+        merchant=merchant,
+        payment_ids=request.payment_ids,
+    )
 
 
 @router.get("/{payment_id}")
 async def get_payment(
-    payment_id: str,
-    merchant: Merchant = Depends(get_current_merchant),
+    payment_id: UUID,
+    merchant: MerchantDomain = Depends(get_current_merchant),
     db: AsyncSession = Depends(get_db_session),
 ):
     """
@@ -50,10 +165,26 @@ async def get_payment(
     )
 
 
+@router.post("/{payment_id}/authorize")
+async def authorize_payment(
+    payment_id: UUID,
+    merchant: MerchantDomain = Depends(get_current_merchant),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """
+    Authorizes a created payment.
+    """
+    return await PaymentService.authorize_payment(
+        db=db,
+        merchant=merchant,
+        payment_id=payment_id,
+    )
+
+
 @router.post("/{payment_id}/capture")
 async def capture_payment(
-    payment_id: str,
-    merchant: Merchant = Depends(get_current_merchant),
+    payment_id: UUID,
+    merchant: MerchantDomain = Depends(get_current_merchant),
     db: AsyncSession = Depends(get_db_session),
 ):
     """
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, Header
+from fastapi import APIRouter, Depends, Header, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_merchant
-from app.db.models.merchant import Merchant
+from app.core.rate_limiter import enforce_rate_limit
 from app.db.session import get_db_session
-from app.schemas.refund import RefundCreateRequest
+from app.domain.merchant import MerchantDomain
+from app.schemas.refund import RefundBatchCreateRequest, RefundCreateRequest
 from app.services.refund_service import RefundService
 
 router = APIRouter()
@@ -13,8 +14,10 @@ router = APIRouter()
 @router.post("")
 async def create_refund(
     request: RefundCreateRequest,
-    idempotency_key: str = Header(..., alias="Idempotency-Key"),
-    merchant: Merchant = Depends(get_current_merchant),
+    idempotency_key: str = Header(
+        ..., alias="Idempotency-Key", min_length=1, max_length=255
+    ),
+    merchant: MerchantDomain = Depends(get_current_merchant),
     db: AsyncSession = Depends(get_db_session),
 ):
     """
@@ -26,3 +29,25 @@ async def create_refund(
         request=request,
         idempotency_key=idempotency_key,
     )
+
+
+@router.post("/batch")
+async def create_refunds_batch(
+    request: RefundBatchCreateRequest,
+    http_request: Request,
+    merchant: MerchantDomain = Depends(get_current_merchant),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """
+    Refunds up to BATCH_MAX_ITEMS captured payments in one request.
+
+    Every item has its own idempotency key; results are reported per item
+    in request order. Each item costs one rate limit token.
+    """
+    await enforce_rate_limit(http_request, cost=len(request.items))
+
+    return await RefundService.create_refunds_batch(
+        db=db,
+        merchant=merchant,
+        items=request.items,
+    )
@@ -1,7 +1,15 @@
-from fastapi import APIRouter, Request, Header
+from datetime import datetime
+from typing import Literal, Optional
 
+from fastapi import APIRouter, Depends, Request, Header
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import get_current_merchant
 from app.core.security import verify_webhook_signature
 from app.core.config import get_settings
+from app.db.session import session_scope
+from app.domain.merchant import MerchantDomain
+from app.services.webhook_export_service import WebhookExportService
 
 router = APIRouter()
 settings = get_settings()
@@ -25,3 +33,38 @@ async def receive_webhook(
     )
 
     return {"status": "verified"}
+
+
+@router.get("/events/export")
+async def export_webhook_events(
+    format: Literal["csv", "ndjson"] = "ndjson",
+    event_type: Optional[str] = None,
+    delivered: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    merchant: MerchantDomain = Depends(get_current_merchant),
+):
+    """
+    Streams the merchant's webhook delivery history, oldest first.
+    """
+    async def stream():
+        async with session_scope() as db:
+            async for chunk in WebhookExportService.stream(
+                db=db,
+                merchant_id=merchant.id,
+                format=format,
+                event_type=event_type,
+                delivered=delivered,
+                created_from=created_from,
+                created_to=created_to,
+            ):
+                yield chunk
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="webhook_events.{format}"'
+        },
+    )
@@ -0,0 +1,79 @@
+"""
+Export a merchant's webhook delivery history.
+
+    python -m app.cli.webhook_export --merchant-id <uuid> [--format csv]
+        [--event-type payment.succeeded] [--delivered | --undelivered]
+        [--since 2024-01-01T00:00:00] [--until ...] [--output FILE]
+
+Writes to stdout unless --output is given. Rows are streamed from a
+server-side cursor, so memory use does not grow with history size.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from uuid import UUID
+
+from app.services.webhook_export_service import EXPORT_FORMATS, WebhookExportService
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli.webhook_export",
+        description="Stream webhook_events for one merchant as CSV or NDJSON.",
+    )
+    parser.add_argument("--merchant-id", type=UUID, required=True)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--event-type")
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--output", help="File path (default: stdout)")
+
+    delivered = parser.add_mutually_exclusive_group()
+    delivered.add_argument(
+        "--delivered", dest="delivered", action="store_const", const=True
+    )
+    delivered.add_argument(
+        "--undelivered", dest="delivered", action="store_const", const=False
+    )
+
+    return parser.parse_args(argv)
+
+
+async def export(args: argparse.Namespace) -> int:
+    from app.db.session import close_db, init_db, session_scope
+
+    await init_db()
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    try:
+        async with session_scope() as db:
+            async for chunk in WebhookExportService.stream(
+                db=db,
+                merchant_id=args.merchant_id,
+                format=args.format,
+                event_type=args.event_type,
+                delivered=args.delivered,
+                created_from=args.since,
+                created_to=args.until,
+            ):
+                out.write(chunk)
+                written += len(chunk)
+        out.flush()
+    finally:
+        if args.output:
+            out.close()
+        await close_db()
+
+    return written
+
+
+def main(argv=None) -> None:
+    args = _parse_args(argv)
+    written = asyncio.run(export(args))
+    print(f"exported {written} bytes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+from app.core.metrics import registry
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Gauge values for webhook_circuit_state
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+@dataclass
+class _Circuit:
+    state: str = CLOSED
+    failures: int = 0
+    opened_at: float = 0.0
+    probes: int = 0
+    probe_started_at: float = 0.0
+
+
+# -------------------------------------------------
+# Circuit Breaker
+# -------------------------------------------------
+class CircuitBreaker:
+    """
+    Per-host circuit breaker for webhook endpoints.
+
+    After `failure_threshold` consecutive failures (transport errors or
+    5xx) a host's circuit opens and requests to it are refused without
+    touching the network. Once `reset_seconds` have passed it half-opens
+    and lets up to `half_open_probes` requests through: a success closes
+    it, a failure opens it again for another `reset_seconds`.
+
+    Only hosts with recent failures are tracked; a success forgets the
+    host. State is per process and not shared between workers.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int,
+        reset_seconds: float,
+        half_open_probes: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._circuits: Dict[str, _Circuit] = {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        parsed = httpx.URL(url)
+        return f"{parsed.host}:{parsed.port or ''}"
+
+    def state(self, host: str) -> str:
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            return CLOSED
+        if circuit.state == OPEN and self._clock() - circuit.opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return circuit.state
+
+    def allow(self, host: str) -> bool:
+        """
+        True if a request to `host` may go out now. In half-open state
+        this takes one of the probe slots.
+        """
+        circuit = self._circuits.get(host)
+        if circuit is None or circuit.state == CLOSED:
+            return True
+
+        now = self._clock()
+        if circuit.state == OPEN:
+            if now - circuit.opened_at < self.reset_seconds:
+                return False
+            self._transition(host, circuit, HALF_OPEN)
+            circuit.probes = 0
+
+        # A probe that never reported back (cancelled) frees its slot
+        # after another reset period
+        if circuit.probes and now - circuit.probe_started_at >= self.reset_seconds:
+            circuit.probes = 0
+
+        if circuit.probes >= self.half_open_probes:
+            return False
+        circuit.probes += 1
+        circuit.probe_started_at = now
+        return True
+
+    def retry_in(self, host: str) -> float:
+        """
+        Seconds until a request to `host` is worth trying again.
+        """
+        circuit = self._circuits.get(host)
+        if circuit is None or circuit.state == CLOSED:
+            return 0.0
+        if circuit.state == HALF_OPEN:
+            # Waiting on the probes' verdict
+            return self.reset_seconds
+        return max(self.reset_seconds - (self._clock() - circuit.opened_at), 0.0)
+
+    def record_success(self, host: str) -> None:
+        circuit = self._circuits.pop(host, None)
+        if circuit is not None and circuit.state != CLOSED:
+            logger.info("webhook_circuit_closed", extra={"host": host})
+
+    def record_failure(self, host: str) -> None:
+        circuit = self._circuits.setdefault(host, _Circuit())
+        circuit.failures += 1
+
+        if circuit.state == HALF_OPEN or (
+            circuit.state == CLOSED and circuit.failures >= self.failure_threshold
+        ):
+            self._transition(host, circuit, OPEN)
+            circuit.opened_at = self._clock()
+            circuit.probes = 0
+
+    @staticmethod
+    def _transition(host: str, circuit: _Circuit, state: str) -> None:
+        circuit.state = state
+        logger.info(
+            f"webhook_circuit_{state}",
+            extra={"host": host, "failures": circuit.failures},
+        )
+
+    def states(self) -> Dict[str, str]:
+        """
+        Non-closed hosts and their state.
+        """
+        states = {host: self.state(host) for host in self._circuits}
+        return {host: state for host, state in states.items() if state != CLOSED}
+
+
+# -------------------------------------------------
+# Singleton Accessor
+# -------------------------------------------------
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """
+    Returns the process-wide webhook circuit breaker, or None when
+    WEBHOOK_CIRCUIT_BREAKER_ENABLED is off.
+    """
+    global _breaker
+
+    if _breaker is None and settings.WEBHOOK_CIRCUIT_BREAKER_ENABLED:
+        _breaker = CircuitBreaker(
+            failure_threshold=settings.WEBHOOK_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=settings.WEBHOOK_CIRCUIT_RESET_SECONDS,
+            half_open_probes=settings.WEBHOOK_CIRCUIT_HALF_OPEN_PROBES,
+        )
+
+    return _breaker
+
+
+def _circuit_metrics() -> Dict[tuple, float]:
+    if _breaker is None:
+        return {}
+    return {
+        (host,): _STATE_VALUES[state] for host, state in _breaker.states().items()
+    }
+
+
+registry.gauge(
+    "webhook_circuit_state",
+    "Webhook hosts with a tripped circuit (1 open, 2 half-open)",
+    ("host",),
+    callback=_circuit_metrics,
+)
@@ -22,6 +22,34 @@ class Settings(BaseSettings):
     )
     DEBUG: bool = False
 
+    # -------------------------------------------------
+    # Logging
+    # -------------------------------------------------
+    # Format and write records on a background thread
+    LOG_ASYNC: bool = True
+    # Records beyond this are dropped (counted in /metrics), never blocking
+    LOG_QUEUE_MAX_SIZE: int = 10_000
+    # Fraction of request_completed records kept (5xx always kept)
+    LOG_REQUEST_SAMPLE_RATE: float = Field(default=1.0, ge=0.0, le=1.0)
+
+    # -------------------------------------------------
+    # Tracing
+    # -------------------------------------------------
+    # Off: span helpers are no-ops and traced functions are left unwrapped
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = Field(
+        default="file",
+        description="file (OTLP/JSON lines) | otlp (OTLP/HTTP JSON collector)",
+    )
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+
+    # Per-phase Server-Timing response header (auth, db, serialization, webhook)
+    SERVER_TIMING_ENABLED: bool = True
+
+    # /metrics recounts the webhook backlog at most this often
+    METRICS_BACKLOG_REFRESH_SECONDS: float = 15.0
+
     # -------------------------------------------------
     # Server
     # -------------------------------------------------
@@ -37,6 +65,10 @@ class Settings(BaseSettings):
     WEBHOOK_SIGNATURE_HEADER: str = "X-Signature"
     WEBHOOK_TOLERANCE_SECONDS: int = 300
 
+    # In-process cache of api_key_hash -> merchant snapshot
+    MERCHANT_AUTH_CACHE_TTL_SECONDS: float = 30.0
+    MERCHANT_AUTH_CACHE_MAX_SIZE: int = 10_000
+
     # -------------------------------------------------
     # Database
     # -------------------------------------------------
@@ -58,6 +90,33 @@ class Settings(BaseSettings):
     # -------------------------------------------------
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_BACKEND: str = Field(
+        default="memory",
+        description="memory (per process) | redis (shared, requires REDIS_URL)",
+    )
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+
+    # -------------------------------------------------
+    # Batch APIs
+    # -------------------------------------------------
+    BATCH_MAX_ITEMS: int = 500
+
+    # -------------------------------------------------
+    # Listing & Export
+    # -------------------------------------------------
+    LIST_MAX_LIMIT: int = 200
+    # Rows fetched per server-side cursor round trip when streaming
+    STREAM_BATCH_SIZE: int = 1000
+
+    # -------------------------------------------------
+    # Idempotency
+    # -------------------------------------------------
+    # In-process cache of (merchant_id, key) -> serialized replay response
+    IDEMPOTENCY_REPLAY_CACHE_TTL_SECONDS: float = 3600.0
+    IDEMPOTENCY_REPLAY_CACHE_MAX_SIZE: int = 10_000
+    # Payment records younger than this still match the pre-canonical-JSON
+    # request hash; 0 disables the fallback
+    IDEMPOTENCY_LEGACY_HASH_MAX_AGE_DAYS: int = 30
 
     # -------------------------------------------------
     # CORS
@@ -70,6 +129,53 @@ class Settings(BaseSettings):
     WEBHOOK_MAX_RETRIES: int = 5
     WEBHOOK_RETRY_BACKOFF_SECONDS: int = 2
 
+    WEBHOOK_DELIVERY_MODE: str = Field(
+        default="outbox",
+        description=(
+            "inline | outbox. Outbox mode only records events in the request "
+            "transaction; the dispatcher worker delivers them. Inline mode "
+            "still needs the dispatcher for first attempts deferred by the "
+            "circuit breaker."
+        ),
+    )
+    WEBHOOK_DISPATCH_BATCH_SIZE: int = 100
+    WEBHOOK_DISPATCH_INTERVAL_SECONDS: float = 1.0
+    WEBHOOK_DISPATCH_CONCURRENCY: int = 50
+    WEBHOOK_DISPATCH_PER_MERCHANT_CONCURRENCY: int = 4
+    WEBHOOK_RETRY_BATCH_SIZE: int = 500
+    WEBHOOK_RETRY_INTERVAL_SECONDS: float = 10.0
+    WEBHOOK_RETRY_HORIZON_SECONDS: float = 300.0
+    WEBHOOK_CLAIM_LEASE_SECONDS: int = 120
+
+    # Batched delivery (merchants with webhook_batching enabled)
+    WEBHOOK_BATCH_MAX_EVENTS: int = 100
+    WEBHOOK_BATCH_MAX_BYTES: int = 256 * 1024
+    WEBHOOK_BATCH_LINGER_SECONDS: float = 1.0
+
+    # Shared HTTP client pool (one keep-alive client per merchant host)
+    WEBHOOK_HTTP_TIMEOUT_SECONDS: float = 5.0
+    WEBHOOK_HTTP_MAX_CONNECTIONS_PER_HOST: int = 10
+    WEBHOOK_HTTP_MAX_KEEPALIVE_PER_HOST: int = 5
+    WEBHOOK_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    WEBHOOK_HTTP_MAX_HOSTS: int = 1000
+    WEBHOOK_HTTP2_ENABLED: bool = True
+
+    # Per-host circuit breaker
+    WEBHOOK_CIRCUIT_BREAKER_ENABLED: bool = True
+    WEBHOOK_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    WEBHOOK_CIRCUIT_RESET_SECONDS: float = 30.0
+    WEBHOOK_CIRCUIT_HALF_OPEN_PROBES: int = 1
+
+    # -------------------------------------------------
+    # Scenario Simulation
+    # -------------------------------------------------
+    SIMULATION_ENABLED: bool = True
+    SIMULATION_MIN_LATENCY_SECONDS: float = 0.2
+    SIMULATION_MAX_LATENCY_SECONDS: float = 2.0
+    SIMULATION_TIMEOUT_SECONDS: float = 30.0
+    SIMULATION_BATCH_SIZE: int = 1000
+    SIMULATION_SWEEP_INTERVAL_SECONDS: float = 30.0
+
     # -------------------------------------------------
     # Pydantic Settings Config
     # -------------------------------------------------
@@ -0,0 +1,231 @@
+import importlib.util
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+from app.core.metrics import registry
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+# -------------------------------------------------
+# Pool Statistics
+# -------------------------------------------------
+@dataclass
+class HttpPoolStats:
+    """
+    Connection reuse counters.
+
+    A hit is a request served over an already-open keep-alive connection;
+    a miss is a request that had to open a new TCP (+TLS) connection.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    clients_created: int = 0
+    clients_evicted: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "clients_created": self.clients_created,
+            "clients_evicted": self.clients_evicted,
+        }
+
+
+# -------------------------------------------------
+# Per-Host Client Pool
+# -------------------------------------------------
+class HttpClientPool:
+    """
+    Process-wide pool of keep-alive `httpx.AsyncClient`s, one per origin.
+
+    Each origin (scheme + host + port) gets its own client so connection
+    limits apply per merchant host: one slow endpoint can exhaust its own
+    connections but never another merchant's. The least recently used
+    clients are evicted once `max_hosts` is exceeded; an evicted client
+    still serving requests is closed when its last request finishes.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout_seconds: float,
+        max_connections_per_host: int,
+        max_keepalive_per_host: int,
+        keepalive_expiry_seconds: float,
+        max_hosts: int,
+        http2: bool,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self._timeout = httpx.Timeout(timeout_seconds)
+        self._limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_per_host,
+            keepalive_expiry=keepalive_expiry_seconds,
+        )
+        self._max_hosts = max_hosts
+        self._http2 = http2 and _HTTP2_AVAILABLE
+        self._transport = transport
+        self._clients: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+        # client -> requests in flight; evicted clients close at zero
+        self._in_flight: Dict[httpx.AsyncClient, int] = {}
+        self._evicted: Set[httpx.AsyncClient] = set()
+        self.stats = HttpPoolStats()
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parsed = httpx.URL(url)
+        return f"{parsed.scheme}://{parsed.host}:{parsed.port or ''}"
+
+    async def _acquire(self, url: str) -> httpx.AsyncClient:
+        """
+        Returns the client for the URL's origin, counted as in use until
+        `_release`.
+        """
+        origin = self._origin(url)
+
+        client = self._clients.get(origin)
+        if client is not None:
+            self._clients.move_to_end(origin)
+            self._in_flight[client] = self._in_flight.get(client, 0) + 1
+            return client
+
+        client = httpx.AsyncClient(
+            timeout=self._timeout,
+            limits=self._limits,
+            http2=self._http2,
+            transport=self._transport,
+        )
+        self._clients[origin] = client
+        self._in_flight[client] = 1
+        self.stats.clients_created += 1
+
+        while len(self._clients) > self._max_hosts:
+            _, evicted = self._clients.popitem(last=False)
+            self.stats.clients_evicted += 1
+            if self._in_flight.get(evicted):
+                self._evicted.add(evicted)
+            else:
+                self._in_flight.pop(evicted, None)
+                await evicted.aclose()
+
+        return client
+
+    async def _release(self, client: httpx.AsyncClient) -> None:
+        remaining = self._in_flight[client] - 1
+        if remaining:
+            self._in_flight[client] = remaining
+            return
+
+        del self._in_flight[client]
+        if client in self._evicted:
+            self._evicted.discard(client)
+            await client.aclose()
+
+    async def post(
+        self,
+        url: str,
+        *,
+        content: str | bytes,
+        headers: Dict[str, str],
+    ) -> httpx.Response:
+        """
+        POSTs through the pooled client for the URL's origin.
+        """
+        client = await self._acquire(url)
+        opened_connection = False
+
+        async def _trace(event_name: str, info: dict) -> None:
+            nonlocal opened_connection
+            if event_name == "connection.connect_tcp.started":
+                opened_connection = True
+
+        try:
+            return await client.post(
+                url,
+                content=content,
+                headers=headers,
+                extensions={"trace": _trace},
+            )
+        finally:
+            if opened_connection:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+            await self._release(client)
+
+    async def close(self) -> None:
+        """
+        Closes every pooled client. Safe to call more than once.
+        """
+        clients = list(self._clients.values()) + list(self._evicted)
+        self._clients.clear()
+        self._evicted.clear()
+        self._in_flight.clear()
+        for client in clients:
+            await client.aclose()
+
+
+# -------------------------------------------------
+# Singleton Accessors
+# -------------------------------------------------
+_pool: Optional[HttpClientPool] = None
+
+
+def get_http_client_pool() -> HttpClientPool:
+    """
+    Returns the process-wide webhook HTTP pool, creating it on first use.
+
+    The API creates it in `lifespan`; workers get it lazily.
+    """
+    global _pool
+
+    if _pool is None:
+        _pool = HttpClientPool(
+            timeout_seconds=settings.WEBHOOK_HTTP_TIMEOUT_SECONDS,
+            max_connections_per_host=settings.WEBHOOK_HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_per_host=settings.WEBHOOK_HTTP_MAX_KEEPALIVE_PER_HOST,
+            keepalive_expiry_seconds=settings.WEBHOOK_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            max_hosts=settings.WEBHOOK_HTTP_MAX_HOSTS,
+            http2=settings.WEBHOOK_HTTP2_ENABLED,
+        )
+        logger.info(
+            "webhook_http_pool_created",
+            extra={"http2": _pool._http2},
+        )
+
+    return _pool
+
+
+async def close_http_client_pool() -> None:
+    """
+    Closes the process-wide pool. Called once at shutdown.
+    """
+    global _pool
+
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def _pool_metrics() -> Dict[tuple, float]:
+    if _pool is None:
+        return {}
+    return {(name,): value for name, value in _pool.stats.as_dict().items()}
+
+
+registry.gauge(
+    "webhook_http_pool",
+    "Webhook HTTP pool counters (hits, misses, clients_created, clients_evicted)",
+    ("stat",),
+    callback=_pool_metrics,
+)
@@ -1,48 +1,118 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Callable, Optional
 
 from app.core.config import get_settings
+from app.core.metrics import registry
 
 settings = get_settings()
 
+try:  # optional fast encoder: pip install .[fast-json]
+    import orjson
+
+    def _dumps(value: dict) -> str:
+        return orjson.dumps(value, default=str).decode("utf-8")
+
+except ImportError:  # pragma: no cover - depends on environment
+    _encoder = json.JSONEncoder(default=str, ensure_ascii=False, separators=(",", ":"))
+    _dumps = _encoder.encode
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys()
+) | {"message", "asctime", "taskName"}
+
+log_records_dropped = registry.counter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full",
+)
+
 
 # -------------------------------------------------
 # Log Formatters
 # -------------------------------------------------
 class JsonFormatter(logging.Formatter):
     """
-    Outputs logs in structured JSON format.
+    Outputs logs as one JSON object per line.
     Suitable for log aggregation systems (ELK, CloudWatch, Datadog).
+
+    Every `extra` field passed to the logger is included as a top-level key.
     """
 
     def format(self, record: logging.LogRecord) -> str:
         log_record = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
         }
 
-        # Optional structured fields
-        if hasattr(record, "request_id"):
-            log_record["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                log_record[key] = value
+
+        if record.exc_info:
+            log_record["exception"] = self.formatException(record.exc_info)
+
+        return _dumps(log_record)
 
-        if hasattr(record, "path"):
-            log_record["path"] = record.path
 
-        if hasattr(record, "method"):
-            log_record["method"] = record.method
+# -------------------------------------------------
+# Filters
+# -------------------------------------------------
+class RequestLogSampler(logging.Filter):
+    """
+    Keeps only a fraction of `request_completed` records.
 
-        if hasattr(record, "status_code"):
-            log_record["status_code"] = record.status_code
+    Server errors are always kept; every other record passes untouched.
+    """
 
-        if hasattr(record, "duration_ms"):
-            log_record["duration_ms"] = record.duration_ms
+    def __init__(self, rate: float, rand: Callable[[], float] = random.random):
+        super().__init__()
+        self.rate = rate
+        self._rand = rand
 
-        if record.exc_info:
-            log_record["exception"] = self.formatException(record.exc_info)
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.msg != "request_completed" or self.rate >= 1.0:
+            return True
+        if getattr(record, "status_code", 0) >= 500:
+            return True
+        return self._rand() < self.rate
+
+
+# -------------------------------------------------
+# Non-blocking Handler
+# -------------------------------------------------
+class _DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock `prepare` formats the record on the calling thread (the event
+    loop) and strips `extra`-bearing state; here only %-args are merged so
+    the record is safe to hand over. A full queue drops the record instead
+    of blocking the loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
 
-        return str(log_record)
+
+_listener: Optional[logging.handlers.QueueListener] = None
 
 
 # -------------------------------------------------
@@ -54,7 +124,13 @@ def setup_logging() -> None:
 
     - JSON logs in production
     - Human-readable logs in development
+    - With LOG_ASYNC, callers only enqueue records; a background thread
+      formats and writes them
     """
+    global _listener
+
+    shutdown_logging()
+
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.DEBUG if settings.DEBUG else logging.INFO)
 
@@ -72,9 +148,42 @@ def setup_logging() -> None:
             )
         )
 
+    if settings.LOG_ASYNC:
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_MAX_SIZE)
+        _listener = logging.handlers.QueueListener(
+            log_queue, handler, respect_handler_level=True
+        )
+        _listener.start()
+        handler = _DeferredFormatQueueHandler(log_queue)
+
+    # On the queue handler, sampled-out records are never enqueued
+    handler.addFilter(RequestLogSampler(settings.LOG_REQUEST_SAMPLE_RATE))
     root_logger.addHandler(handler)
 
 
+def shutdown_logging() -> None:
+    """
+    Flushes queued records and stops the listener thread. Later records
+    are written synchronously by the listener's handler.
+    """
+    global _listener
+
+    if _listener is None:
+        return
+
+    listener, _listener = _listener, None
+    listener.stop()
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        if isinstance(handler, _DeferredFormatQueueHandler):
+            root_logger.removeHandler(handler)
+            root_logger.addHandler(listener.handlers[0])
+
+
+atexit.register(shutdown_logging)
+
+
 # -------------------------------------------------
 # Logger Factory
 # -------------------------------------------------
@@ -1,70 +1,309 @@
+import hashlib
 import time
-from typing import Dict, Tuple
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
 
 from fastapi import Depends, Request
 
 from app.core.config import get_settings
 from app.core.exceptions import RateLimitExceededError
+from app.core.logging import get_logger
+from app.core.metrics import rate_limit_rejections
 
 settings = get_settings()
+logger = get_logger(__name__)
 
 
 # -------------------------------------------------
-# Fixed Window Rate Limiter (In-Memory)
+# Backend Interface
 # -------------------------------------------------
-class FixedWindowRateLimiter:
+class RateLimitBackend(ABC):
     """
-    Simple fixed-window rate limiter.
+    Pluggable rate limit storage.
 
-    Keyed by (api_key, window_start).
-    Suitable for local dev, simulators, and single-node services.
+    `hit` records a request costing `cost` units for `key` and returns
+    whether it is allowed. A cost above `max_requests` is clamped to the
+    full budget, so it drains the bucket rather than never fitting.
     """
 
     def __init__(self, max_requests: int, window_seconds: int):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
 
-        # key -> (count, window_start_timestamp)
-        self._store: Dict[str, Tuple[int, int]] = {}
+    @abstractmethod
+    async def hit(self, key: str, cost: int = 1) -> bool:
+        ...
+
+    def _clamp(self, cost: int) -> int:
+        return min(max(cost, 1), self.max_requests)
+
+    def _increment(self, cost: int) -> float:
+        # Seconds of budget `cost` units take; exactly one window at the cap
+        return self.window_seconds * self._clamp(cost) / self.max_requests
+
+    async def close(self) -> None:
+        return None
+
+
+# -------------------------------------------------
+# Token Bucket Rate Limiter (In-Memory, bounded)
+# -------------------------------------------------
+class _Bucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class TokenBucketRateLimiter(RateLimitBackend):
+    """
+    Per-process token bucket limiter with bounded memory.
+
+    One small `__slots__` bucket per key, refilled lazily on access. Keys
+    are kept in LRU order: buckets idle for a full window are dropped as new
+    keys arrive (they would be full again anyway), and the table never
+    exceeds `max_keys` entries no matter how many distinct clients appear.
+    Suitable for local dev, simulators, and single-node services.
+    """
+
+    # Stale entries reclaimed per insert; bounds the work done on one request
+    _SWEEP_PER_INSERT = 2
+
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: int,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(max_requests, window_seconds)
+        self.max_keys = max_keys
+        self._clock = clock
+        self._capacity = float(max_requests)
+        self._refill_per_second = max_requests / window_seconds
+
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
 
-    def _current_window(self) -> int:
-        return int(time.time()) // self.window_seconds
+    def __len__(self) -> int:
+        return len(self._buckets)
 
-    def allow_request(self, key: str) -> None:
-        """
-        Checks whether a request is allowed.
-        Raises RateLimitExceededError if limit is exceeded.
-        """
-        window = self._current_window()
-        store_key = f"{key}:{window}"
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        stale_before = now - self.window_seconds
 
-        if store_key not in self._store:
-            self._store[store_key] = (1, window)
-            return
+        for _ in range(self._SWEEP_PER_INSERT):
+            oldest = next(iter(buckets.values()), None)
+            if oldest is None or oldest.updated_at > stale_before:
+                break
+            buckets.popitem(last=False)
 
-        count, _ = self._store[store_key]
+        while len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
 
-        if count >= self.max_requests:
-            raise RateLimitExceededError(
-                f"Rate limit exceeded: {self.max_requests} requests per "
-                f"{self.window_seconds} seconds"
+    async def hit(self, key: str, cost: int = 1) -> bool:
+        cost = self._clamp(cost)
+        now = self._clock()
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            bucket = _Bucket(self._capacity, now)
+            self._buckets[key] = bucket
+            self._evict(now)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(
+                self._capacity,
+                bucket.tokens + (now - bucket.updated_at) * self._refill_per_second,
             )
+            bucket.updated_at = now
+
+        if bucket.tokens < cost:
+            return False
 
-        self._store[store_key] = (count + 1, window)
+        bucket.tokens -= cost
+        return True
+
+
+# -------------------------------------------------
+# GCRA (sliding window) — shared by Redis and its local fake
+# -------------------------------------------------
+# GCRA tracks a single "theoretical arrival time" (TAT) per key. Each request
+# pushes TAT forward by one emission interval (window / limit) per unit of
+# cost; a request is rejected if that would put TAT more than one full window
+# ahead of now. This is a smooth sliding window: no 2x burst at fixed window
+# boundaries, and one number of state per key.
+_GCRA_LUA = """
+local increment = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local new_tat = tat + increment
+if new_tat - now > window then
+    return 0
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return 1
+"""
+
+# Absorbs float rounding in summed increments, so a full budget always fits
+_GCRA_SLACK = 1 + 1e-9
+
+
+class RedisGCRARateLimiter(RateLimitBackend):
+    """
+    Distributed limiter: one atomic Lua script (EVALSHA) per check, using
+    the Redis server clock, so every worker process shares one budget.
+
+    Fails open if Redis is unreachable; availability of the payment API
+    matters more than strict limiting.
+    """
+
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: int,
+        redis_url: str,
+        key_prefix: str = "ratelimit:",
+    ):
+        super().__init__(max_requests, window_seconds)
+
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError(
+                "RATE_LIMIT_BACKEND=redis requires the 'redis' extra: "
+                "pip install .[redis]"
+            ) from exc
+
+        self._client = redis_asyncio.from_url(redis_url)
+        self._script = self._client.register_script(_GCRA_LUA)
+        self._prefix = key_prefix
+        self._window_ms = window_seconds * 1000 * _GCRA_SLACK
+
+    async def hit(self, key: str, cost: int = 1) -> bool:
+        try:
+            allowed = await self._script(
+                keys=[self._prefix + key],
+                args=[self._increment(cost) * 1000, self._window_ms],
+            )
+        except Exception as exc:
+            logger.warning("rate_limiter_backend_error", extra={"error": str(exc)})
+            return True
+
+        return bool(allowed)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class InMemoryGCRARateLimiter(RateLimitBackend):
+    """
+    Local stand-in for `RedisGCRARateLimiter` implementing the same
+    algorithm, with an injectable clock. Used in tests.
+    """
+
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(max_requests, window_seconds)
+        self._clock = clock
+
+        # key -> theoretical arrival time
+        self._tat: Dict[str, float] = {}
+
+    async def hit(self, key: str, cost: int = 1) -> bool:
+        now = self._clock()
+        tat = max(self._tat.get(key, now), now)
+        new_tat = tat + self._increment(cost)
+
+        if new_tat - now > self.window_seconds * _GCRA_SLACK:
+            return False
+
+        self._tat[key] = new_tat
+        return True
 
 
 # -------------------------------------------------
 # Singleton Limiter Instance
 # -------------------------------------------------
-_rate_limiter = FixedWindowRateLimiter(
-    max_requests=settings.RATE_LIMIT_REQUESTS,
-    window_seconds=settings.RATE_LIMIT_WINDOW_SECONDS,
-)
+def _create_rate_limiter() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        if settings.REDIS_URL is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires REDIS_URL")
+
+        return RedisGCRARateLimiter(
+            max_requests=settings.RATE_LIMIT_REQUESTS,
+            window_seconds=settings.RATE_LIMIT_WINDOW_SECONDS,
+            redis_url=str(settings.REDIS_URL),
+        )
+
+    return TokenBucketRateLimiter(
+        max_requests=settings.RATE_LIMIT_REQUESTS,
+        window_seconds=settings.RATE_LIMIT_WINDOW_SECONDS,
+        max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    )
+
+
+_rate_limiter: Optional[RateLimitBackend] = None
+
+
+def get_rate_limiter() -> RateLimitBackend:
+    global _rate_limiter
+
+    if _rate_limiter is None:
+        _rate_limiter = _create_rate_limiter()
+
+    return _rate_limiter
+
+
+async def close_rate_limiter() -> None:
+    global _rate_limiter
+
+    if _rate_limiter is not None:
+        await _rate_limiter.close()
+        _rate_limiter = None
 
 
 # -------------------------------------------------
 # FastAPI Dependency
 # -------------------------------------------------
+def client_identifier(request: Request) -> str:
+    """
+    Rate limit key for a request: a SHA-256 digest of the API key, so
+    secrets never end up as backend (e.g. Redis) key names, or the client
+    IP for unauthenticated requests.
+    """
+    api_key = request.headers.get(settings.API_KEY_HEADER)
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    return "ip:" + request.client.host
+
+
+async def enforce_rate_limit(request: Request, cost: int = 1) -> None:
+    """
+    Charges `cost` units of the caller's budget, raising once it is spent.
+
+    Batch endpoints call this with their item count, so a batch costs the
+    same as sending its items one by one.
+    """
+    limiter = get_rate_limiter()
+    if not await limiter.hit(client_identifier(request), cost):
+        rate_limit_rejections.inc()
+        raise RateLimitExceededError(
+            f"Rate limit exceeded: {limiter.max_requests} requests per "
+            f"{limiter.window_seconds} seconds"
+        )
+
+
 async def rate_limit_dependency(
     request: Request,
 ) -> None:
@@ -73,7 +312,4 @@ async def rate_limit_dependency(
 
     Uses API key if available, otherwise falls back to client IP.
     """
-    api_key = request.headers.get(settings.API_KEY_HEADER)
-    identifier = api_key or request.client.host
-
-    _rate_limiter.allow_request(identifier)
+    await enforce_rate_limit(request)
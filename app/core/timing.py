@@ -0,0 +1,113 @@
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Phases reported in Server-Timing, in header order
+PHASES = ("auth", "db", "serialization", "webhook")
+
+# phase -> accumulated seconds for the current request (None outside one)
+_phases: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "server_timing_phases", default=None
+)
+
+
+def start_request() -> Dict[str, float]:
+    """
+    Starts accumulating phase timings for the current request.
+
+    The dict is shared (not copied) with tasks spawned from this context,
+    so time recorded inside route handlers is visible to the middleware.
+    """
+    phases: Dict[str, float] = {}
+    _phases.set(phases)
+    return phases
+
+
+def record(phase: str, seconds: float) -> None:
+    phases = _phases.get()
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Adds the wall time of the block to `name` for the current request.
+    """
+    if _phases.get() is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorator form of `phase` for async functions.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with phase(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TimedJSONResponse(JSONResponse):
+    """
+    Default response class; counts body rendering as `serialization`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with phase("serialization"):
+            return super().render(content)
+
+
+def server_timing_header(phases: Dict[str, float], total_seconds: float) -> str:
+    """
+    Formats a Server-Timing header value, durations in milliseconds.
+    Phases may overlap (auth includes its own db time).
+    """
+    parts = [
+        f"{name};dur={phases[name] * 1000:.2f}" for name in PHASES if name in phases
+    ]
+    parts.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(parts)
+
+
+# -------------------------------------------------
+# DB Instrumentation
+# -------------------------------------------------
+# Statements on one connection never overlap, so a single slot suffices;
+# a failed statement's start is simply overwritten by the next one
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["server_timing_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("server_timing_started", None)
+    if started is not None:
+        record("db", time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Attributes statement execution time to the `db` phase. SQLAlchemy runs
+    these hooks in a greenlet that inherits the request's context.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
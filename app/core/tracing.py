@@ -0,0 +1,337 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# OTLP status codes
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+# -------------------------------------------------
+# Spans
+# -------------------------------------------------
+class Span:
+    """
+    One timed operation. Children share the root's `_finished` list, which
+    is exported as a whole when the root span ends.
+    """
+
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "status",
+        "_finished",
+        "_token",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], trace_id: Optional[str], attributes: dict):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.attributes = attributes
+        self.status = _STATUS_OK
+        self.end_ns = 0
+
+        if parent is not None:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self._finished = parent._finished
+        else:
+            self.trace_id = trace_id or os.urandom(16).hex()
+            self.parent_id = None
+            self._finished = []
+
+        self.start_ns = time.time_ns()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def rename(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+
+        if exc_type is not None:
+            self.status = _STATUS_ERROR
+            self.attributes["exception.type"] = exc_type.__name__
+
+        self._finished.append(self)
+        if self.parent_id is None and _exporter is not None:
+            _exporter.submit(self._finished)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Shared stand-in returned when tracing is disabled."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def rename(self, name: str) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def trace_id_from_request_id(request_id: str) -> str:
+    """
+    Maps an X-Request-ID to a 128-bit trace id: UUIDs are used as-is, other
+    values are hashed, so the same request id always yields the same trace.
+    """
+    try:
+        return uuid.UUID(request_id).hex
+    except ValueError:
+        return hashlib.sha256(request_id.encode("utf-8")).hexdigest()[:32]
+
+
+# -------------------------------------------------
+# Public API
+# -------------------------------------------------
+def is_enabled() -> bool:
+    return _exporter is not None
+
+
+def span(name: str, trace_id: Optional[str] = None, **attributes):
+    """
+    Context manager timing a block as a child of the current span (or as a
+    new root). Returns a shared no-op object while tracing is disabled.
+    """
+    if _exporter is None:
+        return _NOOP_SPAN
+    return Span(name, _current_span.get(), trace_id, attributes)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator wrapping an async function in a span.
+
+    When TRACING_ENABLED is off at import time the function is returned
+    unchanged, so disabled tracing costs nothing on these paths.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        if not settings.TRACING_ENABLED:
+            return fn
+
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(span_name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_class(cls):
+    """
+    Class decorator tracing every public async classmethod as
+    "<Class>.<method>".
+    """
+    if not settings.TRACING_ENABLED:
+        return cls
+
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_") or not isinstance(value, classmethod):
+            continue
+        if inspect.iscoroutinefunction(value.__func__):
+            wrapped = traced(f"{cls.__name__}.{attr}")(value.__func__)
+            setattr(cls, attr, classmethod(wrapped))
+    return cls
+
+
+# -------------------------------------------------
+# Exporters
+# -------------------------------------------------
+class SpanExporter(ABC):
+    """
+    Ships finished traces from a background thread, in OTLP/JSON.
+
+    `submit` only enqueues; serialization and I/O never run on the event
+    loop. Traces are dropped (not queued without bound) if the exporter
+    falls behind.
+    """
+
+    def __init__(self, max_queue: int = 10_000):
+        self._queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, spans: List[Span]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            pass
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 100:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            traces = [spans for spans in batch if spans is not None]
+            if traces:
+                try:
+                    self.export(self._payload(traces))
+                except Exception as exc:
+                    logger.warning("span_export_failed", extra={"error": str(exc)})
+            if stop:
+                return
+
+    @staticmethod
+    def _payload(traces: List[List[Span]]) -> Dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            _otlp_attribute("service.name", settings.APP_NAME),
+                            _otlp_attribute("deployment.environment", settings.APP_ENV),
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "app.core.tracing"},
+                            "spans": [s.to_otlp() for spans in traces for s in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    @abstractmethod
+    def export(self, payload: Dict) -> None:
+        ...
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends one OTLP/JSON document per line (collector `file` format)."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+        super().__init__()
+
+    def export(self, payload: Dict) -> None:
+        self._file.write(json.dumps(payload, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def shutdown(self) -> None:
+        super().shutdown()
+        self._file.close()
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """POSTs OTLP/JSON to a collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint: str):
+        import httpx
+
+        self._endpoint = endpoint
+        self._client = httpx.Client(timeout=5.0)
+        super().__init__()
+
+    def export(self, payload: Dict) -> None:
+        self._client.post(self._endpoint, json=payload).raise_for_status()
+
+    def shutdown(self) -> None:
+        super().shutdown()
+        self._client.close()
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def setup_tracing() -> None:
+    """
+    Starts the configured exporter. Called once at startup; a no-op when
+    TRACING_ENABLED is off.
+    """
+    global _exporter
+
+    if not settings.TRACING_ENABLED or _exporter is not None:
+        return
+
+    if settings.TRACING_EXPORTER == "otlp":
+        _exporter = OtlpHttpSpanExporter(settings.TRACING_OTLP_ENDPOINT)
+    else:
+        _exporter = FileSpanExporter(settings.TRACING_FILE_PATH)
+
+    logger.info("tracing_enabled", extra={"exporter": settings.TRACING_EXPORTER})
+
+
+def shutdown_tracing() -> None:
+    global _exporter
+
+    if _exporter is not None:
+        exporter, _exporter = _exporter, None
+        exporter.shutdown()
@@ -0,0 +1,15 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def dialect_insert(db: AsyncSession, model):
+    """
+    Returns a dialect-specific INSERT construct for `model`.
+
+    Both PostgreSQL and SQLite variants support
+    `on_conflict_do_nothing(...)` and `RETURNING`, which the repositories
+    use for single-statement insert-or-skip writes.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
@@ -7,6 +7,7 @@ from sqlalchemy import (
     DateTime,
     Boolean,
     Index,
+    JSON,
 )
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -71,6 +72,22 @@ class Merchant(Base):
         comment="Webhook endpoint configured by merchant",
     )
 
+    webhook_batching = Column(
+        Boolean,
+        nullable=False,
+        default=False,
+        comment="Deliver webhooks in batches (JSON array per request)",
+    )
+
+    # -------------------------------------------------
+    # Simulation
+    # -------------------------------------------------
+    simulation_profile = Column(
+        JSON,
+        nullable=True,
+        comment="Default simulated acquirer behaviour (SimulationProfile)",
+    )
+
     # -------------------------------------------------
     # Status Flags
     # -------------------------------------------------
@@ -110,6 +110,12 @@ class Payment(Base):
         comment="Simulation scenario (success, timeout, fraud, etc.)",
     )
 
+    simulation_due_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="When the simulation engine advances the payment",
+    )
+
     # -------------------------------------------------
     # Audit Fields
     # -------------------------------------------------
@@ -139,8 +145,25 @@ Index(
     unique=True,
 )
 
+# Keyset listing: filters on status walk this index in (created_at, id) order
 Index(
     "idx_payments_merchant_status",
     Payment.merchant_id,
     Payment.status,
+    Payment.created_at,
+    Payment.id,
+)
+
+Index(
+    "idx_payments_merchant_created_at",
+    Payment.merchant_id,
+    Payment.created_at,
+    Payment.id,
+)
+
+# Simulation engine: recovery / sweep of payments still awaiting an outcome
+Index(
+    "idx_payments_status_simulation_due_at",
+    Payment.status,
+    Payment.simulation_due_at,
 )
@@ -105,6 +105,27 @@ class WebhookEvent(Base):
         nullable=True,
     )
 
+    next_attempt_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="When the next delivery attempt is due (NULL = none scheduled)",
+    )
+
+    # -------------------------------------------------
+    # Worker Lease
+    # -------------------------------------------------
+    claimed_by = Column(
+        String(128),
+        nullable=True,
+        comment="Worker currently holding the delivery lease",
+    )
+
+    lease_expires_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="Lease expiry; other workers may reclaim the event after it",
+    )
+
 
 # -------------------------------------------------
 # Indexes
@@ -114,3 +135,17 @@ Index(
     WebhookEvent.delivered,
     WebhookEvent.attempt_count,
 )
+
+Index(
+    "idx_webhook_events_due",
+    WebhookEvent.delivered,
+    WebhookEvent.next_attempt_at,
+)
+
+# Per-merchant history export, in (created_at, id) order
+Index(
+    "idx_webhook_events_merchant_created_at",
+    WebhookEvent.merchant_id,
+    WebhookEvent.created_at,
+    WebhookEvent.id,
+)
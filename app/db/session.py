@@ -1,4 +1,5 @@
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator
 
 
 from sqlalchemy.ext.asyncio import (
@@ -11,6 +12,8 @@ from sqlalchemy.pool import NullPool
 
 from app.core.config import get_settings
 from app.core.logging import get_logger
+from app.core.metrics import registry
+from app.core.timing import instrument_engine
 
 settings = get_settings()
 logger = get_logger(__name__)
@@ -56,6 +59,7 @@ async def init_db() -> None:
     logger.info("Initializing database engine")
 
     _engine = _create_engine()
+    instrument_engine(_engine.sync_engine)
     _session_factory = async_sessionmaker(
         bind=_engine,
         expire_on_commit=False,
@@ -84,6 +88,31 @@ async def close_db() -> None:
         _engine = None
 
 
+def pool_status() -> dict:
+    """
+    Connection pool utilization of the engine (empty before init or for
+    pools without sizing, e.g. NullPool).
+    """
+    if _engine is None:
+        return {}
+
+    pool = _engine.pool
+    status = {}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            status[name] = method()
+    return status
+
+
+registry.gauge(
+    "db_pool_connections",
+    "Database pool size and connections checked in / out / in overflow",
+    ("state",),
+    callback=lambda: {(name,): value for name, value in pool_status().items()},
+)
+
+
 # -------------------------------------------------
 # Session Dependency
 # -------------------------------------------------
@@ -107,3 +136,13 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """
+    Same transactional semantics as `get_db_session`, for code that
+    outlives the request dependency (streaming responses, workers, CLIs).
+    """
+    async for session in get_db_session():
+        yield session
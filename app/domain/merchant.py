@@ -1,14 +1,43 @@
 from dataclasses import dataclass
+from datetime import datetime
 from uuid import UUID
 
+from app.domain.simulation import SimulationProfile
+
 
 @dataclass(frozen=True)
 class MerchantDomain:
     """
     Domain representation of a merchant.
+
+    Immutable, so one instance can be shared across requests (see the
+    authentication cache in MerchantRepository).
     """
     id: UUID
     is_active: bool
+    name: str | None = None
+    email: str | None = None
+    webhook_url: str | None = None
+    webhook_secret: str | None = None
+    created_at: datetime | None = None
+    simulation_profile: SimulationProfile | None = None
+    webhook_batching: bool = False
+
+    @classmethod
+    def from_model(cls, merchant) -> "MerchantDomain":
+        return cls(
+            id=merchant.id,
+            is_active=merchant.is_active,
+            name=merchant.name,
+            email=merchant.email,
+            webhook_url=merchant.webhook_url,
+            webhook_secret=merchant.webhook_secret,
+            created_at=merchant.created_at,
+            simulation_profile=SimulationProfile.from_dict(
+                merchant.simulation_profile
+            ),
+            webhook_batching=bool(merchant.webhook_batching),
+        )
 
     def assert_active(self) -> None:
         if not self.is_active:
@@ -4,13 +4,14 @@ from uuid import UUID
 from datetime import datetime
 
 from app.domain.enums import PaymentStatus, SimulationScenario
+from app.domain.state_machine import AUTHORIZE, CAPTURE, FAIL, REFUND
 
 
 @dataclass
 class PaymentDomain:
     """
     Pure payment domain object.
-    Encapsulates payment state transitions.
+    Encapsulates payment state transitions (see app.domain.state_machine).
     """
 
     id: UUID
@@ -26,21 +27,13 @@ class PaymentDomain:
     # State Transitions
     # -----------------------------------------
     def authorize(self) -> None:
-        if self.status != PaymentStatus.CREATED:
-            raise ValueError("Only CREATED payments can be authorized")
-        self.status = PaymentStatus.AUTHORIZED
+        self.status = AUTHORIZE.apply(self.status)
 
     def capture(self) -> None:
-        if self.status != PaymentStatus.AUTHORIZED:
-            raise ValueError("Only AUTHORIZED payments can be captured")
-        self.status = PaymentStatus.CAPTURED
+        self.status = CAPTURE.apply(self.status)
 
     def fail(self, reason: str | None = None) -> None:
-        if self.status in {PaymentStatus.CAPTURED, PaymentStatus.REFUNDED}:
-            raise ValueError("Captured or refunded payments cannot be failed")
-        self.status = PaymentStatus.FAILED
+        self.status = FAIL.apply(self.status)
 
     def refund(self) -> None:
-        if self.status != PaymentStatus.CAPTURED:
-            raise ValueError("Only CAPTURED payments can be refunded")
-        self.status = PaymentStatus.REFUNDED
+        self.status = REFUND.apply(self.status)
@@ -0,0 +1,92 @@
+import math
+import random
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from app.domain.enums import SimulationScenario
+
+# Standard normal quantile at 0.99: p99 = p50 * exp(sigma * Z_99)
+Z_99 = 2.3263478740408408
+
+
+@dataclass(frozen=True)
+class SimulationProfile:
+    """
+    How a simulated acquirer behaves: lognormal response latency fitted to
+    p50/p99 targets, a failure rate per scenario, and a timeout.
+
+    With `seed` set, every draw for a payment derives from (seed, key), so
+    a replayed load test gets the same outcomes and latencies regardless
+    of request interleaving.
+    """
+
+    latency_p50_ms: float
+    latency_p99_ms: float
+    timeout_ms: float
+    # ((scenario, probability), ...) for failure scenarios; the remainder
+    # succeeds
+    failure_rates: Tuple[Tuple[str, float], ...] = ()
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> Optional["SimulationProfile"]:
+        if not data:
+            return None
+        return cls(
+            latency_p50_ms=data["latency_p50_ms"],
+            latency_p99_ms=data["latency_p99_ms"],
+            timeout_ms=data["timeout_ms"],
+            failure_rates=tuple(sorted((data.get("failure_rates") or {}).items())),
+            seed=data.get("seed"),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "latency_p50_ms": self.latency_p50_ms,
+            "latency_p99_ms": self.latency_p99_ms,
+            "timeout_ms": self.timeout_ms,
+            "failure_rates": dict(self.failure_rates),
+            "seed": self.seed,
+        }
+
+    def rng(self, key: str) -> random.Random:
+        if self.seed is None:
+            return random.Random()
+        # String seeds are hashed with SHA-512: stable across processes
+        return random.Random(f"{self.seed}:{key}")
+
+    def sample_latency_seconds(self, rng: random.Random) -> float:
+        mu = math.log(self.latency_p50_ms)
+        sigma = (math.log(self.latency_p99_ms) - mu) / Z_99
+        return rng.lognormvariate(mu, sigma) / 1000
+
+    def draw_scenario(self, rng: random.Random) -> str:
+        roll = rng.random()
+        for scenario, rate in self.failure_rates:
+            if roll < rate:
+                return scenario
+            roll -= rate
+        return SimulationScenario.SUCCESS.value
+
+    def plan(self, key: str, scenario: Optional[str] = None) -> Tuple[str, float]:
+        """
+        Returns (scenario, delay in seconds) for one payment.
+
+        An explicit `scenario` is kept; otherwise one is drawn from the
+        failure rates, and a drawn response slower than the timeout
+        becomes a network_timeout. Timeouts resolve after `timeout_ms`.
+        """
+        rng = self.rng(key)
+        drawn = scenario is None
+        if drawn:
+            scenario = self.draw_scenario(rng)
+        latency = self.sample_latency_seconds(rng)
+        timeout = self.timeout_ms / 1000
+
+        if scenario == SimulationScenario.NETWORK_TIMEOUT.value:
+            return scenario, timeout
+        if latency > timeout:
+            if drawn:
+                return SimulationScenario.NETWORK_TIMEOUT.value, timeout
+            return scenario, timeout
+        return scenario, latency
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Tuple
+
+from app.domain.enums import PaymentStatus
+
+
+class InvalidTransitionError(ValueError):
+    """Raised when a transition is applied to a status it does not allow."""
+
+
+@dataclass(frozen=True)
+class Transition:
+    """
+    One named payment transition: any of `sources` -> `target`.
+
+    Domain objects apply it in memory; PaymentRepository compiles it to a
+    conditional `UPDATE ... WHERE status IN (sources)`.
+    """
+
+    name: str
+    sources: FrozenSet[PaymentStatus]
+    target: PaymentStatus
+    error: str
+
+    @property
+    def source_values(self) -> Tuple[str, ...]:
+        """Source statuses as stored in the database, in enum order."""
+        return tuple(status.value for status in PaymentStatus if status in self.sources)
+
+    def allows(self, status) -> bool:
+        return PaymentStatus(status) in self.sources
+
+    def apply(self, status) -> PaymentStatus:
+        """
+        Returns the target status, or raises InvalidTransitionError.
+        """
+        if not self.allows(status):
+            raise InvalidTransitionError(self.error)
+        return self.target
+
+
+# -------------------------------------------------
+# Transition Table
+# -------------------------------------------------
+AUTHORIZE = Transition(
+    name="authorize",
+    sources=frozenset({PaymentStatus.CREATED}),
+    target=PaymentStatus.AUTHORIZED,
+    error="Only created payments can be authorized",
+)
+
+CAPTURE = Transition(
+    name="capture",
+    sources=frozenset({PaymentStatus.AUTHORIZED}),
+    target=PaymentStatus.CAPTURED,
+    error="Only authorized payments can be captured",
+)
+
+FAIL = Transition(
+    name="fail",
+    sources=frozenset({PaymentStatus.CREATED, PaymentStatus.AUTHORIZED}),
+    target=PaymentStatus.FAILED,
+    error="Only created or authorized payments can be failed",
+)
+
+REFUND = Transition(
+    name="refund",
+    sources=frozenset({PaymentStatus.CAPTURED}),
+    target=PaymentStatus.REFUNDED,
+    error="Only captured payments can be refunded",
+)
+
+TRANSITIONS: Dict[str, Transition] = {
+    t.name: t for t in (AUTHORIZE, CAPTURE, FAIL, REFUND)
+}
+
+INITIAL_STATUS = PaymentStatus.CREATED
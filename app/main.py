@@ -1,15 +1,29 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from typing import Dict
 import time
 import uuid
 
 from app.core.config import get_settings
-from app.core.logging import setup_logging, get_logger
+from app.core.logging import setup_logging, shutdown_logging, get_logger
 from app.core.exceptions import AppException
 from app.api.v1 import payments, refunds, webhooks, merchants
-from app.db.session import init_db, close_db
+from app.core import metrics, timing, tracing
+from app.db.session import init_db, close_db, session_scope
+from app.repositories.webhook_event_repository import WebhookEventRepository
+from app.core.http_client import get_http_client_pool, close_http_client_pool
+from app.core.rate_limiter import get_rate_limiter, close_rate_limiter
+from app.workers.simulation_engine import (
+    start_simulation_engine,
+    stop_simulation_engine,
+)
+
+try:
+    from fastapi.routing import iter_route_contexts
+except ImportError:  # older FastAPI: included routes carry the full path
+    iter_route_contexts = None
 
 settings = get_settings()
 logger = get_logger(__name__)
@@ -24,14 +38,23 @@ async def lifespan(app: FastAPI):
     Handles application startup and shutdown events.
     """
     setup_logging()
+    tracing.setup_tracing()
     logger.info("Starting Payment Gateway Simulator")
 
     await init_db()
+    get_http_client_pool()
+    get_rate_limiter()
+    start_simulation_engine()
 
     yield
 
     logger.info("Shutting down Payment Gateway Simulator")
+    await stop_simulation_engine()
+    await close_rate_limiter()
+    await close_http_client_pool()
     await close_db()
+    tracing.shutdown_tracing()
+    shutdown_logging()
 
 
 # ---------------------------------------------------------
@@ -45,6 +68,7 @@ app = FastAPI(
     ),
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=timing.TimedJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
@@ -65,20 +89,71 @@ app.add_middleware(
 )
 
 
+# id(route) -> full path template, including router prefixes
+_route_templates: Dict[int, str] = {}
+
+
+def _route_label(request: Request) -> str:
+    """
+    The matched route's path template (/api/v1/payments/{payment_id}), so
+    metric label cardinality stays bounded.
+
+    `scope["route"]` is the route as declared on its router; with routers
+    included by reference its `path` lacks the prefix, so the full
+    template is looked up among the app's route contexts.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+
+    if not _route_templates and iter_route_contexts is not None:
+        for context in iter_route_contexts(app.routes):
+            _route_templates.setdefault(id(context.original_route), context.path_format)
+    return _route_templates.get(id(route)) or getattr(route, "path", "unmatched")
+
+
 @app.middleware("http")
 async def request_context_middleware(request: Request, call_next):
     """
     Adds request ID and measures latency.
     """
     request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
-    start_time = time.time()
-
-    response = await call_next(request)
-
-    duration_ms = int((time.time() - start_time) * 1000)
+    phases = timing.start_request()
+    start_time = time.perf_counter()
+
+    # Root span; the trace id is derived from X-Request-ID so logs and
+    # traces of one request can be joined
+    with tracing.span(
+        "http.request",
+        trace_id=tracing.trace_id_from_request_id(request_id)
+        if tracing.is_enabled()
+        else None,
+    ) as root_span:
+        response = await call_next(request)
+
+        route = _route_label(request)
+        root_span.rename(f"{request.method} {route}")
+        root_span.set_attribute("http.method", request.method)
+        root_span.set_attribute("http.route", route)
+        root_span.set_attribute("http.status_code", response.status_code)
+        root_span.set_attribute("request_id", request_id)
+
+    elapsed = time.perf_counter() - start_time
+    duration_ms = int(elapsed * 1000)
+
+    metrics.http_request_duration.observe(
+        elapsed,
+        request.method,
+        route,
+        str(response.status_code),
+    )
 
     response.headers["X-Request-ID"] = request_id
     response.headers["X-Response-Time-ms"] = str(duration_ms)
+    if settings.SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = timing.server_timing_header(
+            phases, elapsed
+        )
 
     logger.info(
         "request_completed",
@@ -107,7 +182,7 @@ async def app_exception_handler(request: Request, exc: AppException):
         extra={
             "path": request.url.path,
             "error_code": exc.error_code,
-            "message": exc.message,
+            "error_message": exc.message,
         },
     )
 
@@ -171,6 +246,44 @@ app.include_router(
 # ---------------------------------------------------------
 # Health Check
 # ---------------------------------------------------------
+# Monotonic time of the next backlog recount
+_backlog_refresh_at = 0.0
+
+
+async def _refresh_backlog() -> None:
+    """
+    Recounts the webhook backlog at most every METRICS_BACKLOG_REFRESH_SECONDS,
+    so frequent or unauthenticated scrapes cannot turn into a stream of
+    aggregate queries.
+    """
+    global _backlog_refresh_at
+
+    if time.monotonic() < _backlog_refresh_at:
+        return
+    # Set before querying so concurrent scrapes don't all recount
+    _backlog_refresh_at = time.monotonic() + settings.METRICS_BACKLOG_REFRESH_SECONDS
+
+    async with session_scope() as db:
+        backlog = await WebhookEventRepository.count_backlog(
+            db, max_attempts=settings.WEBHOOK_MAX_RETRIES
+        )
+    for state, count in backlog.items():
+        metrics.webhook_retry_backlog.set(count, state)
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics_endpoint():
+    """
+    Prometheus text exposition of in-process metrics.
+    """
+    await _refresh_backlog()
+
+    return Response(
+        content=metrics.registry.render(),
+        media_type=metrics.CONTENT_TYPE,
+    )
+
+
 @app.get("/health", tags=["Health"])
 async def health_check():
     """
@@ -1,11 +1,13 @@
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.tracing import traced_class
 from app.db.models.idempotency import IdempotencyKey
 
 
+@traced_class
 class IdempotencyRepository:
     """
     Repository for idempotency key tracking and replay protection.
@@ -25,6 +27,44 @@ class IdempotencyRepository:
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    @classmethod
+    async def get_many(
+        cls,
+        db: AsyncSession,
+        merchant_id,
+        keys: Iterable[str],
+    ) -> Dict[str, IdempotencyKey]:
+        """
+        Bulk lookup for batch requests, keyed by idempotency key.
+        """
+        stmt = select(IdempotencyKey).where(
+            IdempotencyKey.merchant_id == merchant_id,
+            IdempotencyKey.key.in_(list(keys)),
+        )
+        result = await db.execute(stmt)
+        return {record.key: record for record in result.scalars()}
+
+    @classmethod
+    def add(
+        cls,
+        db: AsyncSession,
+        record: IdempotencyKey,
+    ) -> IdempotencyKey:
+        """
+        Stages a record without flushing; it is written together with the
+        rest of the unit of work at commit.
+        """
+        db.add(record)
+        return record
+
+    @classmethod
+    def add_all(
+        cls,
+        db: AsyncSession,
+        records: Iterable[IdempotencyKey],
+    ) -> None:
+        db.add_all(records)
+
     @classmethod
     async def create(
         cls,
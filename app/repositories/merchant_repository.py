@@ -1,10 +1,32 @@
 import hashlib
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from app.core.config import get_settings
+from app.core.metrics import registry
 from app.db.models.merchant import Merchant
+from app.domain.merchant import MerchantDomain
+from app.utils.cache import TTLCache
+
+settings = get_settings()
+
+# api_key_hash -> MerchantDomain snapshot
+_auth_cache: TTLCache[MerchantDomain] = TTLCache(
+    max_size=settings.MERCHANT_AUTH_CACHE_MAX_SIZE,
+    ttl_seconds=settings.MERCHANT_AUTH_CACHE_TTL_SECONDS,
+)
+
+_SESSION_INVALIDATIONS_KEY = "merchant_auth_invalidations"
+
+registry.gauge(
+    "merchant_auth_cache",
+    "Merchant authentication cache counters (size, hits, misses, evictions)",
+    ("stat",),
+    callback=lambda: {(name,): value for name, value in _auth_cache.stats().items()},
+)
 
 
 class MerchantRepository:
@@ -20,21 +42,51 @@ class MerchantRepository:
         return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
 
     @classmethod
-    async def get_by_api_key(
+    async def get_snapshot_by_api_key(
         cls,
         db: AsyncSession,
         api_key: str,
-    ) -> Optional[Merchant]:
+    ) -> Optional[MerchantDomain]:
         """
-        Retrieves merchant by hashed API key.
+        Retrieves a merchant snapshot by hashed API key, cached for the
+        authentication hot path.
+
+        Only known keys are cached, so random keys cannot flood the cache.
+        Other processes see deactivations/rotations within the TTL.
         """
         api_key_hash = cls._hash_api_key(api_key)
 
+        snapshot = _auth_cache.get(api_key_hash)
+        if snapshot is not None:
+            return snapshot
+
+        generation = _auth_cache.generation
+
         stmt = select(Merchant).where(
             Merchant.api_key_hash == api_key_hash
         )
         result = await db.execute(stmt)
-        return result.scalar_one_or_none()
+        merchant = result.scalar_one_or_none()
+        if merchant is None:
+            return None
+
+        snapshot = MerchantDomain.from_model(merchant)
+        if _auth_cache.ttl_seconds > 0:
+            _auth_cache.set(api_key_hash, snapshot, generation=generation)
+        return snapshot
+
+    @staticmethod
+    def invalidate_cached(db: AsyncSession, api_key_hash: str) -> None:
+        """
+        Drops a cached snapshot once `db` commits. Call whenever a
+        merchant's key, status or webhook settings change.
+
+        Invalidating earlier would let a concurrent lookup re-cache the
+        still-committed old row for a full TTL.
+        """
+        db.sync_session.info.setdefault(_SESSION_INVALIDATIONS_KEY, set()).add(
+            api_key_hash
+        )
 
     @classmethod
     async def get_by_id(
@@ -45,3 +97,30 @@ class MerchantRepository:
         stmt = select(Merchant).where(Merchant.id == merchant_id)
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
+
+    @classmethod
+    async def get_many_by_ids(
+        cls,
+        db: AsyncSession,
+        merchant_ids: Iterable,
+    ) -> Dict:
+        """
+        Returns {merchant_id: merchant} in one query.
+        """
+        stmt = select(Merchant).where(Merchant.id.in_(list(merchant_ids)))
+        result = await db.execute(stmt)
+        return {merchant.id: merchant for merchant in result.scalars()}
+
+
+# -------------------------------------------------
+# Invalidation on commit
+# -------------------------------------------------
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    for api_key_hash in session.info.pop(_SESSION_INVALIDATIONS_KEY, ()):
+        _auth_cache.invalidate(api_key_hash)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_SESSION_INVALIDATIONS_KEY, None)
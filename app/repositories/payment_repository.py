@@ -1,11 +1,18 @@
-from typing import Optional, List
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, List, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.orm import lazyload
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.tracing import traced_class
+from app.db.dialects import dialect_insert
 from app.db.models.payment import Payment
+from app.domain.state_machine import INITIAL_STATUS, Transition
+from app.utils.time import utc_now
 
 
+@traced_class
 class PaymentRepository:
     """
     Data access layer for Payment entities.
@@ -21,6 +28,61 @@ class PaymentRepository:
         await db.flush()
         return payment
 
+    @classmethod
+    async def insert_if_absent(
+        cls,
+        db: AsyncSession,
+        **values,
+    ) -> Optional[Payment]:
+        """
+        Inserts a payment in one statement unless one already exists for
+        (merchant_id, idempotency_key).
+
+        Uses `INSERT ... ON CONFLICT DO NOTHING RETURNING` against
+        `uq_payments_merchant_id_idempotency_key`. Returns None on conflict.
+        A concurrent insert with the same key blocks until the other
+        transaction finishes instead of raising a unique violation.
+        """
+        stmt = (
+            dialect_insert(db, Payment)
+            .values(**values)
+            .on_conflict_do_nothing(
+                index_elements=[Payment.merchant_id, Payment.idempotency_key]
+            )
+            .returning(Payment)
+        )
+        result = await db.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return result.scalar_one_or_none()
+
+    @classmethod
+    async def insert_many_if_absent(
+        cls,
+        db: AsyncSession,
+        rows: List[dict],
+    ) -> List[Payment]:
+        """
+        Multi-row variant of `insert_if_absent`: one INSERT statement for the
+        whole batch. Rows whose idempotency key already exists are skipped
+        and simply missing from the result.
+        """
+        if not rows:
+            return []
+
+        stmt = (
+            dialect_insert(db, Payment)
+            .values(rows)
+            .on_conflict_do_nothing(
+                index_elements=[Payment.merchant_id, Payment.idempotency_key]
+            )
+            .returning(Payment)
+        )
+        result = await db.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return result.scalars().all()
+
     @classmethod
     async def get_by_id(
         cls,
@@ -49,18 +111,218 @@ class PaymentRepository:
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    @staticmethod
+    def _list_query(
+        merchant_id,
+        *,
+        status: Optional[str] = None,
+        currency: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, Any]] = None,
+    ):
+        """
+        Builds the newest-first listing query shared by pages and streams.
+
+        Ordering on (created_at, id) matches the merchant indexes, so both
+        the filters and the keyset predicate are served by an index range
+        scan instead of OFFSET.
+        """
+        stmt = (
+            select(Payment)
+            .options(lazyload(Payment.merchant))
+            .where(Payment.merchant_id == merchant_id)
+        )
+
+        if status is not None:
+            stmt = stmt.where(Payment.status == status)
+        if currency is not None:
+            stmt = stmt.where(Payment.currency == currency)
+        if created_from is not None:
+            stmt = stmt.where(Payment.created_at >= created_from)
+        if created_to is not None:
+            stmt = stmt.where(Payment.created_at < created_to)
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(Payment.created_at, Payment.id) < tuple_(*after)
+            )
+
+        return stmt.order_by(Payment.created_at.desc(), Payment.id.desc())
+
     @classmethod
     async def list_by_merchant(
         cls,
         db: AsyncSession,
         merchant_id,
         limit: int = 50,
+        **filters,
     ) -> List[Payment]:
-        stmt = (
-            select(Payment)
-            .where(Payment.merchant_id == merchant_id)
-            .order_by(Payment.created_at.desc())
-            .limit(limit)
+        """
+        Returns one page of payments. Pass the last row's (created_at, id)
+        as `after` to fetch the next page.
+        """
+        stmt = cls._list_query(merchant_id, **filters).limit(limit)
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    @classmethod
+    async def stream_by_merchant(
+        cls,
+        db: AsyncSession,
+        merchant_id,
+        batch_size: int = 1000,
+        **filters,
+    ) -> AsyncIterator[List[Payment]]:
+        """
+        Yields every matching payment in batches from a server-side cursor,
+        so memory stays bounded by `batch_size` regardless of row count.
+        """
+        stmt = cls._list_query(merchant_id, **filters).execution_options(
+            yield_per=batch_size
+        )
+        result = await db.stream(stmt)
+        async for partition in result.scalars().partitions():
+            yield partition
+
+    @staticmethod
+    def _transition_stmt(transition: Transition, *criteria, **values):
+        """
+        Compiles a state machine transition to a conditional
+        `UPDATE ... WHERE status IN (sources) RETURNING`.
+        """
+        return (
+            update(Payment)
+            .where(*criteria, Payment.status.in_(transition.source_values))
+            .values(status=transition.target.value, updated_at=utc_now(), **values)
+            .returning(Payment)
+            .execution_options(populate_existing=True)
+        )
+
+    @classmethod
+    async def transition(
+        cls,
+        db: AsyncSession,
+        merchant_id,
+        payment_id,
+        transition: Transition,
+        **values,
+    ) -> Optional[Payment]:
+        """
+        Applies `transition` to one payment in a single statement.
+
+        Returns None when the payment is missing, owned by another merchant,
+        or not in a source status, including when a concurrent request won.
+        """
+        stmt = cls._transition_stmt(
+            transition,
+            Payment.id == payment_id,
+            Payment.merchant_id == merchant_id,
+            **values,
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @classmethod
+    async def transition_many(
+        cls,
+        db: AsyncSession,
+        merchant_id,
+        payment_ids: Iterable,
+        transition: Transition,
+    ) -> List[Payment]:
+        """
+        Applies `transition` to every listed payment in one statement.
+
+        The status predicate makes the transition atomic: a payment changed
+        concurrently is simply not returned. Payments not returned were
+        missing, owned by another merchant, or in another state.
+        """
+        stmt = cls._transition_stmt(
+            transition,
+            Payment.id.in_(list(payment_ids)),
+            Payment.merchant_id == merchant_id,
+        )
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    @classmethod
+    async def transition_by_ids(
+        cls,
+        db: AsyncSession,
+        payment_ids: Iterable,
+        transition: Transition,
+        **values,
+    ) -> List[Payment]:
+        """
+        Like `transition_many`, across merchants. For internal callers
+        (the simulation engine) only; API paths must scope by merchant.
+        """
+        stmt = cls._transition_stmt(
+            transition,
+            Payment.id.in_(list(payment_ids)),
+            **values,
         )
         result = await db.execute(stmt)
         return result.scalars().all()
+
+    @classmethod
+    async def list_pending_simulations(
+        cls,
+        db: AsyncSession,
+        *,
+        limit: int,
+        due_before: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, Any]] = None,
+    ) -> List[Tuple[Any, str, datetime]]:
+        """
+        Returns (id, simulation_scenario, simulation_due_at) of CREATED
+        payments awaiting a simulated outcome, in due order. `after` is the
+        (due_at, id) of the previous page's last row.
+        """
+        stmt = select(
+            Payment.id, Payment.simulation_scenario, Payment.simulation_due_at
+        ).where(
+            Payment.status == INITIAL_STATUS.value,
+            Payment.simulation_due_at.is_not(None),
+        )
+        if due_before is not None:
+            stmt = stmt.where(Payment.simulation_due_at <= due_before)
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(Payment.simulation_due_at, Payment.id) > tuple_(*after)
+            )
+        stmt = stmt.order_by(Payment.simulation_due_at, Payment.id).limit(limit)
+
+        result = await db.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    @classmethod
+    async def get_status(
+        cls,
+        db: AsyncSession,
+        merchant_id,
+        payment_id,
+    ) -> Optional[str]:
+        stmt = select(Payment.status).where(
+            Payment.id == payment_id,
+            Payment.merchant_id == merchant_id,
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @classmethod
+    async def get_statuses(
+        cls,
+        db: AsyncSession,
+        merchant_id,
+        payment_ids: Iterable,
+    ) -> Dict:
+        """
+        Returns {payment_id: status} for the merchant's payments among ids.
+        """
+        stmt = select(Payment.id, Payment.status).where(
+            Payment.id.in_(list(payment_ids)),
+            Payment.merchant_id == merchant_id,
+        )
+        result = await db.execute(stmt)
+        return dict(result.all())
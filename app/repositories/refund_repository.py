@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Iterable, Optional, List
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -21,6 +21,30 @@ class RefundRepository:
         await db.flush()
         return refund
 
+    @classmethod
+    async def create_many(
+        cls,
+        db: AsyncSession,
+        refunds: List[Refund],
+    ) -> List[Refund]:
+        db.add_all(refunds)
+        await db.flush()
+        return refunds
+
+    @classmethod
+    async def get_many_by_ids(
+        cls,
+        db: AsyncSession,
+        refund_ids: Iterable,
+        merchant_id,
+    ) -> List[Refund]:
+        stmt = select(Refund).where(
+            Refund.id.in_(list(refund_ids)),
+            Refund.merchant_id == merchant_id,
+        )
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
     @classmethod
     async def get_by_id(
         cls,
@@ -0,0 +1,249 @@
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Row, func, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.webhook_event import WebhookEvent
+
+
+class WebhookEventRepository:
+    """
+    Data access layer for WebhookEvent (outbox) entities.
+
+    Workers never read events directly: they claim a batch under a lease
+    (`claimed_by` / `lease_expires_at`) so several dispatcher processes can
+    run side by side without double-delivering. A crashed worker's events
+    become claimable again once its lease expires.
+    """
+
+    @staticmethod
+    def _lease_free(now: datetime):
+        return or_(
+            WebhookEvent.lease_expires_at.is_(None),
+            WebhookEvent.lease_expires_at < now,
+        )
+
+    @classmethod
+    async def _claim(
+        cls,
+        db: AsyncSession,
+        *,
+        criteria: list,
+        order_by,
+        worker_id: str,
+        now: datetime,
+        lease_seconds: int,
+        limit: int,
+    ) -> List[WebhookEvent]:
+        """
+        Atomically leases up to `limit` matching events to `worker_id`.
+
+        On PostgreSQL candidates are picked with `FOR UPDATE SKIP LOCKED`,
+        so concurrent claimers split the backlog instead of blocking on each
+        other. SQLite ignores the locking clause but serializes writers, so
+        the single UPDATE ... RETURNING is equally exclusive there.
+        """
+        candidates = (
+            select(WebhookEvent.id)
+            .where(*criteria, cls._lease_free(now))
+            .order_by(order_by)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+        stmt = (
+            update(WebhookEvent)
+            .where(
+                WebhookEvent.id.in_(candidates.scalar_subquery()),
+                cls._lease_free(now),
+            )
+            .values(
+                claimed_by=worker_id,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+            )
+            .returning(WebhookEvent)
+            .execution_options(populate_existing=True)
+        )
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    @classmethod
+    async def claim_pending(
+        cls,
+        db: AsyncSession,
+        *,
+        worker_id: str,
+        now: datetime,
+        lease_seconds: int,
+        limit: int = 100,
+    ) -> List[WebhookEvent]:
+        """
+        Claims outbox events that have never been attempted, oldest first.
+        Events deferred by an open circuit breaker wait for `next_attempt_at`.
+        """
+        return await cls._claim(
+            db,
+            criteria=[
+                WebhookEvent.delivered.is_(False),
+                WebhookEvent.attempt_count == 0,
+                or_(
+                    WebhookEvent.next_attempt_at.is_(None),
+                    WebhookEvent.next_attempt_at <= now,
+                ),
+            ],
+            order_by=WebhookEvent.created_at,
+            worker_id=worker_id,
+            now=now,
+            lease_seconds=lease_seconds,
+            limit=limit,
+        )
+
+    @classmethod
+    async def claim_due(
+        cls,
+        db: AsyncSession,
+        *,
+        worker_id: str,
+        now: datetime,
+        lease_seconds: int,
+        max_attempts: int,
+        limit: int = 500,
+        event_ids: Optional[Sequence] = None,
+    ) -> List[WebhookEvent]:
+        """
+        Claims failed events whose backoff has elapsed, most overdue first,
+        optionally only among `event_ids`.
+
+        Served by `idx_webhook_events_due`.
+        """
+        criteria = [
+            WebhookEvent.delivered.is_(False),
+            WebhookEvent.next_attempt_at <= now,
+            WebhookEvent.attempt_count > 0,
+            WebhookEvent.attempt_count < max_attempts,
+        ]
+        if event_ids is not None:
+            criteria.append(WebhookEvent.id.in_(list(event_ids)))
+
+        return await cls._claim(
+            db,
+            criteria=criteria,
+            order_by=WebhookEvent.next_attempt_at,
+            worker_id=worker_id,
+            now=now,
+            lease_seconds=lease_seconds,
+            limit=limit,
+        )
+
+    @classmethod
+    async def release(
+        cls,
+        db: AsyncSession,
+        event_ids: Sequence,
+        worker_id: str,
+    ) -> None:
+        """
+        Gives up `worker_id`'s lease on events without attempting them.
+        """
+        await db.execute(
+            update(WebhookEvent)
+            .where(
+                WebhookEvent.id.in_(list(event_ids)),
+                WebhookEvent.claimed_by == worker_id,
+            )
+            .values(claimed_by=None, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    @classmethod
+    async def list_retry_deadlines(
+        cls,
+        db: AsyncSession,
+        *,
+        after: Optional[Tuple[datetime, object]],
+        until: datetime,
+        max_attempts: int,
+        limit: int,
+    ) -> List[Tuple[datetime, object]]:
+        """
+        Returns (next_attempt_at, id) of retryable events due up to `until`,
+        in due order, starting after the `after` keyset position.
+        """
+        stmt = select(WebhookEvent.next_attempt_at, WebhookEvent.id).where(
+            WebhookEvent.delivered.is_(False),
+            WebhookEvent.next_attempt_at <= until,
+            WebhookEvent.attempt_count > 0,
+            WebhookEvent.attempt_count < max_attempts,
+        )
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(WebhookEvent.next_attempt_at, WebhookEvent.id) > tuple_(*after)
+            )
+        stmt = stmt.order_by(WebhookEvent.next_attempt_at, WebhookEvent.id).limit(limit)
+
+        result = await db.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    @classmethod
+    async def count_backlog(
+        cls,
+        db: AsyncSession,
+        *,
+        max_attempts: int,
+    ) -> Dict[str, int]:
+        """
+        Counts undelivered events that are still deliverable: `pending`
+        (never attempted) and `retrying` (failed, retries left).
+        """
+        stmt = select(
+            func.count().filter(WebhookEvent.attempt_count == 0),
+            func.count().filter(WebhookEvent.attempt_count > 0),
+        ).where(
+            WebhookEvent.delivered.is_(False),
+            WebhookEvent.attempt_count < max_attempts,
+        )
+        pending, retrying = (await db.execute(stmt)).one()
+        return {"pending": pending, "retrying": retrying}
+
+    # -------------------------------------------------
+    # Export
+    # -------------------------------------------------
+    @classmethod
+    async def stream_history(
+        cls,
+        db: AsyncSession,
+        merchant_id,
+        *,
+        columns: Sequence,
+        event_type: Optional[str] = None,
+        delivered: Optional[bool] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[Row]]:
+        """
+        Yields a merchant's events oldest first, in batches of plain rows.
+
+        Reads from a server-side cursor (`yield_per`) and selects only the
+        requested columns, so no ORM identities are built and memory stays
+        constant however long the history is.
+        """
+        stmt = select(*columns).where(WebhookEvent.merchant_id == merchant_id)
+
+        if event_type is not None:
+            stmt = stmt.where(WebhookEvent.event_type == event_type)
+        if delivered is not None:
+            stmt = stmt.where(WebhookEvent.delivered.is_(delivered))
+        if created_from is not None:
+            stmt = stmt.where(WebhookEvent.created_at >= created_from)
+        if created_to is not None:
+            stmt = stmt.where(WebhookEvent.created_at < created_to)
+
+        stmt = stmt.order_by(
+            WebhookEvent.created_at, WebhookEvent.id
+        ).execution_options(yield_per=batch_size)
+
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            yield partition
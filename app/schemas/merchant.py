@@ -13,3 +13,7 @@ class MerchantResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class WebhookBatchingRequest(BaseModel):
+    enabled: bool
@@ -3,6 +3,9 @@ from uuid import UUID
 from datetime import datetime
 from decimal import Decimal
 
+from app.domain.enums import SimulationScenario
+from app.schemas.simulation import SimulationProfileSchema
+
 
 # -----------------------------
 # Requests
@@ -11,11 +14,36 @@ class PaymentCreateRequest(BaseModel):
     amount: Decimal = Field(..., gt=0)
     currency: str = Field(..., min_length=3, max_length=3)
     external_reference: str | None = None
-    simulation: str | None = Field(
+    simulation: SimulationScenario | None = Field(
+        None,
+        description=(
+            "Simulation scenario: success, insufficient_funds, "
+            "network_timeout, fraud_detected or bank_error"
+        ),
+    )
+    simulation_profile: SimulationProfileSchema | None = Field(
         None,
-        description="Simulation scenario: success, timeout, fraud, etc.",
+        description=(
+            "Overrides the merchant's simulation profile for this payment; "
+            "without `simulation`, the scenario is drawn from its failure rates"
+        ),
     )
 
+    class Config:
+        use_enum_values = True
+
+
+class PaymentBatchItem(PaymentCreateRequest):
+    idempotency_key: str = Field(..., min_length=1, max_length=255)
+
+
+class PaymentBatchCreateRequest(BaseModel):
+    items: list[PaymentBatchItem] = Field(..., min_length=1)
+
+
+class PaymentBatchCaptureRequest(BaseModel):
+    payment_ids: list[UUID] = Field(..., min_length=1)
+
 
 # -----------------------------
 # Responses
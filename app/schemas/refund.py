@@ -13,6 +13,14 @@ class RefundCreateRequest(BaseModel):
     reason: str | None = None
 
 
+class RefundBatchItem(RefundCreateRequest):
+    idempotency_key: str = Field(..., min_length=1, max_length=255)
+
+
+class RefundBatchCreateRequest(BaseModel):
+    items: list[RefundBatchItem] = Field(..., min_length=1)
+
+
 # -----------------------------
 # Responses
 # -----------------------------
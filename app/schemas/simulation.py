@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field, model_validator
+
+from app.domain.enums import SimulationScenario
+from app.domain.simulation import SimulationProfile
+
+
+class SimulationProfileSchema(BaseModel):
+    """
+    Simulated acquirer behaviour, per merchant or per payment request.
+    """
+
+    latency_p50_ms: float = Field(..., gt=0)
+    latency_p99_ms: float = Field(..., gt=0)
+    timeout_ms: float = Field(30_000, gt=0)
+    failure_rates: dict[SimulationScenario, float] = Field(
+        default_factory=dict,
+        description="Probability of each failure scenario; the rest succeeds",
+    )
+    seed: int | None = Field(
+        None,
+        description="Makes outcomes and latencies reproducible per idempotency key",
+    )
+
+    @model_validator(mode="after")
+    def _check(self) -> "SimulationProfileSchema":
+        if self.latency_p99_ms < self.latency_p50_ms:
+            raise ValueError("latency_p99_ms must be >= latency_p50_ms")
+        if SimulationScenario.SUCCESS in self.failure_rates:
+            raise ValueError("failure_rates cannot include success")
+        if any(not 0 <= rate <= 1 for rate in self.failure_rates.values()):
+            raise ValueError("failure rates must be between 0 and 1")
+        if sum(self.failure_rates.values()) > 1:
+            raise ValueError("failure rates must sum to at most 1")
+        return self
+
+    def to_profile(self) -> SimulationProfile:
+        return SimulationProfile.from_dict(self.model_dump(mode="json"))
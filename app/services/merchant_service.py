@@ -3,7 +3,9 @@ import secrets
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.exceptions import NotFoundError
 from app.db.models.merchant import Merchant
+from app.repositories.merchant_repository import MerchantRepository
 
 
 class MerchantService:
@@ -40,3 +42,82 @@ class MerchantService:
         await db.flush()
 
         return merchant, raw_key
+
+    @classmethod
+    async def deactivate_merchant(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant_id,
+    ) -> Merchant:
+        merchant = await MerchantRepository.get_by_id(db, merchant_id)
+        if not merchant:
+            raise NotFoundError("Merchant not found")
+
+        merchant.is_active = False
+        await db.flush()
+
+        MerchantRepository.invalidate_cached(db, merchant.api_key_hash)
+        return merchant
+
+    @classmethod
+    async def set_simulation_profile(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant_id,
+        profile: dict | None,
+    ) -> Merchant:
+        """
+        Sets (or clears, with None) the merchant's default simulation profile.
+        """
+        merchant = await MerchantRepository.get_by_id(db, merchant_id)
+        if not merchant:
+            raise NotFoundError("Merchant not found")
+
+        merchant.simulation_profile = profile
+        await db.flush()
+
+        MerchantRepository.invalidate_cached(db, merchant.api_key_hash)
+        return merchant
+
+    @classmethod
+    async def set_webhook_batching(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant_id,
+        enabled: bool,
+    ) -> Merchant:
+        """
+        Switches the merchant between per-event and batched webhook delivery.
+        """
+        merchant = await MerchantRepository.get_by_id(db, merchant_id)
+        if not merchant:
+            raise NotFoundError("Merchant not found")
+
+        merchant.webhook_batching = enabled
+        await db.flush()
+
+        MerchantRepository.invalidate_cached(db, merchant.api_key_hash)
+        return merchant
+
+    @classmethod
+    async def rotate_api_key(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant_id,
+    ) -> tuple[Merchant, str]:
+        merchant = await MerchantRepository.get_by_id(db, merchant_id)
+        if not merchant:
+            raise NotFoundError("Merchant not found")
+
+        old_hash = merchant.api_key_hash
+        raw_key, hashed_key = cls.generate_api_key()
+
+        merchant.api_key_hash = hashed_key
+        await db.flush()
+
+        MerchantRepository.invalidate_cached(db, old_hash)
+        return merchant, raw_key
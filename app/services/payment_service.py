@@ -1,19 +1,54 @@
-import hashlib
-from datetime import datetime
+import json
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
+from app.core.metrics import idempotent_replays, registry
+from app.core.timing import phase
 from app.core.exceptions import (
+    BadRequestError,
     NotFoundError,
     PaymentStateError,
     IdempotencyConflictError,
 )
 from app.db.models.payment import Payment
 from app.db.models.idempotency import IdempotencyKey
+from app.domain.state_machine import AUTHORIZE, CAPTURE, INITIAL_STATUS, Transition
 from app.repositories.payment_repository import PaymentRepository
 from app.repositories.idempotency_repository import IdempotencyRepository
+from app.schemas.payment import PaymentResponse
 from app.services.webhook_service import WebhookService
+from app.utils.cache import TTLCache
+from app.utils.idempotency import hash_request_payload, legacy_request_hash
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.time import utc_now
+from app.workers.simulation_engine import (
+    plan_simulation,
+    resolve_profile,
+    schedule_after_commit,
+)
+
+settings = get_settings()
+
+# (merchant_id, idempotency_key) -> (request_hash, serialized response)
+_replay_cache: TTLCache[Tuple[str, bytes]] = TTLCache(
+    max_size=settings.IDEMPOTENCY_REPLAY_CACHE_MAX_SIZE,
+    ttl_seconds=settings.IDEMPOTENCY_REPLAY_CACHE_TTL_SECONDS,
+)
+
+# Request fields covered by the legacy request hash
+_LEGACY_HASH_FIELDS = {"amount", "currency", "external_reference", "simulation"}
+
+registry.gauge(
+    "idempotency_replay_cache",
+    "Idempotent replay cache counters (size, hits, misses, evictions)",
+    ("stat",),
+    callback=lambda: {(name,): value for name, value in _replay_cache.stats().items()},
+)
 
 
 class PaymentService:
@@ -22,10 +57,20 @@ class PaymentService:
     """
 
     @staticmethod
-    def _hash_request(payload: dict) -> str:
-        return hashlib.sha256(
-            str(sorted(payload.items())).encode("utf-8")
-        ).hexdigest()
+    def _serialize(payment: Payment) -> bytes:
+        with phase("serialization"):
+            return PaymentResponse.model_validate(payment).model_dump_json().encode(
+                "utf-8"
+            )
+
+    @staticmethod
+    def _simulation_columns(merchant, request, idempotency_key: str) -> dict:
+        scenario, due_at = plan_simulation(
+            request.simulation,
+            resolve_profile(merchant, request),
+            idempotency_key,
+        )
+        return {"simulation_scenario": scenario, "simulation_due_at": due_at}
 
     @classmethod
     async def create_payment(
@@ -36,49 +81,132 @@ class PaymentService:
         request,
         idempotency_key: str,
     ) -> Payment:
-        # -------------------------------------------------
-        # Idempotency check
-        # -------------------------------------------------
-        existing = await PaymentRepository.get_by_idempotency_key(
-            db, merchant.id, idempotency_key
-        )
-        if existing:
-            return existing
+        payload_hash = hash_request_payload(request.model_dump())
 
-        payload_hash = cls._hash_request(request.model_dump())
+        created = await cls._insert_payment(
+            db=db,
+            merchant=merchant,
+            request=request,
+            idempotency_key=idempotency_key,
+            payload_hash=payload_hash,
+        )
+        if created is not None:
+            return created[0]
 
-        idempotency_record = await IdempotencyRepository.get(
+        await cls._get_replay_record(
+            db=db,
+            merchant=merchant,
+            request=request,
+            idempotency_key=idempotency_key,
+            payload_hash=payload_hash,
+        )
+        idempotent_replays.inc("payment", "db")
+        return await PaymentRepository.get_by_idempotency_key(
             db, merchant.id, idempotency_key
         )
-        if idempotency_record:
-            if idempotency_record.request_hash != payload_hash:
+
+    @classmethod
+    async def create_payment_response(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        request,
+        idempotency_key: str,
+    ) -> bytes:
+        """
+        Same as `create_payment`, but returns the serialized response body.
+
+        Replays are served from the stored `response_snapshot` (and an
+        in-process LRU in front of it) without hydrating the payment.
+        """
+        payload_hash = hash_request_payload(request.model_dump())
+        cache_key = (merchant.id, idempotency_key)
+
+        cached = _replay_cache.get(cache_key)
+        if cached is not None:
+            request_hash, body = cached
+            if request_hash != payload_hash:
                 raise IdempotencyConflictError(
                     "Idempotency key reused with different payload"
                 )
+            idempotent_replays.inc("payment", "cache")
+            return body
+
+        created = await cls._insert_payment(
+            db=db,
+            merchant=merchant,
+            request=request,
+            idempotency_key=idempotency_key,
+            payload_hash=payload_hash,
+        )
+        if created is not None:
+            return created[1]
 
+        record = await cls._get_replay_record(
+            db=db,
+            merchant=merchant,
+            request=request,
+            idempotency_key=idempotency_key,
+            payload_hash=payload_hash,
+        )
+
+        snapshot = record.response_snapshot if record else None
+        if snapshot and snapshot.startswith("{"):
+            body = snapshot.encode("utf-8")
+        else:
+            # Records written before full snapshots were stored
+            payment = await PaymentRepository.get_by_idempotency_key(
+                db, merchant.id, idempotency_key
+            )
+            body = cls._serialize(payment)
+
+        # Only committed responses reach this point, so caching is safe
+        _replay_cache.set(cache_key, (payload_hash, body))
+        idempotent_replays.inc("payment", "db")
+        return body
+
+    @classmethod
+    async def _insert_payment(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        request,
+        idempotency_key: str,
+        payload_hash: str,
+    ) -> Optional[Tuple[Payment, bytes]]:
+        """
+        Creates the payment, its idempotency record and webhook event.
+        Returns None if the idempotency key is already taken.
+        """
         # -------------------------------------------------
-        # Create payment
+        # Insert-or-skip (single statement in the common case)
         # -------------------------------------------------
-        payment = Payment(
+        payment = await PaymentRepository.insert_if_absent(
+            db,
             merchant_id=merchant.id,
             amount=Decimal(request.amount),
             currency=request.currency,
-            status="CREATED",
+            status=INITIAL_STATUS.value,
             idempotency_key=idempotency_key,
             external_reference=request.external_reference,
-            simulation_scenario=request.simulation,
+            **cls._simulation_columns(merchant, request, idempotency_key),
         )
+        if payment is None:
+            return None
+        schedule_after_commit(db, [payment])
 
-        await PaymentRepository.create(db, payment)
+        body = cls._serialize(payment)
 
-        # Store idempotency record
-        await IdempotencyRepository.create(
+        # Store idempotency record (written with the commit)
+        IdempotencyRepository.add(
             db,
             IdempotencyKey(
                 merchant_id=merchant.id,
                 key=idempotency_key,
                 request_hash=payload_hash,
-                response_snapshot=str(payment.id),
+                response_snapshot=body.decode("utf-8"),
             ),
         )
 
@@ -93,7 +221,376 @@ class PaymentService:
             },
         )
 
-        return payment
+        return payment, body
+
+    @staticmethod
+    def _hash_matches(record: IdempotencyKey, payload_hash: str, request) -> bool:
+        """
+        True if `record` was written for the same payload.
+
+        Records stored before canonical JSON hashing carry the old
+        `str(sorted(...))` hash, which cannot be recomputed from the row,
+        so it is accepted as well until they age out.
+        """
+        if record.request_hash == payload_hash:
+            return True
+
+        max_age = settings.IDEMPOTENCY_LEGACY_HASH_MAX_AGE_DAYS
+        # Older releases had no simulation profile on the request
+        if max_age <= 0 or request.simulation_profile is not None:
+            return False
+        created_at = record.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        if utc_now() - created_at > timedelta(days=max_age):
+            return False
+
+        legacy_payload = request.model_dump(include=_LEGACY_HASH_FIELDS)
+        return record.request_hash == legacy_request_hash(legacy_payload)
+
+    @classmethod
+    async def _get_replay_record(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        request,
+        idempotency_key: str,
+        payload_hash: str,
+    ) -> Optional[IdempotencyKey]:
+        """
+        Loads the idempotency record for a replayed key and validates that
+        the payload matches the original request.
+        """
+        idempotency_record = await IdempotencyRepository.get(
+            db, merchant.id, idempotency_key
+        )
+        if idempotency_record and not cls._hash_matches(
+            idempotency_record, payload_hash, request
+        ):
+            raise IdempotencyConflictError(
+                "Idempotency key reused with different payload"
+            )
+
+        return idempotency_record
+
+    # -------------------------------------------------
+    # Batch creation
+    # -------------------------------------------------
+    @staticmethod
+    def _batch_result(
+        idempotency_key: str,
+        status: str,
+        *,
+        payment: Optional[bytes] = None,
+        error: Optional[Tuple[str, str]] = None,
+    ) -> bytes:
+        """
+        Serializes one batch result, splicing in the pre-serialized payment.
+        """
+        result = {"idempotency_key": idempotency_key, "status": status}
+        if payment is None:
+            code, message = error
+            result["error"] = {"code": code, "message": message}
+            return json.dumps(result, separators=(",", ":")).encode("utf-8")
+
+        head = json.dumps(result, separators=(",", ":"))[:-1]
+        return head.encode("utf-8") + b',"payment":' + payment + b"}"
+
+    @classmethod
+    async def create_payments_batch(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        items: List,
+    ) -> bytes:
+        """
+        Creates many payments in one unit of work.
+
+        One bulk idempotency lookup, one multi-row INSERT and one bulk webhook
+        write, regardless of batch size. Each item carries its own
+        idempotency key and is reported individually as created, replayed or
+        failed; a failed item never aborts the others.
+
+        Returns the serialized `{"results": [...]}` body.
+        """
+        if len(items) > settings.BATCH_MAX_ITEMS:
+            raise BadRequestError(
+                f"Batch exceeds {settings.BATCH_MAX_ITEMS} items"
+            )
+
+        results: List[Optional[bytes]] = [None] * len(items)
+        hashes: List[str] = []
+        first_index: Dict[str, int] = {}
+
+        for index, item in enumerate(items):
+            hashes.append(
+                hash_request_payload(item.model_dump(exclude={"idempotency_key"}))
+            )
+            if item.idempotency_key in first_index:
+                results[index] = cls._batch_result(
+                    item.idempotency_key,
+                    "failed",
+                    error=("IDEMPOTENCY_CONFLICT", "Duplicate idempotency key in batch"),
+                )
+            else:
+                first_index[item.idempotency_key] = index
+
+        # -------------------------------------------------
+        # Replays (one query for the whole batch)
+        # -------------------------------------------------
+        async def _resolve_existing(keys) -> None:
+            records = await IdempotencyRepository.get_many(db, merchant.id, keys)
+            for key, record in records.items():
+                index = first_index[key]
+                if not cls._hash_matches(record, hashes[index], items[index]):
+                    results[index] = cls._batch_result(
+                        key,
+                        "failed",
+                        error=(
+                            "IDEMPOTENCY_CONFLICT",
+                            "Idempotency key reused with different payload",
+                        ),
+                    )
+                elif record.response_snapshot.startswith("{"):
+                    idempotent_replays.inc("payment", "db")
+                    results[index] = cls._batch_result(
+                        key,
+                        "replayed",
+                        payment=record.response_snapshot.encode("utf-8"),
+                    )
+                else:
+                    idempotent_replays.inc("payment", "db")
+                    payment = await PaymentRepository.get_by_idempotency_key(
+                        db, merchant.id, key
+                    )
+                    results[index] = cls._batch_result(
+                        key, "replayed", payment=cls._serialize(payment)
+                    )
+
+        await _resolve_existing(first_index.keys())
+
+        # -------------------------------------------------
+        # Single multi-row insert for the remainder
+        # -------------------------------------------------
+        pending = [
+            index for index in first_index.values() if results[index] is None
+        ]
+        payments = await PaymentRepository.insert_many_if_absent(
+            db,
+            [
+                {
+                    "merchant_id": merchant.id,
+                    "amount": Decimal(items[index].amount),
+                    "currency": items[index].currency,
+                    "status": INITIAL_STATUS.value,
+                    "idempotency_key": items[index].idempotency_key,
+                    "external_reference": items[index].external_reference,
+                    **cls._simulation_columns(
+                        merchant, items[index], items[index].idempotency_key
+                    ),
+                }
+                for index in pending
+            ],
+        )
+        schedule_after_commit(db, payments)
+
+        records = []
+        for payment in payments:
+            index = first_index[payment.idempotency_key]
+            body = cls._serialize(payment)
+            results[index] = cls._batch_result(
+                payment.idempotency_key, "created", payment=body
+            )
+            records.append(
+                IdempotencyKey(
+                    merchant_id=merchant.id,
+                    key=payment.idempotency_key,
+                    request_hash=hashes[index],
+                    response_snapshot=body.decode("utf-8"),
+                )
+            )
+        IdempotencyRepository.add_all(db, records)
+
+        # Keys taken by a concurrent request between lookup and insert
+        raced = [items[i].idempotency_key for i in pending if results[i] is None]
+        if raced:
+            await _resolve_existing(raced)
+            for key in raced:
+                index = first_index[key]
+                if results[index] is None:
+                    results[index] = cls._batch_result(
+                        key,
+                        "failed",
+                        error=("CONFLICT", "Concurrent request holds this key"),
+                    )
+
+        await WebhookService.emit_events(
+            db=db,
+            merchant=merchant,
+            events=[
+                (
+                    "payment.created",
+                    {"payment_id": str(payment.id), "status": payment.status},
+                )
+                for payment in payments
+            ],
+        )
+
+        return b'{"results":[' + b",".join(results) + b"]}"
+
+    # -------------------------------------------------
+    # Bulk capture
+    # -------------------------------------------------
+    @classmethod
+    async def capture_payments_batch(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        payment_ids: List,
+    ) -> dict:
+        """
+        Captures many authorized payments with one conditional UPDATE.
+
+        Each id is reported as captured or failed (not found / wrong state);
+        duplicates are collapsed. One `payment.succeeded` event is written
+        per captured payment, in bulk.
+        """
+        if len(payment_ids) > settings.BATCH_MAX_ITEMS:
+            raise BadRequestError(
+                f"Batch exceeds {settings.BATCH_MAX_ITEMS} items"
+            )
+
+        ids = list(dict.fromkeys(payment_ids))
+        captured = {
+            payment.id: payment
+            for payment in await PaymentRepository.transition_many(
+                db,
+                merchant.id,
+                ids,
+                CAPTURE,
+            )
+        }
+
+        missing = [payment_id for payment_id in ids if payment_id not in captured]
+        statuses = (
+            await PaymentRepository.get_statuses(db, merchant.id, missing)
+            if missing
+            else {}
+        )
+
+        results = []
+        for payment_id in ids:
+            payment = captured.get(payment_id)
+            if payment is not None:
+                results.append(
+                    {
+                        "payment_id": str(payment_id),
+                        "status": "captured",
+                        "payment": PaymentResponse.model_validate(payment),
+                    }
+                )
+            elif payment_id in statuses:
+                results.append(
+                    {
+                        "payment_id": str(payment_id),
+                        "status": "failed",
+                        "error": {
+                            "code": "INVALID_PAYMENT_STATE",
+                            "message": (
+                                f"Payment is {statuses[payment_id]}; only "
+                                "authorized payments can be captured"
+                            ),
+                        },
+                    }
+                )
+            else:
+                results.append(
+                    {
+                        "payment_id": str(payment_id),
+                        "status": "failed",
+                        "error": {
+                            "code": "NOT_FOUND",
+                            "message": "Payment not found",
+                        },
+                    }
+                )
+
+        await WebhookService.emit_events(
+            db=db,
+            merchant=merchant,
+            events=[
+                (
+                    "payment.succeeded",
+                    {"payment_id": str(payment.id), "status": payment.status},
+                )
+                for payment in captured.values()
+            ],
+        )
+
+        return {"results": results}
+
+    # -------------------------------------------------
+    # Listing
+    # -------------------------------------------------
+    @classmethod
+    async def list_payments(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        limit: int,
+        cursor: Optional[str] = None,
+        **filters,
+    ) -> dict:
+        """
+        Returns one keyset page, newest first, with an opaque `next_cursor`.
+        """
+        after = decode_cursor(cursor) if cursor else None
+
+        # One extra row tells us whether another page exists
+        payments = await PaymentRepository.list_by_merchant(
+            db, merchant.id, limit=limit + 1, after=after, **filters
+        )
+        has_more = len(payments) > limit
+        payments = payments[:limit]
+
+        next_cursor = None
+        if has_more:
+            last = payments[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+
+        return {
+            "data": [PaymentResponse.model_validate(p) for p in payments],
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        }
+
+    @classmethod
+    async def stream_payments_ndjson(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        after: Optional[Tuple[datetime, UUID]] = None,
+        **filters,
+    ) -> AsyncIterator[bytes]:
+        """
+        Yields all matching payments as NDJSON, one chunk per cursor batch.
+        `after` (a decoded cursor) resumes an interrupted export after that
+        position; decode it before the response starts so a bad cursor is
+        still a 400.
+        """
+        async for batch in PaymentRepository.stream_by_merchant(
+            db,
+            merchant.id,
+            batch_size=settings.STREAM_BATCH_SIZE,
+            after=after,
+            **filters,
+        ):
+            yield b"".join(cls._serialize(payment) + b"\n" for payment in batch)
 
     @classmethod
     async def get_payment(
@@ -101,7 +598,7 @@ class PaymentService:
         *,
         db: AsyncSession,
         merchant,
-        payment_id: str,
+        payment_id: UUID,
     ) -> Payment:
         payment = await PaymentRepository.get_by_id(
             db, payment_id, merchant.id
@@ -111,24 +608,51 @@ class PaymentService:
         return payment
 
     @classmethod
-    async def capture_payment(
+    async def transition_payment(
         cls,
         *,
         db: AsyncSession,
         merchant,
-        payment_id: str,
+        payment_id: UUID,
+        transition: Transition,
     ) -> Payment:
-        payment = await cls.get_payment(
-            db=db, merchant=merchant, payment_id=payment_id
+        """
+        Applies a state machine transition as one conditional UPDATE.
+        Only on failure is the payment read again, to pick the error.
+        """
+        payment = await PaymentRepository.transition(
+            db, merchant.id, payment_id, transition
         )
+        if payment is not None:
+            return payment
 
-        if payment.status != "AUTHORIZED":
-            raise PaymentStateError(
-                "Only authorized payments can be captured"
-            )
+        if await PaymentRepository.get_status(db, merchant.id, payment_id) is None:
+            raise NotFoundError("Payment not found")
+        raise PaymentStateError(transition.error)
 
-        payment.status = "CAPTURED"
-        payment.updated_at = datetime.utcnow()
+    @classmethod
+    async def authorize_payment(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        payment_id: UUID,
+    ) -> Payment:
+        return await cls.transition_payment(
+            db=db, merchant=merchant, payment_id=payment_id, transition=AUTHORIZE
+        )
+
+    @classmethod
+    async def capture_payment(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        payment_id: UUID,
+    ) -> Payment:
+        payment = await cls.transition_payment(
+            db=db, merchant=merchant, payment_id=payment_id, transition=CAPTURE
+        )
 
         await WebhookService.emit_event(
             db=db,
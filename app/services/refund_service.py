@@ -1,17 +1,29 @@
+import hashlib
+import uuid
 from decimal import Decimal
+from typing import Dict, List, Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
+from app.core.metrics import idempotent_replays
 from app.core.exceptions import (
+    BadRequestError,
     NotFoundError,
     PaymentStateError,
     IdempotencyConflictError,
 )
 from app.db.models.refund import Refund
 from app.db.models.idempotency import IdempotencyKey
+from app.domain.state_machine import REFUND
 from app.repositories.payment_repository import PaymentRepository
 from app.repositories.refund_repository import RefundRepository
 from app.repositories.idempotency_repository import IdempotencyRepository
 from app.services.webhook_service import WebhookService
+from app.schemas.refund import RefundResponse
+from app.utils.idempotency import hash_request_payload
+
+settings = get_settings()
 
 
 class RefundService:
@@ -19,6 +31,16 @@ class RefundService:
     Handles refund business logic.
     """
 
+    @staticmethod
+    def _record_key(payment_id, idempotency_key: str) -> str:
+        """
+        IdempotencyKey.key for a refund. Refund keys are scoped per payment
+        and kept apart from payment keys; the client key is digested so the
+        result fits the column whatever the key's length.
+        """
+        digest = hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()
+        return f"refund:{payment_id}:{digest}"
+
     @classmethod
     async def create_refund(
         cls,
@@ -34,17 +56,32 @@ class RefundService:
         if not payment:
             raise NotFoundError("Payment not found")
 
-        if payment.status != "CAPTURED":
-            raise PaymentStateError(
-                "Only captured payments can be refunded"
-            )
+        payload_hash = hash_request_payload(request.model_dump())
+        record_key = cls._record_key(payment.id, idempotency_key)
 
         existing = await RefundRepository.get_by_idempotency_key(
             db, payment.id, idempotency_key
         )
         if existing:
+            idempotency_record = await IdempotencyRepository.get(
+                db, merchant.id, record_key
+            )
+            if (
+                idempotency_record
+                and idempotency_record.request_hash != payload_hash
+            ):
+                raise IdempotencyConflictError(
+                    "Idempotency key reused with different payload"
+                )
+            idempotent_replays.inc("refund", "db")
             return existing
 
+        # Conditional UPDATE: of two concurrent refunds only one matches
+        if await PaymentRepository.transition(
+            db, merchant.id, payment.id, REFUND
+        ) is None:
+            raise PaymentStateError(REFUND.error)
+
         refund = Refund(
             payment_id=payment.id,
             merchant_id=merchant.id,
@@ -57,7 +94,15 @@ class RefundService:
 
         await RefundRepository.create(db, refund)
 
-        payment.status = "REFUNDED"
+        IdempotencyRepository.add(
+            db,
+            IdempotencyKey(
+                merchant_id=merchant.id,
+                key=record_key,
+                request_hash=payload_hash,
+                response_snapshot=str(refund.id),
+            ),
+        )
 
         await WebhookService.emit_event(
             db=db,
@@ -70,3 +115,190 @@ class RefundService:
         )
 
         return refund
+
+    # -------------------------------------------------
+    # Bulk refunds
+    # -------------------------------------------------
+    @staticmethod
+    def _batch_failure(item, code: str, message: str) -> dict:
+        return {
+            "idempotency_key": item.idempotency_key,
+            "payment_id": str(item.payment_id),
+            "status": "failed",
+            "error": {"code": code, "message": message},
+        }
+
+    @classmethod
+    async def create_refunds_batch(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        items: List,
+    ) -> dict:
+        """
+        Refunds many captured payments in one unit of work.
+
+        Payments are moved CAPTURED -> REFUNDED by a single conditional
+        UPDATE, so an item only succeeds if its payment was still captured.
+        Refund rows, idempotency records and `payment.refunded` events are
+        then written in bulk. Results are reported per item in request order.
+        """
+        if len(items) > settings.BATCH_MAX_ITEMS:
+            raise BadRequestError(
+                f"Batch exceeds {settings.BATCH_MAX_ITEMS} items"
+            )
+
+        results: List[Optional[dict]] = [None] * len(items)
+        hashes: List[str] = []
+        first_index: Dict[str, int] = {}
+
+        for index, item in enumerate(items):
+            hashes.append(
+                hash_request_payload(item.model_dump(exclude={"idempotency_key"}))
+            )
+            record_key = cls._record_key(item.payment_id, item.idempotency_key)
+            if record_key in first_index:
+                results[index] = cls._batch_failure(
+                    item,
+                    "IDEMPOTENCY_CONFLICT",
+                    "Duplicate idempotency key in batch",
+                )
+            else:
+                first_index[record_key] = index
+
+        # -------------------------------------------------
+        # Replays (one query for records, one for refunds)
+        # -------------------------------------------------
+        records = await IdempotencyRepository.get_many(
+            db, merchant.id, first_index.keys()
+        )
+        replayed: Dict[str, int] = {}
+        for record_key, record in records.items():
+            index = first_index[record_key]
+            if record.request_hash != hashes[index]:
+                results[index] = cls._batch_failure(
+                    items[index],
+                    "IDEMPOTENCY_CONFLICT",
+                    "Idempotency key reused with different payload",
+                )
+            else:
+                replayed[record.response_snapshot] = index
+
+        if replayed:
+            for refund in await RefundRepository.get_many_by_ids(
+                db, [uuid.UUID(refund_id) for refund_id in replayed], merchant.id
+            ):
+                index = replayed[str(refund.id)]
+                idempotent_replays.inc("refund", "db")
+                results[index] = {
+                    "idempotency_key": items[index].idempotency_key,
+                    "payment_id": str(refund.payment_id),
+                    "status": "replayed",
+                    "refund": RefundResponse.model_validate(refund),
+                }
+
+        # -------------------------------------------------
+        # Single conditional transition for the remainder
+        # -------------------------------------------------
+        pending = [
+            index for index in first_index.values() if results[index] is None
+        ]
+        payment_ids = list(dict.fromkeys(items[i].payment_id for i in pending))
+
+        refunded = {}
+        if payment_ids:
+            refunded = {
+                payment.id: payment
+                for payment in await PaymentRepository.transition_many(
+                    db,
+                    merchant.id,
+                    payment_ids,
+                    REFUND,
+                )
+            }
+
+        missing = [pid for pid in payment_ids if pid not in refunded]
+        statuses = (
+            await PaymentRepository.get_statuses(db, merchant.id, missing)
+            if missing
+            else {}
+        )
+
+        refunds: List[Refund] = []
+        idempotency_records: List[IdempotencyKey] = []
+        taken = set()
+        for index in pending:
+            item = items[index]
+            # A payment is refunded in full, so only its first item can win
+            payment = refunded.pop(item.payment_id, None)
+
+            if payment is None:
+                if item.payment_id in statuses:
+                    status = statuses[item.payment_id]
+                elif item.payment_id in taken:
+                    status = REFUND.target.value
+                else:
+                    continue
+                results[index] = cls._batch_failure(
+                    item,
+                    "INVALID_PAYMENT_STATE",
+                    f"Payment is {status}; only captured payments can be refunded",
+                )
+                continue
+
+            refund = Refund(
+                id=uuid.uuid4(),
+                payment_id=payment.id,
+                merchant_id=merchant.id,
+                amount=Decimal(item.amount),
+                currency=payment.currency,
+                reason=item.reason,
+                status="processed",
+                idempotency_key=item.idempotency_key,
+            )
+            refunds.append(refund)
+            taken.add(payment.id)
+            idempotency_records.append(
+                IdempotencyKey(
+                    merchant_id=merchant.id,
+                    key=cls._record_key(payment.id, item.idempotency_key),
+                    request_hash=hashes[index],
+                    response_snapshot=str(refund.id),
+                )
+            )
+            results[index] = refund
+
+        if refunds:
+            await RefundRepository.create_many(db, refunds)
+            IdempotencyRepository.add_all(db, idempotency_records)
+
+        for index, result in enumerate(results):
+            if isinstance(result, Refund):
+                results[index] = {
+                    "idempotency_key": result.idempotency_key,
+                    "payment_id": str(result.payment_id),
+                    "status": "created",
+                    "refund": RefundResponse.model_validate(result),
+                }
+            elif result is None:
+                results[index] = cls._batch_failure(
+                    items[index], "NOT_FOUND", "Payment not found"
+                )
+
+        await WebhookService.emit_events(
+            db=db,
+            merchant=merchant,
+            events=[
+                (
+                    "payment.refunded",
+                    {
+                        "payment_id": str(refund.payment_id),
+                        "refund_id": str(refund.id),
+                    },
+                )
+                for refund in refunds
+            ],
+        )
+
+        return {"results": results}
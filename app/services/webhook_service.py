@@ -1,13 +1,14 @@
 import json
-import httpx
-import time
-import hmac
-import hashlib
+from typing import Iterable, List, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
+from app.core.timing import timed
+from app.core.tracing import traced
 from app.db.models.webhook_event import WebhookEvent
+from app.utils.time import utc_now
+from app.workers.webhook_dispatcher import WebhookDispatcher
 
 settings = get_settings()
 
@@ -15,20 +16,34 @@ settings = get_settings()
 class WebhookService:
     """
     Responsible for emitting webhook events.
+
+    In outbox mode (default) the event row is only added to the caller's
+    transaction and delivered later by `WebhookDispatcher`. In inline mode
+    it is also delivered immediately, inside the request.
     """
 
     @staticmethod
-    def _sign_payload(payload: str, secret: str) -> str:
-        timestamp = int(time.time())
-        signed = f"{timestamp}.{payload}".encode("utf-8")
-        signature = hmac.new(
-            secret.encode("utf-8"),
-            signed,
-            hashlib.sha256,
-        ).hexdigest()
-        return f"t={timestamp},v1={signature}"
+    def _build_event(merchant, event_type: str, payload: dict) -> WebhookEvent:
+        body = json.dumps(
+            {
+                "type": event_type,
+                "data": payload,
+            }
+        )
+
+        return WebhookEvent(
+            merchant_id=merchant.id,
+            event_type=event_type,
+            payload=body,
+            target_url=merchant.webhook_url,
+            attempt_count=0,
+            delivered=False,
+            next_attempt_at=utc_now(),
+        )
 
     @classmethod
+    @traced("WebhookService.emit_event")
+    @timed("webhook")
     async def emit_event(
         cls,
         *,
@@ -40,36 +55,52 @@ class WebhookService:
         if not merchant.webhook_url:
             return
 
-        body = json.dumps(
-            {
-                "type": event_type,
-                "data": payload,
-            }
-        )
+        event = cls._build_event(merchant, event_type, payload)
+        db.add(event)
 
-        signature = cls._sign_payload(body, merchant.webhook_secret)
+        if settings.WEBHOOK_DELIVERY_MODE == "outbox":
+            return
 
-        event = WebhookEvent(
-            merchant_id=merchant.id,
-            event_type=event_type,
-            payload=body,
-            target_url=merchant.webhook_url,
-            attempt_count=1,
+        # Batching merchants always receive arrays, even of one event
+        if getattr(merchant, "webhook_batching", False):
+            await WebhookDispatcher.dispatch_batch(
+                db=db,
+                events=[event],
+                webhook_secret=merchant.webhook_secret,
+            )
+            return
+
+        await WebhookDispatcher.dispatch(
+            db=db,
+            event=event,
+            webhook_secret=merchant.webhook_secret,
         )
-        db.add(event)
 
-        async with httpx.AsyncClient(timeout=5) as client:
-            try:
-                response = await client.post(
-                    merchant.webhook_url,
-                    content=body,
-                    headers={
-                        "Content-Type": "application/json",
-                        settings.WEBHOOK_SIGNATURE_HEADER: signature,
-                    },
-                )
-                event.last_status_code = response.status_code
-                event.delivered = response.status_code < 300
-            except Exception:
-                event.last_status_code = None
-                event.delivered = False
+    @classmethod
+    @traced("WebhookService.emit_events")
+    @timed("webhook")
+    async def emit_events(
+        cls,
+        *,
+        db: AsyncSession,
+        merchant,
+        events: Iterable[Tuple[str, dict]],
+    ) -> None:
+        """
+        Bulk variant of `emit_event` for batch APIs: all rows are added in
+        one go (and delivered concurrently in inline mode, as one array per
+        endpoint for batching merchants).
+        """
+        if not merchant.webhook_url:
+            return
+
+        records: List[WebhookEvent] = [
+            cls._build_event(merchant, event_type, payload)
+            for event_type, payload in events
+        ]
+        db.add_all(records)
+
+        if settings.WEBHOOK_DELIVERY_MODE == "outbox":
+            return
+
+        await WebhookDispatcher.dispatch_many(db, records)
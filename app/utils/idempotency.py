@@ -1,12 +1,57 @@
 import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
 from typing import Any
+from uuid import UUID
+
+
+def _canonical_default(value: Any) -> Any:
+    """
+    JSON fallback for types that have several equivalent representations.
+
+    Decimals are normalized so that 500, 500.0 and 500.00 hash identically.
+    """
+    if isinstance(value, Decimal):
+        return format(value.normalize(), "f")
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot canonicalize {type(value).__name__}")
+
+
+_encoder = json.JSONEncoder(
+    sort_keys=True,
+    separators=(",", ":"),
+    ensure_ascii=False,
+    default=_canonical_default,
+)
+
+
+def canonical_json(payload: Any) -> bytes:
+    """
+    Encodes a payload as canonical JSON: sorted keys, no whitespace,
+    normalized decimals. Equal payloads always produce equal bytes.
+    """
+    return _encoder.encode(payload).encode("utf-8")
 
 
 def hash_request_payload(payload: Any) -> str:
     """
     Generates a deterministic hash for a request payload.
 
-    Used to verify idempotency key reuse with identical payloads.
+    Used to verify idempotency key reuse with identical payloads. This is
+    the single hashing scheme shared by payments and refunds.
+    """
+    return hashlib.sha256(canonical_json(payload)).hexdigest()
+
+
+def legacy_request_hash(payload: dict) -> str:
+    """
+    Request hash as written before canonical JSON was introduced.
+
+    Only used to recognise idempotency records stored by older releases;
+    never write new records with it.
     """
-    normalized = str(payload)
-    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return hashlib.sha256(str(sorted(payload.items())).encode("utf-8")).hexdigest()
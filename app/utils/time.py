@@ -15,3 +15,13 @@ def to_isoformat(dt: datetime) -> str:
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
     return dt.isoformat()
+
+
+def to_timestamp(dt: datetime) -> float:
+    """
+    Converts datetime to a POSIX timestamp; naive values (as returned by
+    SQLite) are taken as UTC.
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
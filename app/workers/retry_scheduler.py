@@ -1,12 +1,17 @@
 import asyncio
-from sqlalchemy import select
+import time
+from datetime import timedelta
+from typing import List, Optional, Sequence
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.core.logging import get_logger
 from app.db.models.webhook_event import WebhookEvent
-from app.db.models.merchant import Merchant
-from app.workers.webhook_dispatcher import WebhookDispatcher
+from app.repositories.webhook_event_repository import WebhookEventRepository
+from app.utils.time import to_timestamp, utc_now
+from app.workers.timer_wheel import TimerWheel
+from app.workers.webhook_dispatcher import WORKER_ID, WebhookDispatcher
 
 settings = get_settings()
 logger = get_logger(__name__)
@@ -14,64 +19,166 @@ logger = get_logger(__name__)
 
 class WebhookRetryScheduler:
     """
-    Periodically retries failed webhook deliveries using exponential backoff.
+    Retries failed webhook deliveries using exponential backoff.
+
+    Each failed attempt stores its own `next_attempt_at`, so a cycle only
+    claims events that are already due and delivers them concurrently —
+    nothing sleeps on behalf of an individual event. Claims are leased, so
+    any number of scheduler processes can run against the same database.
     """
 
     @classmethod
-    async def run_once(cls, db: AsyncSession) -> None:
-        """
-        Runs a single retry cycle.
-        """
-        stmt = select(WebhookEvent).where(
-            WebhookEvent.delivered.is_(False),
-            WebhookEvent.attempt_count < settings.WEBHOOK_MAX_RETRIES,
+    async def _cycle(
+        cls,
+        db: AsyncSession,
+        batch_size: int,
+        worker_id: str,
+        event_ids: Optional[Sequence] = None,
+    ) -> List[WebhookEvent]:
+        events = await WebhookEventRepository.claim_due(
+            db,
+            worker_id=worker_id,
+            now=utc_now(),
+            lease_seconds=settings.WEBHOOK_CLAIM_LEASE_SECONDS,
+            max_attempts=settings.WEBHOOK_MAX_RETRIES,
+            limit=batch_size,
+            event_ids=event_ids,
         )
-
-        result = await db.execute(stmt)
-        events = result.scalars().all()
+        await db.commit()
 
         if not events:
-            return
+            return []
 
         logger.info(
             "webhook_retry_cycle_started",
             extra={"pending_events": len(events)},
         )
 
-        for event in events:
-            # Simple exponential backoff
-            backoff_seconds = (
-                settings.WEBHOOK_RETRY_BACKOFF_SECONDS
-                * (2 ** (event.attempt_count - 1))
-            )
-
-            await asyncio.sleep(backoff_seconds)
+        await WebhookDispatcher.dispatch_many(db, events)
+        await db.commit()
 
-            merchant = await db.get(Merchant, event.merchant_id)
-            if not merchant:
-                continue
+        return events
 
-            await WebhookDispatcher.dispatch(
-                db=db,
-                event=event,
-                webhook_secret=merchant.webhook_secret,
-            )
+    @classmethod
+    async def run_once(
+        cls,
+        db: AsyncSession,
+        batch_size: Optional[int] = None,
+        worker_id: str = WORKER_ID,
+    ) -> int:
+        """
+        Runs a single retry cycle.
+        Returns the number of events attempted.
+        """
+        events = await cls._cycle(
+            db, batch_size or settings.WEBHOOK_RETRY_BATCH_SIZE, worker_id
+        )
+        return len(events)
 
     @classmethod
-    async def run_forever(cls, db: AsyncSession, interval_seconds: int = 10) -> None:
+    async def run_forever(
+        cls,
+        db: AsyncSession,
+        interval_seconds: Optional[float] = None,
+        worker_id: str = WORKER_ID,
+    ) -> None:
         """
-        Continuously runs retry cycles.
+        Fires retries at their `next_attempt_at` from a TimerWheel.
         Intended for background worker process.
+
+        Every interval, deadlines up to WEBHOOK_RETRY_HORIZON_SECONDS ahead
+        are loaded from the database (each row once: the load window only
+        moves forward), and a catch-all `run_once` claims anything due that
+        the wheel does not know about, e.g. deadlines another process set
+        inside an already-loaded window. Events this process fails again
+        are put straight back on the wheel.
         """
+        interval = interval_seconds or settings.WEBHOOK_RETRY_INTERVAL_SECONDS
+        batch_size = settings.WEBHOOK_RETRY_BATCH_SIZE
+        horizon = timedelta(seconds=settings.WEBHOOK_RETRY_HORIZON_SECONDS)
+
+        wheel: TimerWheel = TimerWheel(now=time.time())
+        # Keyset position of the last loaded deadline; rows at or before it
+        # are never loaded again
+        loaded = None
+        loaded_until = 0.0
+        next_refresh = 0.0
+
         logger.info("webhook_retry_scheduler_started")
 
         while True:
             try:
-                await cls.run_once(db)
+                if time.monotonic() >= next_refresh:
+                    next_refresh = time.monotonic() + interval
+                    until = utc_now() + horizon
+                    while True:
+                        rows = await WebhookEventRepository.list_retry_deadlines(
+                            db,
+                            after=loaded,
+                            until=until,
+                            max_attempts=settings.WEBHOOK_MAX_RETRIES,
+                            limit=batch_size,
+                        )
+                        for next_attempt_at, event_id in rows:
+                            wheel.schedule(to_timestamp(next_attempt_at), event_id)
+                        if rows:
+                            loaded = rows[-1]
+                            loaded_until = to_timestamp(loaded[0])
+                        if len(rows) < batch_size:
+                            break
+                    await db.commit()
+
+                    await cls.run_once(db, batch_size, worker_id)
+
+                due = wheel.advance(time.time(), limit=batch_size)
+                if due:
+                    events = await cls._cycle(
+                        db, batch_size, worker_id, event_ids=set(due)
+                    )
+                    for event in events:
+                        if event.delivered or event.next_attempt_at is None:
+                            continue
+                        deadline = to_timestamp(event.next_attempt_at)
+                        # Later deadlines are picked up by the window load
+                        if deadline <= loaded_until:
+                            wheel.schedule(deadline, event.id)
+                    if len(due) >= batch_size:
+                        continue
+
             except Exception as exc:
+                await db.rollback()
                 logger.exception(
                     "webhook_retry_scheduler_error",
                     extra={"error": str(exc)},
                 )
 
-            await asyncio.sleep(interval_seconds)
+            wake_at = time.time() + max(next_refresh - time.monotonic(), 0)
+            next_deadline = wheel.next_deadline()
+            if next_deadline is not None:
+                wake_at = min(wake_at, next_deadline)
+            await asyncio.sleep(max(wake_at - time.time(), 0))
+
+
+async def main() -> None:
+    """
+    Worker entrypoint: `python -m app.workers.retry_scheduler`.
+    """
+    from app.core.http_client import close_http_client_pool
+    from app.core.logging import setup_logging
+    from app.core.tracing import setup_tracing, shutdown_tracing
+    from app.db.session import close_db, get_db_session, init_db
+
+    setup_logging()
+    setup_tracing()
+    await init_db()
+    try:
+        async for db in get_db_session():
+            await WebhookRetryScheduler.run_forever(db)
+    finally:
+        await close_http_client_pool()
+        await close_db()
+        shutdown_tracing()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,350 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+from app.core.metrics import registry
+from app.db.session import session_scope
+from app.domain.enums import SimulationScenario
+from app.domain.simulation import SimulationProfile
+from app.domain.state_machine import AUTHORIZE, FAIL, Transition
+from app.repositories.merchant_repository import MerchantRepository
+from app.repositories.payment_repository import PaymentRepository
+from app.services.webhook_service import WebhookService
+from app.utils.time import to_timestamp, utc_now
+from app.workers.timer_wheel import TimerWheel
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# scenario -> (transition, failure_code, failure_message)
+OUTCOMES: Dict[str, Tuple[Transition, Optional[str], Optional[str]]] = {
+    SimulationScenario.SUCCESS.value: (AUTHORIZE, None, None),
+    SimulationScenario.INSUFFICIENT_FUNDS.value: (
+        FAIL,
+        "insufficient_funds",
+        "Card declined: insufficient funds",
+    ),
+    SimulationScenario.NETWORK_TIMEOUT.value: (
+        FAIL,
+        "network_timeout",
+        "Acquirer did not respond in time",
+    ),
+    SimulationScenario.FRAUD_DETECTED.value: (
+        FAIL,
+        "fraud_detected",
+        "Card declined: suspected fraud",
+    ),
+    SimulationScenario.BANK_ERROR.value: (
+        FAIL,
+        "bank_error",
+        "Issuing bank returned an error",
+    ),
+}
+
+# (payment_id, scenario)
+Job = Tuple[object, str]
+
+_SESSION_JOBS_KEY = "simulation_jobs"
+
+
+def resolve_profile(merchant, request) -> Optional[SimulationProfile]:
+    """
+    The request's simulation profile, else the merchant's default.
+    """
+    if getattr(request, "simulation_profile", None) is not None:
+        return request.simulation_profile.to_profile()
+
+    profile = getattr(merchant, "simulation_profile", None)
+    if isinstance(profile, dict):  # ORM merchant rather than a snapshot
+        return SimulationProfile.from_dict(profile)
+    return profile
+
+
+def plan_simulation(
+    scenario: Optional[str],
+    profile: Optional[SimulationProfile],
+    key: str,
+) -> Tuple[Optional[str], Optional[datetime]]:
+    """
+    Returns (scenario, due_at) for a new payment; due_at is None when the
+    payment is not simulated. Stored on the payment so a restart can
+    resume it.
+
+    Without a profile only payments with an explicit scenario are
+    simulated, after a uniform SIMULATION_*_LATENCY_SECONDS delay. With one,
+    the profile decides (see SimulationProfile.plan); `key` is the
+    payment's idempotency key, which seeded profiles derive their draws from.
+    """
+    if not settings.SIMULATION_ENABLED:
+        return scenario, None
+
+    if profile is not None:
+        scenario, delay = profile.plan(key, scenario)
+    elif scenario is None:
+        return None, None
+    elif scenario == SimulationScenario.NETWORK_TIMEOUT.value:
+        delay = settings.SIMULATION_TIMEOUT_SECONDS
+    else:
+        delay = random.uniform(
+            settings.SIMULATION_MIN_LATENCY_SECONDS,
+            settings.SIMULATION_MAX_LATENCY_SECONDS,
+        )
+    return scenario, utc_now() + timedelta(seconds=delay)
+
+
+class SimulationEngine:
+    """
+    Advances simulated payments out of CREATED once their acquirer latency
+    has elapsed.
+
+    Jobs sit in an in-process TimerWheel; one task sleeps until the next
+    bucket is due, then applies everything due in a single session with
+    one conditional UPDATE per scenario. No request coroutine or DB
+    session is held while a payment waits, so in-flight payments cost one
+    wheel entry each.
+
+    The wheel is only an accelerator: `simulation_due_at` is persisted, so
+    payments are reloaded on start and overdue ones are picked up by a
+    periodic sweep. The conditional UPDATE makes a job applied twice (by
+    the sweep, or by several processes) a no-op.
+    """
+
+    def __init__(self, batch_size: int, sweep_interval_seconds: float):
+        self.batch_size = batch_size
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._wheel: TimerWheel[Job] = TimerWheel(now=time.time())
+        self._wakeup = asyncio.Event()
+        self._wake_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._wheel)
+
+    def schedule(self, payment_id, scenario: str, due_at: datetime) -> None:
+        deadline = to_timestamp(due_at)
+        self._wheel.schedule(deadline, (payment_id, scenario))
+        if deadline < self._wake_at:
+            self._wakeup.set()
+
+    # -------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        logger.info("simulation_engine_started")
+
+        # Resume everything still pending from before the (re)start
+        await self._load(due_before=None)
+        next_sweep = time.monotonic() + self.sweep_interval_seconds
+
+        while True:
+            self._wakeup.clear()
+
+            if time.monotonic() >= next_sweep:
+                # Only payments overdue by a full interval; anything newer
+                # is most likely still in some process's wheel
+                await self._load(
+                    due_before=utc_now()
+                    - timedelta(seconds=self.sweep_interval_seconds)
+                )
+                next_sweep = time.monotonic() + self.sweep_interval_seconds
+
+            due = self._pop_due(time.time())
+            if due:
+                try:
+                    await self.apply(due)
+                except Exception as exc:
+                    # Rows stay CREATED with their due time; the sweep retries
+                    logger.exception(
+                        "simulation_engine_error", extra={"error": str(exc)}
+                    )
+                if len(due) >= self.batch_size:
+                    continue
+
+            timeout = next_sweep - time.monotonic()
+            next_deadline = self._wheel.next_deadline()
+            if next_deadline is not None:
+                timeout = min(timeout, next_deadline - time.time())
+            self._wake_at = time.time() + timeout
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def _pop_due(self, now: float) -> List[Job]:
+        return self._wheel.advance(now, limit=self.batch_size)
+
+    async def _load(self, due_before: Optional[datetime]) -> None:
+        """
+        Schedules pending payments from the database on the wheel.
+        """
+        after = None
+        loaded = 0
+        try:
+            async with session_scope() as db:
+                while True:
+                    rows = await PaymentRepository.list_pending_simulations(
+                        db, limit=self.batch_size, due_before=due_before, after=after
+                    )
+                    for payment_id, scenario, due_at in rows:
+                        self.schedule(payment_id, scenario, due_at)
+                    loaded += len(rows)
+                    if len(rows) < self.batch_size:
+                        break
+                    after = (rows[-1][2], rows[-1][0])
+        except Exception as exc:
+            logger.exception("simulation_load_failed", extra={"error": str(exc)})
+
+        if loaded:
+            logger.info("simulation_jobs_loaded", extra={"jobs": loaded})
+
+    # -------------------------------------------------
+    # Outcomes
+    # -------------------------------------------------
+    @classmethod
+    async def apply(cls, jobs: Iterable[Job]) -> int:
+        """
+        Applies the outcome of each job and emits `payment.failed` for
+        failures. Returns the number of payments advanced.
+        """
+        by_scenario: Dict[str, List] = defaultdict(list)
+        for payment_id, scenario in jobs:
+            by_scenario[scenario].append(payment_id)
+
+        advanced = 0
+        async with session_scope() as db:
+            failed = []
+            for scenario, payment_ids in by_scenario.items():
+                outcome = OUTCOMES.get(scenario)
+                if outcome is None:
+                    continue
+                transition, failure_code, failure_message = outcome
+
+                values = {"simulation_due_at": None}
+                if failure_code is not None:
+                    values.update(
+                        failure_code=failure_code, failure_message=failure_message
+                    )
+                payments = await PaymentRepository.transition_by_ids(
+                    db, payment_ids, transition, **values
+                )
+                advanced += len(payments)
+                if transition is FAIL:
+                    failed.extend(payments)
+
+            await cls._emit_failures(db, failed)
+
+        return advanced
+
+    @staticmethod
+    async def _emit_failures(db: AsyncSession, payments: List) -> None:
+        if not payments:
+            return
+
+        by_merchant: Dict[object, List] = defaultdict(list)
+        for payment in payments:
+            by_merchant[payment.merchant_id].append(payment)
+
+        merchants = await MerchantRepository.get_many_by_ids(db, by_merchant)
+        for merchant_id, merchant_payments in by_merchant.items():
+            await WebhookService.emit_events(
+                db=db,
+                merchant=merchants[merchant_id],
+                events=[
+                    (
+                        "payment.failed",
+                        {
+                            "payment_id": str(payment.id),
+                            "status": payment.status,
+                            "failure_code": payment.failure_code,
+                        },
+                    )
+                    for payment in merchant_payments
+                ],
+            )
+
+
+# -------------------------------------------------
+# Scheduling on commit
+# -------------------------------------------------
+def schedule_after_commit(db: AsyncSession, payments: Iterable) -> None:
+    """
+    Queues simulated payments for the engine once `db` commits, so a job
+    never fires before its row is visible. Dropped on rollback.
+    """
+    jobs = [
+        (payment.id, payment.simulation_scenario, payment.simulation_due_at)
+        for payment in payments
+        if payment.simulation_due_at is not None
+    ]
+    if jobs:
+        db.sync_session.info.setdefault(_SESSION_JOBS_KEY, []).extend(jobs)
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_committed(session: Session) -> None:
+    jobs = session.info.pop(_SESSION_JOBS_KEY, None)
+    if jobs and _engine is not None:
+        for job in jobs:
+            _engine.schedule(*job)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_SESSION_JOBS_KEY, None)
+
+
+# -------------------------------------------------
+# Process-wide engine
+# -------------------------------------------------
+_engine: Optional[SimulationEngine] = None
+
+
+def start_simulation_engine() -> None:
+    """
+    Starts the engine in the running loop. Called once from `lifespan`;
+    a no-op when SIMULATION_ENABLED is off.
+    """
+    global _engine
+
+    if not settings.SIMULATION_ENABLED or _engine is not None:
+        return
+
+    _engine = SimulationEngine(
+        batch_size=settings.SIMULATION_BATCH_SIZE,
+        sweep_interval_seconds=settings.SIMULATION_SWEEP_INTERVAL_SECONDS,
+    )
+    _engine.start()
+
+
+async def stop_simulation_engine() -> None:
+    global _engine
+
+    if _engine is not None:
+        engine, _engine = _engine, None
+        await engine.stop()
+
+
+registry.gauge(
+    "simulation_pending_jobs",
+    "Simulated payments waiting in this process's engine",
+    callback=lambda: {(): len(_engine)} if _engine is not None else {},
+)
@@ -0,0 +1,161 @@
+import math
+from array import array
+from typing import Any, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Slot:
+    """Deadlines in a flat float array, items in a parallel list."""
+
+    __slots__ = ("deadlines", "items")
+
+    def __init__(self):
+        self.deadlines = array("d")
+        self.items: List[Any] = []
+
+    def append(self, deadline: float, item: Any) -> None:
+        self.deadlines.append(deadline)
+        self.items.append(item)
+
+    def drain(self) -> Tuple[array, List[Any]]:
+        deadlines, items = self.deadlines, self.items
+        self.deadlines = array("d")
+        self.items = []
+        return deadlines, items
+
+
+class TimerWheel(Generic[T]):
+    """
+    Hierarchical timing wheel for "run this at time T" over very many
+    deadlines.
+
+    Level 0 has `slots` buckets of one tick each; every level above covers
+    `slots` times the span of the one below (with the defaults: 10 ms
+    ticks, 256 slots, 4 levels, about 1.4 years). Scheduling is O(1).
+    Advancing fires whole level-0 buckets and, once per rotation, cascades
+    the next bucket of the level above into finer ones, so each item is
+    moved at most `levels - 1` times. Deadlines beyond the top level wait
+    in its farthest bucket and are re-filed when it cascades.
+
+    Items are stored without per-entry objects: one float per deadline in
+    an `array('d')` plus a reference in a parallel list.
+
+    Not thread-safe; meant to be driven by one asyncio task.
+    """
+
+    def __init__(
+        self,
+        tick_seconds: float = 0.01,
+        slots: int = 256,
+        levels: int = 4,
+        now: float = 0.0,
+    ):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        if levels < 2:
+            # Capped deadlines are only re-filed when the top level cascades
+            raise ValueError("levels must be at least 2")
+
+        self.tick_seconds = tick_seconds
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._levels = [[_Slot() for _ in range(slots)] for _ in range(levels)]
+        self._max_delta = (1 << (self._bits * levels)) - 1
+        self._tick = self._to_tick(now)
+        # Deadlines already past when scheduled, fired on the next advance
+        self._expired = _Slot()
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _to_tick(self, timestamp: float) -> int:
+        return math.floor(timestamp / self.tick_seconds)
+
+    # -------------------------------------------------
+    # Scheduling
+    # -------------------------------------------------
+    def schedule(self, deadline: float, item: T) -> None:
+        self._count += 1
+        self._file(deadline, item)
+
+    def _file(self, deadline: float, item: Any) -> None:
+        target = math.ceil(deadline / self.tick_seconds)
+        delta = target - self._tick
+        if delta <= 0:
+            self._expired.append(deadline, item)
+            return
+
+        if delta > self._max_delta:
+            target = self._tick + self._max_delta
+            delta = self._max_delta
+
+        level = 0
+        while delta >> (self._bits * (level + 1)):
+            level += 1
+        index = (target >> (self._bits * level)) & self._mask
+        self._levels[level][index].append(deadline, item)
+
+    # -------------------------------------------------
+    # Firing
+    # -------------------------------------------------
+    def advance(self, now: float, limit: Optional[int] = None) -> List[T]:
+        """
+        Moves the wheel to `now` and returns the items that fell due, in
+        batches of whole buckets. With `limit`, stops after the bucket
+        that reaches it; the next call resumes from there.
+        """
+        fired: List[T] = []
+
+        _, items = self._expired.drain()
+        fired.extend(items)
+
+        target = self._to_tick(now)
+        if self._count == len(fired):
+            # Nothing left in the wheel: jump instead of walking empty ticks
+            self._tick = max(self._tick, target)
+
+        while self._tick < target and (limit is None or len(fired) < limit):
+            self._tick += 1
+            self._cascade()
+            _, items = self._levels[0][self._tick & self._mask].drain()
+            fired.extend(items)
+            # Cascaded items due exactly at this tick
+            _, items = self._expired.drain()
+            fired.extend(items)
+            if self._count == len(fired):
+                self._tick = max(self._tick, target)
+
+        self._count -= len(fired)
+        return fired
+
+    def _cascade(self) -> None:
+        tick = self._tick
+        for level in range(1, len(self._levels)):
+            if (tick >> (self._bits * (level - 1))) & self._mask:
+                return
+            index = (tick >> (self._bits * level)) & self._mask
+            deadlines, items = self._levels[level][index].drain()
+            for deadline, item in zip(deadlines, items):
+                self._file(deadline, item)
+
+    def next_deadline(self) -> Optional[float]:
+        """
+        Earliest time worth waking up for: the next non-empty level-0
+        bucket, or the next cascade if level 0 is empty. None when empty.
+        """
+        if self._count == 0:
+            return None
+        if self._expired.items:
+            return 0.0
+
+        level0 = self._levels[0]
+        for offset in range(1, self._mask + 2):
+            tick = self._tick + offset
+            if level0[tick & self._mask].items:
+                return tick * self.tick_seconds
+            if not tick & self._mask:
+                # Next rotation starts with a cascade that may refill level 0
+                return tick * self.tick_seconds
+        return None
@@ -1,22 +1,48 @@
-import httpx
+import asyncio
 import hmac
 import hashlib
+import os
+import socket
 import time
-from typing import Optional
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.circuit_breaker import CircuitBreaker, get_circuit_breaker
 from app.core.config import get_settings
+from app.core.http_client import get_http_client_pool
 from app.core.logging import get_logger
+from app.core.metrics import (
+    webhook_batch_size,
+    webhook_deliveries,
+    webhook_delivery_duration,
+)
+from app.core.tracing import span, traced
+from app.db.models.merchant import Merchant
 from app.db.models.webhook_event import WebhookEvent
+from app.repositories.webhook_event_repository import WebhookEventRepository
+from app.utils.time import to_timestamp, utc_now
 
 settings = get_settings()
 logger = get_logger(__name__)
 
+# Identifies this process in webhook_events.claimed_by
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Number of events in a batched delivery's JSON array
+BATCH_SIZE_HEADER = "X-Webhook-Batch-Size"
+
 
 class WebhookDispatcher:
     """
-    Responsible for delivering a single webhook event.
+    Responsible for delivering webhook events.
+
+    `dispatch` delivers a single event, `dispatch_batch` several events for
+    one endpoint as a JSON array. `dispatch_pending` / `run_forever`
+    drain the transactional outbox written by `WebhookService.emit_event`.
     """
 
     @staticmethod
@@ -35,7 +61,106 @@ class WebhookDispatcher:
 
         return f"t={timestamp},v1={signature}"
 
+    @staticmethod
+    def next_attempt_at(attempt_count: int, now: datetime) -> Optional[datetime]:
+        """
+        Exponential backoff after `attempt_count` failed attempts.
+        Returns None once retries are exhausted.
+        """
+        if attempt_count >= settings.WEBHOOK_MAX_RETRIES:
+            return None
+
+        backoff_seconds = settings.WEBHOOK_RETRY_BACKOFF_SECONDS * (
+            2 ** (attempt_count - 1)
+        )
+        return now + timedelta(seconds=backoff_seconds)
+
+    @classmethod
+    def _record_attempt(cls, event: WebhookEvent, status_code: Optional[int]) -> str:
+        """
+        Records one finished attempt (`status_code` None on a transport
+        error), schedules the retry and releases the lease. Returns the
+        outcome label.
+        """
+        event.attempt_count += 1
+        event.last_status_code = status_code
+        event.delivered = status_code is not None and status_code < 300
+        event.last_attempt_at = utc_now()
+        event.next_attempt_at = (
+            None
+            if event.delivered
+            else cls.next_attempt_at(event.attempt_count, event.last_attempt_at)
+        )
+
+        # Attempt finished: release the lease
+        event.claimed_by = None
+        event.lease_expires_at = None
+
+        if event.delivered:
+            return "delivered"
+        return "error" if status_code is None else "rejected"
+
+    # -------------------------------------------------
+    # Circuit Breaking
+    # -------------------------------------------------
+    @staticmethod
+    def _admit(target_url: str) -> Tuple[Optional[CircuitBreaker], str, bool]:
+        """
+        Returns (breaker, host, allowed) for a delivery to `target_url`;
+        breaker is None when circuit breaking is disabled.
+        """
+        breaker = get_circuit_breaker()
+        if breaker is None:
+            return None, "", True
+        host = breaker.host_of(target_url)
+        return breaker, host, breaker.allow(host)
+
+    @staticmethod
+    def _record_circuit(
+        breaker: Optional[CircuitBreaker],
+        host: str,
+        status_code: Optional[int],
+    ) -> None:
+        if breaker is None:
+            return
+        # 4xx means the endpoint is up, just unhappy with the event
+        if status_code is None or status_code >= 500:
+            breaker.record_failure(host)
+        else:
+            breaker.record_success(host)
+
+    @classmethod
+    def _short_circuit(
+        cls,
+        db: AsyncSession,
+        events: List[WebhookEvent],
+        breaker: CircuitBreaker,
+        host: str,
+    ) -> None:
+        """
+        Defers deliveries refused by an open circuit until it lets requests
+        through again. Nothing was sent, so this is not an attempt:
+        `attempt_count` is untouched and short circuits never use up retries.
+        Deferred first attempts are claimed again by `dispatch_pending` (in
+        inline mode too), deferred retries by the retry scheduler.
+        """
+        retry_at = utc_now() + timedelta(
+            seconds=max(breaker.retry_in(host), settings.WEBHOOK_RETRY_BACKOFF_SECONDS)
+        )
+        for event in events:
+            event.next_attempt_at = retry_at
+            event.claimed_by = None
+            event.lease_expires_at = None
+        db.add_all(events)
+
+        webhook_deliveries.inc("short_circuited", amount=len(events))
+        logger.info(
+            "webhook_short_circuited",
+            extra={"host": host, "events": len(events)},
+        )
+
     @classmethod
+    @traced("WebhookDispatcher.dispatch")
     async def dispatch(
         cls,
         *,
@@ -46,14 +171,21 @@ class WebhookDispatcher:
         """
         Attempts to deliver a webhook event.
         """
+        breaker, host, allowed = cls._admit(event.target_url)
+        if not allowed:
+            cls._short_circuit(db, [event], breaker, host)
+            return
+
         signature = cls._sign_payload(
             event.payload,
             webhook_secret,
         )
 
-        async with httpx.AsyncClient(timeout=5) as client:
-            try:
-                response = await client.post(
+        status_code = None
+        started = time.perf_counter()
+        try:
+            with span("webhook.http_post", event_type=event.event_type) as post_span:
+                response = await get_http_client_pool().post(
                     event.target_url,
                     content=event.payload,
                     headers={
@@ -61,33 +193,370 @@ class WebhookDispatcher:
                         settings.WEBHOOK_SIGNATURE_HEADER: signature,
                     },
                 )
+                post_span.set_attribute("http.status_code", response.status_code)
+            status_code = response.status_code
+
+            outcome = cls._record_attempt(event, status_code)
+
+            logger.info(
+                "webhook_dispatched",
+                extra={
+                    "event_id": str(event.id),
+                    "status_code": response.status_code,
+                    "delivered": event.delivered,
+                },
+            )
+
+        except Exception as exc:
+            outcome = cls._record_attempt(event, None)
+
+            logger.warning(
+                "webhook_dispatch_failed",
+                extra={
+                    "event_id": str(event.id),
+                    "error": str(exc),
+                },
+            )
+
+        cls._record_circuit(breaker, host, status_code)
+        webhook_deliveries.inc(outcome)
+        webhook_delivery_duration.observe(time.perf_counter() - started, outcome)
+
+        db.add(event)
+
+    @classmethod
+    @traced("WebhookDispatcher.dispatch_batch")
+    async def dispatch_batch(
+        cls,
+        *,
+        db: AsyncSession,
+        events: List[WebhookEvent],
+        webhook_secret: str,
+    ) -> None:
+        """
+        Delivers events bound for one endpoint in a single request.
 
-                event.attempt_count += 1
-                event.last_status_code = response.status_code
-                event.delivered = response.status_code < 300
-                event.last_attempt_at = time.time()
-
-                logger.info(
-                    "webhook_dispatched",
-                    extra={
-                        "event_id": str(event.id),
-                        "status_code": response.status_code,
-                        "delivered": event.delivered,
+        The body is a JSON array of the stored payloads, signed as a whole;
+        the endpoint's response applies to every event in it.
+        """
+        breaker, host, allowed = cls._admit(events[0].target_url)
+        if not allowed:
+            cls._short_circuit(db, events, breaker, host)
+            return
+
+        payload = "[" + ",".join(event.payload for event in events) + "]"
+        signature = cls._sign_payload(payload, webhook_secret)
+
+        status_code = None
+        started = time.perf_counter()
+        try:
+            with span("webhook.http_post", batch_size=len(events)) as post_span:
+                response = await get_http_client_pool().post(
+                    events[0].target_url,
+                    content=payload,
+                    headers={
+                        "Content-Type": "application/json",
+                        settings.WEBHOOK_SIGNATURE_HEADER: signature,
+                        BATCH_SIZE_HEADER: str(len(events)),
                     },
                 )
+                post_span.set_attribute("http.status_code", response.status_code)
+            status_code = response.status_code
+
+            logger.info(
+                "webhook_batch_dispatched",
+                extra={
+                    "events": len(events),
+                    "status_code": status_code,
+                    "delivered": status_code < 300,
+                },
+            )
+
+        except Exception as exc:
+            logger.warning(
+                "webhook_batch_dispatch_failed",
+                extra={
+                    "events": len(events),
+                    "error": str(exc),
+                },
+            )
+
+        cls._record_circuit(breaker, host, status_code)
+        for event in events:
+            outcome = cls._record_attempt(event, status_code)
+        db.add_all(events)
+
+        webhook_deliveries.inc(outcome, amount=len(events))
+        webhook_delivery_duration.observe(time.perf_counter() - started, outcome)
+        webhook_batch_size.observe(len(events))
+
+    # -------------------------------------------------
+    # Batching
+    # -------------------------------------------------
+    @staticmethod
+    async def _merchant_settings(
+        db: AsyncSession,
+        events: Iterable[WebhookEvent],
+    ) -> Dict[object, Tuple[str, bool]]:
+        """
+        Returns {merchant_id: (webhook_secret, webhook_batching)}.
+        """
+        merchant_ids = {event.merchant_id for event in events}
+        if not merchant_ids:
+            return {}
+
+        result = await db.execute(
+            select(
+                Merchant.id, Merchant.webhook_secret, Merchant.webhook_batching
+            ).where(Merchant.id.in_(merchant_ids))
+        )
+        return {
+            merchant_id: (secret, bool(batching))
+            for merchant_id, secret, batching in result.all()
+        }
+
+    @staticmethod
+    def _abandon(db: AsyncSession, events: List[WebhookEvent]) -> None:
+        """
+        Gives up on events whose merchant no longer exists: without its
+        secret they can never be signed. Marking retries as exhausted takes
+        them out of every claim query instead of leaving them leased.
+        """
+        for event in events:
+            event.attempt_count = max(
+                event.attempt_count, settings.WEBHOOK_MAX_RETRIES
+            )
+            event.next_attempt_at = None
+            event.claimed_by = None
+            event.lease_expires_at = None
+        db.add_all(events)
+
+        webhook_deliveries.inc("abandoned", amount=len(events))
+        logger.warning(
+            "webhook_merchant_missing",
+            extra={"event_ids": [str(event.id) for event in events]},
+        )
+
+    @staticmethod
+    def _group_by_endpoint(
+        events: Iterable[WebhookEvent],
+    ) -> Dict[Tuple[object, str], List[WebhookEvent]]:
+        groups: Dict[Tuple[object, str], List[WebhookEvent]] = defaultdict(list)
+        for event in events:
+            groups[(event.merchant_id, event.target_url)].append(event)
+        return groups
+
+    @staticmethod
+    def _chunk(events: List[WebhookEvent]) -> List[List[WebhookEvent]]:
+        """
+        Splits one endpoint's events into batches within
+        WEBHOOK_BATCH_MAX_EVENTS and WEBHOOK_BATCH_MAX_BYTES. An event
+        larger than the byte limit on its own is sent alone.
+        """
+        max_events = settings.WEBHOOK_BATCH_MAX_EVENTS
+        max_bytes = settings.WEBHOOK_BATCH_MAX_BYTES
+
+        batches: List[List[WebhookEvent]] = []
+        batch: List[WebhookEvent] = []
+        size = 2  # brackets
+        for event in events:
+            # Payload plus its separating comma
+            event_size = len(event.payload.encode("utf-8")) + 1
+            if batch and (len(batch) >= max_events or size + event_size > max_bytes):
+                batches.append(batch)
+                batch, size = [], 2
+            batch.append(event)
+            size += event_size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @classmethod
+    def _lingering(
+        cls,
+        events: Iterable[WebhookEvent],
+        merchants: Dict[object, Tuple[str, bool]],
+        now: datetime,
+    ) -> List[WebhookEvent]:
+        """
+        Events of batching merchants whose endpoint group is not yet full
+        and whose oldest event is younger than WEBHOOK_BATCH_LINGER_SECONDS:
+        worth holding back briefly for more to arrive.
+        """
+        cutoff = to_timestamp(now) - settings.WEBHOOK_BATCH_LINGER_SECONDS
+
+        lingering: List[WebhookEvent] = []
+        for (merchant_id, _), group in cls._group_by_endpoint(events).items():
+            batching = merchants.get(merchant_id, (None, False))[1]
+            if (
+                batching
+                and len(group) < settings.WEBHOOK_BATCH_MAX_EVENTS
+                and min(to_timestamp(event.created_at) for event in group) > cutoff
+            ):
+                lingering.extend(group)
+        return lingering
+
+    @classmethod
+    async def dispatch_many(
+        cls,
+        db: AsyncSession,
+        events: Iterable[WebhookEvent],
+        merchants: Optional[Dict[object, Tuple[str, bool]]] = None,
+    ) -> None:
+        """
+        Delivers events concurrently.
+
+        Events of merchants with `webhook_batching` enabled are coalesced
+        per endpoint (see `dispatch_batch`); the rest go one per request.
+
+        Parallelism is bounded globally and per merchant, so a merchant whose
+        endpoint hangs until timeout only ties up its own slots. Deliveries
+        perform no database I/O, so the tasks can share one session.
+        `merchants` is the output of `_merchant_settings`, if already loaded.
+        """
+        events = list(events)
+        if not events:
+            return
+
+        if merchants is None:
+            merchants = await cls._merchant_settings(db, events)
+
+        global_slots = asyncio.Semaphore(settings.WEBHOOK_DISPATCH_CONCURRENCY)
+        merchant_slots: Dict[object, asyncio.Semaphore] = {
+            merchant_id: asyncio.Semaphore(
+                settings.WEBHOOK_DISPATCH_PER_MERCHANT_CONCURRENCY
+            )
+            for merchant_id in merchants
+        }
+
+        async def _deliver(event: WebhookEvent, secret: str) -> None:
+            async with merchant_slots[event.merchant_id], global_slots:
+                await cls.dispatch(db=db, event=event, webhook_secret=secret)
+
+        async def _deliver_batch(batch: List[WebhookEvent], secret: str) -> None:
+            async with merchant_slots[batch[0].merchant_id], global_slots:
+                await cls.dispatch_batch(db=db, events=batch, webhook_secret=secret)
 
+        deliveries = []
+        batched: List[WebhookEvent] = []
+        orphaned: List[WebhookEvent] = []
+        for event in events:
+            if event.merchant_id not in merchants:
+                orphaned.append(event)
+                continue
+            secret, batching = merchants[event.merchant_id]
+            if batching:
+                batched.append(event)
+            else:
+                deliveries.append(_deliver(event, secret))
+
+        for (merchant_id, _), group in cls._group_by_endpoint(batched).items():
+            secret = merchants[merchant_id][0]
+            deliveries.extend(
+                _deliver_batch(batch, secret) for batch in cls._chunk(group)
+            )
+
+        if orphaned:
+            cls._abandon(db, orphaned)
+
+        await asyncio.gather(*deliveries)
+
+    # -------------------------------------------------
+    # Outbox Draining
+    # -------------------------------------------------
+    @classmethod
+    async def dispatch_pending(
+        cls,
+        db: AsyncSession,
+        batch_size: Optional[int] = None,
+        worker_id: str = WORKER_ID,
+    ) -> int:
+        """
+        Claims and delivers one batch of never-attempted outbox events.
+
+        The claim is committed before any HTTP call so other dispatcher
+        processes skip these rows. Partial batches of batching merchants
+        still within their linger time are released again in the same
+        transaction. Failed deliveries are left for `WebhookRetryScheduler`.
+        Returns the number of events processed.
+        """
+        now = utc_now()
+        events = await WebhookEventRepository.claim_pending(
+            db,
+            worker_id=worker_id,
+            now=now,
+            lease_seconds=settings.WEBHOOK_CLAIM_LEASE_SECONDS,
+            limit=batch_size or settings.WEBHOOK_DISPATCH_BATCH_SIZE,
+        )
+
+        merchants = await cls._merchant_settings(db, events)
+        lingering = cls._lingering(events, merchants, now)
+        if lingering:
+            await WebhookEventRepository.release(
+                db, [event.id for event in lingering], worker_id
+            )
+            held = {id(event) for event in lingering}
+            events = [event for event in events if id(event) not in held]
+        await db.commit()
+
+        if not events:
+            return 0
+
+        await cls.dispatch_many(db, events, merchants)
+        await db.commit()
+        return len(events)
+
+    @classmethod
+    async def run_forever(
+        cls,
+        db: AsyncSession,
+        interval_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        Continuously drains the outbox.
+        Intended for background worker process.
+        """
+        interval = interval_seconds or settings.WEBHOOK_DISPATCH_INTERVAL_SECONDS
+        batch_size = settings.WEBHOOK_DISPATCH_BATCH_SIZE
+
+        logger.info("webhook_dispatcher_started")
+
+        while True:
+            processed = 0
+            try:
+                processed = await cls.dispatch_pending(db, batch_size)
             except Exception as exc:
-                event.attempt_count += 1
-                event.delivered = False
-                event.last_status_code = None
-                event.last_attempt_at = time.time()
-
-                logger.warning(
-                    "webhook_dispatch_failed",
-                    extra={
-                        "event_id": str(event.id),
-                        "error": str(exc),
-                    },
+                await db.rollback()
+                logger.exception(
+                    "webhook_dispatcher_error",
+                    extra={"error": str(exc)},
                 )
 
-        db.add(event)
+            # A full batch means there is likely more work queued
+            if processed < batch_size:
+                await asyncio.sleep(interval)
+
+
+async def main() -> None:
+    """
+    Worker entrypoint: `python -m app.workers.webhook_dispatcher`.
+    """
+    from app.core.http_client import close_http_client_pool
+    from app.core.logging import setup_logging
+    from app.core.tracing import setup_tracing, shutdown_tracing
+    from app.db.session import close_db, get_db_session, init_db
+
+    setup_logging()
+    setup_tracing()
+    await init_db()
+    try:
+        async for db in get_db_session():
+            await WebhookDispatcher.run_forever(db)
+    finally:
+        await close_http_client_pool()
+        await close_db()
+        shutdown_tracing()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+"""
+Benchmark: per-call cost of the in-process metrics on the request hot path.
+
+Usage:
+    python -m benchmarks.bench_metrics [iterations]
+
+Times one histogram observation (as done once per request by the
+middleware) and one counter increment, and prints nanoseconds per call.
+"""
+import sys
+import time
+
+from app.core.metrics import MetricsRegistry
+
+
+def _time(label: str, fn, iterations: int) -> None:
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed / iterations * 1e9:8.0f} ns/call")
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        "bench_duration_seconds", "bench", ("method", "route", "status")
+    )
+    counter = registry.counter("bench_total", "bench", ("outcome",))
+    routes = [f"/api/v1/route{i}" for i in range(20)]
+
+    _time(
+        "histogram.observe",
+        lambda i: histogram.observe(i % 1000 / 10_000, "POST", routes[i % 20], "200"),
+        iterations,
+    )
+    _time("counter.inc", lambda i: counter.inc("delivered"), iterations)
+
+    started = time.perf_counter()
+    registry.render()
+    print(f"{'render (20 series)':<28} {(time.perf_counter() - started) * 1e6:8.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: memory and per-check cost of the in-process rate limiter under
+a flood of distinct clients.
+
+Usage:
+    python -m benchmarks.bench_rate_limiter [distinct_clients]
+
+Runs the bounded TokenBucketRateLimiter next to a copy of the previous
+fixed-window store (one "key:window" entry per client per window, never
+evicted) and prints traced memory as the number of clients grows.
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+
+from app.core.rate_limiter import TokenBucketRateLimiter
+
+
+class LegacyFixedWindow:
+    """The unbounded store this benchmark replaced (for comparison)."""
+
+    def __init__(self, max_requests: int, window_seconds: int):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self._store = {}
+
+    async def hit(self, key: str) -> bool:
+        window = int(time.time()) // self.window_seconds
+        store_key = f"{key}:{window}"
+        count, _ = self._store.get(store_key, (0, window))
+        if count >= self.max_requests:
+            return False
+        self._store[store_key] = (count + 1, window)
+        return True
+
+
+async def _flood(limiter, clients: int, checkpoints: int = 5) -> None:
+    step = clients // checkpoints
+    keys = [f"sk_test_{i:032x}" for i in range(step)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for checkpoint in range(1, checkpoints + 1):
+        prefix = f"{checkpoint}:"
+        for key in keys:
+            await limiter.hit(prefix + key)
+        current, _ = tracemalloc.get_traced_memory()
+        print(
+            f"  {checkpoint * step:>10,} clients  "
+            f"{current / 1024 / 1024:>8.1f} MiB traced"
+        )
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    print(f"  {elapsed / clients * 1e9:>10.0f} ns/check (under tracemalloc)")
+
+
+def main(clients: int = 1_000_000) -> None:
+    print("legacy fixed window (unbounded):")
+    asyncio.run(_flood(LegacyFixedWindow(100, 60), clients))
+
+    print("token bucket (max_keys=100,000):")
+    asyncio.run(_flood(TokenBucketRateLimiter(100, 60, max_keys=100_000), clients))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,55 @@
+"""
+Micro-benchmark: per-request cost of idempotency request hashing.
+
+Usage:
+    python -m benchmarks.bench_request_hash [iterations]
+
+Compares the canonical hasher in app.utils.idempotency with the two ad-hoc
+schemes it replaced.
+"""
+import hashlib
+import sys
+import timeit
+from decimal import Decimal
+
+from app.schemas.payment import PaymentCreateRequest
+from app.utils.idempotency import canonical_json, hash_request_payload
+
+REQUEST = PaymentCreateRequest(
+    amount=Decimal("1500.00"),
+    currency="JPY",
+    external_reference="order-000123",
+    simulation="success",
+)
+PAYLOAD = REQUEST.model_dump()
+RAW_BODY = REQUEST.model_dump_json().encode("utf-8")
+
+
+def legacy_service_hash() -> str:
+    return hashlib.sha256(str(sorted(PAYLOAD.items())).encode("utf-8")).hexdigest()
+
+
+def legacy_util_hash() -> str:
+    return hashlib.sha256(str(PAYLOAD).encode("utf-8")).hexdigest()
+
+
+CASES = {
+    "legacy str(sorted(items))": legacy_service_hash,
+    "legacy str(payload)": legacy_util_hash,
+    "model_dump + canonical": lambda: hash_request_payload(REQUEST.model_dump()),
+    "canonical (pre-dumped)": lambda: hash_request_payload(PAYLOAD),
+    # Lower bound: hashing the raw body without parsing or canonicalizing
+    "raw body bytes": lambda: hashlib.sha256(RAW_BODY).hexdigest(),
+}
+
+
+def main(iterations: int = 100_000) -> None:
+    print(f"canonical encoding: {canonical_json(PAYLOAD).decode()}")
+    print(f"{'case':<28} {'ns/op':>10}")
+    for name, fn in CASES.items():
+        seconds = min(timeit.repeat(fn, number=iterations, repeat=3))
+        print(f"{name:<28} {seconds / iterations * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
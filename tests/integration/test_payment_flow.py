@@ -1,9 +1,18 @@
+import json
+import time
+import uuid
 import pytest
 from decimal import Decimal
 
+from app.core.exceptions import IdempotencyConflictError
 from app.services.merchant_service import MerchantService
 from app.services.payment_service import PaymentService
-from app.schemas.payment import PaymentCreateRequest
+from app.services.refund_service import RefundService
+from app.repositories.merchant_repository import MerchantRepository
+from app.schemas.payment import PaymentBatchItem, PaymentCreateRequest
+from app.schemas.refund import RefundBatchItem
+from app.db.models.webhook_event import WebhookEvent
+from sqlalchemy import delete, select
 
 
 @pytest.mark.asyncio
@@ -60,3 +69,499 @@ async def test_payment_idempotency(db_session):
     )
 
     assert p1.id == p2.id
+
+
+@pytest.mark.asyncio
+async def test_auth_cache_invalidated_on_deactivation_commit():
+    from app.db.models.merchant import Merchant
+    from app.db.session import session_scope
+
+    async with session_scope() as db:
+        merchant, api_key = await MerchantService.create_merchant(
+            db=db,
+            name="Cached Merchant",
+            email=f"cached-{uuid.uuid4()}@test.com",
+        )
+
+    async with session_scope() as writer:
+        await MerchantService.deactivate_merchant(db=writer, merchant_id=merchant.id)
+
+        # A concurrent lookup between flush and commit still sees (and
+        # caches) the committed row
+        async with session_scope() as reader:
+            snapshot = await MerchantRepository.get_snapshot_by_api_key(reader, api_key)
+        assert snapshot.is_active is True
+
+    # The commit drops that entry
+    async with session_scope() as reader:
+        snapshot = await MerchantRepository.get_snapshot_by_api_key(reader, api_key)
+        assert snapshot.is_active is False
+        await reader.execute(delete(Merchant).where(Merchant.id == merchant.id))
+
+
+@pytest.mark.asyncio
+async def test_payment_idempotency_key_reused_with_different_payload(db_session):
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Conflict Merchant",
+        email="conflict@test.com",
+    )
+
+    payment = await PaymentService.create_payment(
+        db=db_session,
+        merchant=merchant,
+        request=PaymentCreateRequest(amount=Decimal("100.00"), currency="JPY"),
+        idempotency_key="idem-conflict",
+    )
+    await db_session.flush()
+
+    assert payment.created_at is not None
+
+    with pytest.raises(IdempotencyConflictError):
+        await PaymentService.create_payment(
+            db=db_session,
+            merchant=merchant,
+            request=PaymentCreateRequest(amount=Decimal("200.00"), currency="JPY"),
+            idempotency_key="idem-conflict",
+        )
+
+
+@pytest.mark.asyncio
+async def test_payment_replay_returns_original_response_body(db_session):
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Replay Merchant",
+        email="replay@test.com",
+    )
+    request = PaymentCreateRequest(amount=Decimal("700.00"), currency="JPY")
+
+    first = await PaymentService.create_payment_response(
+        db=db_session,
+        merchant=merchant,
+        request=request,
+        idempotency_key="idem-replay",
+    )
+    replay = await PaymentService.create_payment_response(
+        db=db_session,
+        merchant=merchant,
+        request=request,
+        idempotency_key="idem-replay",
+    )
+    cached = await PaymentService.create_payment_response(
+        db=db_session,
+        merchant=merchant,
+        request=request,
+        idempotency_key="idem-replay",
+    )
+
+    assert replay == first
+    assert cached == first
+    assert json.loads(first)["status"] == "CREATED"
+
+
+@pytest.mark.asyncio
+async def test_batch_payment_creation(db_session):
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Batch Merchant",
+        email="batch@test.com",
+        webhook_url="https://example.com/webhook",
+    )
+
+    existing = await PaymentService.create_payment(
+        db=db_session,
+        merchant=merchant,
+        request=PaymentCreateRequest(amount=Decimal("100.00"), currency="JPY"),
+        idempotency_key="batch-0",
+    )
+
+    items = [
+        PaymentBatchItem(idempotency_key="batch-0", amount=Decimal("100"), currency="JPY"),
+        PaymentBatchItem(idempotency_key="batch-1", amount=Decimal("200"), currency="JPY"),
+        PaymentBatchItem(idempotency_key="batch-2", amount=Decimal("300"), currency="USD"),
+        PaymentBatchItem(idempotency_key="batch-1", amount=Decimal("999"), currency="JPY"),
+    ]
+
+    body = await PaymentService.create_payments_batch(
+        db=db_session, merchant=merchant, items=items
+    )
+    results = json.loads(body)["results"]
+
+    assert [r["status"] for r in results] == [
+        "replayed",
+        "created",
+        "created",
+        "failed",
+    ]
+    assert results[0]["payment"]["id"] == str(existing.id)
+    assert results[2]["payment"]["currency"] == "USD"
+    assert results[3]["error"]["code"] == "IDEMPOTENCY_CONFLICT"
+
+    events = await db_session.execute(
+        select(WebhookEvent).where(WebhookEvent.merchant_id == merchant.id)
+    )
+    assert len(events.scalars().all()) == 3
+
+
+@pytest.mark.asyncio
+async def test_bulk_capture_and_refund(db_session):
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Settlement Merchant",
+        email="settlement@test.com",
+        webhook_url="https://example.com/webhook",
+    )
+
+    payments = []
+    for i in range(3):
+        payment = await PaymentService.create_payment(
+            db=db_session,
+            merchant=merchant,
+            request=PaymentCreateRequest(amount=Decimal("100"), currency="JPY"),
+            idempotency_key=f"settle-{i}",
+        )
+        payments.append(payment)
+    for payment in payments[:2]:
+        await PaymentService.authorize_payment(
+            db=db_session, merchant=merchant, payment_id=payment.id
+        )
+    await db_session.flush()
+
+    unknown = uuid.uuid4()
+    captured = await PaymentService.capture_payments_batch(
+        db=db_session,
+        merchant=merchant,
+        payment_ids=[payments[0].id, payments[1].id, payments[2].id, unknown],
+    )
+    results = captured["results"]
+    assert [r["status"] for r in results] == [
+        "captured",
+        "captured",
+        "failed",
+        "failed",
+    ]
+    assert results[2]["error"]["code"] == "INVALID_PAYMENT_STATE"
+    assert results[3]["error"]["code"] == "NOT_FOUND"
+
+    items = [
+        RefundBatchItem(payment_id=payments[0].id, amount=Decimal("100"), idempotency_key="r-0"),
+        RefundBatchItem(payment_id=payments[0].id, amount=Decimal("100"), idempotency_key="r-1"),
+        RefundBatchItem(payment_id=payments[1].id, amount=Decimal("50"), idempotency_key="r-2"),
+    ]
+    refunded = await RefundService.create_refunds_batch(
+        db=db_session, merchant=merchant, items=items
+    )
+    assert [r["status"] for r in refunded["results"]] == [
+        "created",
+        "failed",
+        "created",
+    ]
+
+    replayed = await RefundService.create_refunds_batch(
+        db=db_session, merchant=merchant, items=items[:1]
+    )
+    assert replayed["results"][0]["status"] == "replayed"
+    assert replayed["results"][0]["refund"].id == refunded["results"][0]["refund"].id
+
+    events = await db_session.execute(
+        select(WebhookEvent.event_type).where(
+            WebhookEvent.merchant_id == merchant.id
+        )
+    )
+    event_types = events.scalars().all()
+    assert event_types.count("payment.succeeded") == 2
+    assert event_types.count("payment.refunded") == 2
+
+
+@pytest.mark.asyncio
+async def test_refund_with_maximum_length_idempotency_key(db_session):
+    from app.db.models.idempotency import IdempotencyKey
+    from app.schemas.refund import RefundCreateRequest
+
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Long Key Merchant",
+        email="longkey@test.com",
+    )
+
+    payments = []
+    for i in range(2):
+        payment = await PaymentService.create_payment(
+            db=db_session,
+            merchant=merchant,
+            request=PaymentCreateRequest(amount=Decimal("100"), currency="JPY"),
+            idempotency_key=f"long-{i}",
+        )
+        await PaymentService.authorize_payment(
+            db=db_session, merchant=merchant, payment_id=payment.id
+        )
+        await PaymentService.capture_payment(
+            db=db_session, merchant=merchant, payment_id=payment.id
+        )
+        payments.append(payment)
+
+    single_key, batch_key = "s" * 255, "b" * 255
+    request = RefundCreateRequest(payment_id=payments[0].id, amount=Decimal("100"))
+    first = await RefundService.create_refund(
+        db=db_session, merchant=merchant, request=request, idempotency_key=single_key
+    )
+    replay = await RefundService.create_refund(
+        db=db_session, merchant=merchant, request=request, idempotency_key=single_key
+    )
+    assert replay.id == first.id
+
+    items = [
+        RefundBatchItem(
+            payment_id=payments[1].id, amount=Decimal("100"), idempotency_key=batch_key
+        )
+    ]
+    created = await RefundService.create_refunds_batch(
+        db=db_session, merchant=merchant, items=items
+    )
+    replayed = await RefundService.create_refunds_batch(
+        db=db_session, merchant=merchant, items=items
+    )
+    assert created["results"][0]["status"] == "created"
+    assert replayed["results"][0]["status"] == "replayed"
+
+    keys = (
+        await db_session.execute(
+            select(IdempotencyKey.key).where(
+                IdempotencyKey.merchant_id == merchant.id,
+                IdempotencyKey.key.startswith("refund:"),
+            )
+        )
+    ).scalars().all()
+    assert len(keys) == 2
+    assert all(len(key) <= 255 for key in keys)
+
+
+@pytest.mark.asyncio
+async def test_keyset_listing_and_stream(db_session):
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Listing Merchant",
+        email="listing@test.com",
+    )
+
+    created = set()
+    for i in range(5):
+        payment = await PaymentService.create_payment(
+            db=db_session,
+            merchant=merchant,
+            request=PaymentCreateRequest(
+                amount=Decimal("10"), currency="USD" if i % 2 else "JPY"
+            ),
+            idempotency_key=f"list-{i}",
+        )
+        created.add(payment.id)
+
+    seen = []
+    cursor = None
+    while True:
+        page = await PaymentService.list_payments(
+            db=db_session, merchant=merchant, limit=2, cursor=cursor
+        )
+        seen.extend(p.id for p in page["data"])
+        cursor = page["next_cursor"]
+        if not page["has_more"]:
+            break
+
+    assert len(seen) == 5
+    assert set(seen) == created
+
+    chunks = [
+        chunk
+        async for chunk in PaymentService.stream_payments_ndjson(
+            db=db_session, merchant=merchant, currency="JPY"
+        )
+    ]
+    lines = b"".join(chunks).splitlines()
+    assert len(lines) == 3
+    assert all(json.loads(line)["currency"] == "JPY" for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_listing_rejects_bad_cursor_and_status_before_streaming():
+    import httpx
+
+    from app.core.config import get_settings
+    from app.db.models.merchant import Merchant
+    from app.db.session import session_scope
+    from app.main import app
+
+    async with session_scope() as db:
+        merchant, api_key = await MerchantService.create_merchant(
+            db=db,
+            name="Bad Cursor Merchant",
+            email=f"bad-cursor-{uuid.uuid4()}@test.com",
+        )
+
+    headers = {get_settings().API_KEY_HEADER: api_key}
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        for format in ("json", "ndjson"):
+            response = await client.get(
+                "/api/v1/payments",
+                params={"format": format, "cursor": "zzz"},
+                headers=headers,
+            )
+            assert response.status_code == 400
+            assert response.json()["error"]["message"] == "Invalid cursor"
+
+        response = await client.get(
+            "/api/v1/payments", params={"status": "CAPTURD"}, headers=headers
+        )
+        assert response.status_code == 422
+
+        response = await client.get(
+            "/api/v1/payments", params={"status": "CAPTURED"}, headers=headers
+        )
+        assert response.status_code == 200
+        assert response.json()["data"] == []
+
+    async with session_scope() as db:
+        await db.execute(delete(Merchant).where(Merchant.id == merchant.id))
+
+
+@pytest.mark.asyncio
+async def test_simulation_engine_advances_scenarios(monkeypatch):
+    from app.db.session import session_scope
+    from app.workers import simulation_engine
+    from app.workers.simulation_engine import SimulationEngine
+
+    engine = SimulationEngine(batch_size=100, sweep_interval_seconds=30)
+    monkeypatch.setattr(simulation_engine, "_engine", engine)
+
+    async with session_scope() as db:
+        merchant, _ = await MerchantService.create_merchant(
+            db=db,
+            name="Simulated Merchant",
+            email=f"simulated-{uuid.uuid4()}@test.com",
+            webhook_url="https://example.com/webhook",
+        )
+        ok = await PaymentService.create_payment(
+            db=db,
+            merchant=merchant,
+            request=PaymentCreateRequest(
+                amount=Decimal("10.00"), currency="JPY", simulation="success"
+            ),
+            idempotency_key="sim-ok",
+        )
+        declined = await PaymentService.create_payment(
+            db=db,
+            merchant=merchant,
+            request=PaymentCreateRequest(
+                amount=Decimal("10.00"), currency="JPY", simulation="fraud_detected"
+            ),
+            idempotency_key="sim-fraud",
+        )
+        manual = await PaymentService.create_payment(
+            db=db,
+            merchant=merchant,
+            request=PaymentCreateRequest(amount=Decimal("10.00"), currency="JPY"),
+            idempotency_key="sim-none",
+        )
+        # Scheduled only once the transaction commits
+        assert len(engine) == 0
+
+    assert len(engine) == 2
+    assert manual.simulation_due_at is None
+
+    jobs = engine._pop_due(time.time() + 3600)
+    assert await SimulationEngine.apply(jobs) == 2
+    # Applying again (sweep, another process) is a no-op
+    assert await SimulationEngine.apply(jobs) == 0
+
+    async with session_scope() as db:
+        ok = await PaymentService.get_payment(db=db, merchant=merchant, payment_id=ok.id)
+        declined = await PaymentService.get_payment(
+            db=db, merchant=merchant, payment_id=declined.id
+        )
+        events = (
+            await db.execute(
+                select(WebhookEvent.event_type).where(
+                    WebhookEvent.merchant_id == merchant.id
+                )
+            )
+        ).scalars().all()
+
+    assert ok.status == "AUTHORIZED"
+    assert declined.status == "FAILED"
+    assert declined.failure_code == "fraud_detected"
+    assert declined.simulation_due_at is None
+    assert events.count("payment.failed") == 1
+
+    # Committed outbox rows would otherwise be claimed by other tests
+    async with session_scope() as db:
+        await db.execute(
+            delete(WebhookEvent).where(WebhookEvent.merchant_id == merchant.id)
+        )
+
+
+@pytest.mark.asyncio
+async def test_batch_endpoints_charge_rate_limit_per_item(monkeypatch):
+    import httpx
+
+    from app.core import rate_limiter
+    from app.core.config import get_settings
+    from app.db.models.merchant import Merchant
+    from app.db.session import session_scope
+    from app.main import app
+
+    class RecordingLimiter(rate_limiter.RateLimitBackend):
+        def __init__(self) -> None:
+            super().__init__(max_requests=100, window_seconds=60)
+            self.costs = []
+
+        async def hit(self, key: str, cost: int = 1) -> bool:
+            self.costs.append(cost)
+            return False
+
+    limiter = RecordingLimiter()
+    monkeypatch.setattr(rate_limiter, "_rate_limiter", limiter)
+
+    async with session_scope() as db:
+        merchant, api_key = await MerchantService.create_merchant(
+            db=db,
+            name="Batch Limit Merchant",
+            email=f"batch-limit-{uuid.uuid4()}@test.com",
+        )
+
+    headers = {get_settings().API_KEY_HEADER: api_key}
+    items = [
+        {"idempotency_key": f"limit-{i}", "amount": 100, "currency": "JPY"}
+        for i in range(4)
+    ]
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        batches = [
+            ("/api/v1/payments/batch", {"items": items}),
+            (
+                "/api/v1/payments/batch/capture",
+                {"payment_ids": [str(uuid.uuid4()) for _ in range(3)]},
+            ),
+            (
+                "/api/v1/refunds/batch",
+                {
+                    "items": [
+                        {
+                            "idempotency_key": f"limit-refund-{i}",
+                            "payment_id": str(uuid.uuid4()),
+                            "amount": 100,
+                        }
+                        for i in range(2)
+                    ]
+                },
+            ),
+        ]
+        for path, body in batches:
+            response = await client.post(path, json=body, headers=headers)
+            assert response.status_code == 429
+
+    assert limiter.costs == [4, 3, 2]
+
+    async with session_scope() as db:
+        await db.execute(delete(Merchant).where(Merchant.id == merchant.id))
@@ -1,10 +1,17 @@
+import csv
+import io
+import json
 import pytest
+from datetime import timedelta
 from decimal import Decimal
 
 from app.services.merchant_service import MerchantService
 from app.services.payment_service import PaymentService
+from app.services.webhook_export_service import WebhookExportService
 from app.schemas.payment import PaymentCreateRequest
 from app.db.models.webhook_event import WebhookEvent
+from app.repositories.webhook_event_repository import WebhookEventRepository
+from app.utils.time import utc_now
 from sqlalchemy import select
 
 
@@ -37,3 +44,477 @@ async def test_webhook_event_created(db_session):
 
     assert len(events) == 1
     assert events[0].event_type == "payment.created"
+
+    # Outbox mode: recorded in the request transaction, not yet delivered
+    assert events[0].delivered is False
+    assert events[0].attempt_count == 0
+
+
+@pytest.mark.asyncio
+async def test_webhook_claims_are_exclusive(db_session):
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Claim Merchant",
+        email="claim@test.com",
+        webhook_url="https://example.com/webhook",
+    )
+
+    for key in ("claim-1", "claim-2"):
+        await PaymentService.create_payment(
+            db=db_session,
+            merchant=merchant,
+            request=PaymentCreateRequest(amount=Decimal("10.00"), currency="JPY"),
+            idempotency_key=key,
+        )
+    await db_session.flush()
+
+    now = utc_now()
+    first = await WebhookEventRepository.claim_pending(
+        db_session, worker_id="worker-a", now=now, lease_seconds=60
+    )
+    second = await WebhookEventRepository.claim_pending(
+        db_session, worker_id="worker-b", now=now, lease_seconds=60
+    )
+
+    assert len(first) == 2
+    assert all(event.claimed_by == "worker-a" for event in first)
+    assert second == []
+
+    # Once the lease expires another worker may take over
+    later = now + timedelta(seconds=61)
+    reclaimed = await WebhookEventRepository.claim_pending(
+        db_session, worker_id="worker-b", now=later, lease_seconds=60
+    )
+    assert len(reclaimed) == 2
+
+
+@pytest.mark.asyncio
+async def test_webhook_history_export(db_session):
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Export Merchant",
+        email="export@test.com",
+        webhook_url="https://example.com/webhook",
+    )
+
+    for i in range(3):
+        await PaymentService.create_payment(
+            db=db_session,
+            merchant=merchant,
+            request=PaymentCreateRequest(amount=Decimal("10"), currency="JPY"),
+            idempotency_key=f"export-{i}",
+        )
+    await db_session.flush()
+
+    ndjson = b"".join(
+        [
+            chunk
+            async for chunk in WebhookExportService.stream(
+                db=db_session,
+                merchant_id=merchant.id,
+                event_type="payment.created",
+                delivered=False,
+            )
+        ]
+    )
+    events = [json.loads(line) for line in ndjson.splitlines()]
+    assert len(events) == 3
+    assert events[0]["payload"]["type"] == "payment.created"
+    assert events[0]["delivered"] is False
+
+    text = b"".join(
+        [
+            chunk
+            async for chunk in WebhookExportService.stream(
+                db=db_session, merchant_id=merchant.id, format="csv"
+            )
+        ]
+    ).decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert len(rows) == 3
+    assert rows[0]["event_type"] == "payment.created"
+
+
+@pytest.mark.asyncio
+async def test_retry_scheduler_fires_from_timer_wheel():
+    import asyncio
+    import uuid
+
+    from sqlalchemy import delete
+
+    from app.db.session import session_scope
+    from app.workers.retry_scheduler import WebhookRetryScheduler
+
+    async with session_scope() as db:
+        merchant, _ = await MerchantService.create_merchant(
+            db=db,
+            name="Retry Merchant",
+            email=f"retry-{uuid.uuid4()}@test.com",
+            webhook_url="http://127.0.0.1:9/webhook",
+        )
+        event = WebhookEvent(
+            merchant_id=merchant.id,
+            event_type="payment.created",
+            payload="{}",
+            target_url=merchant.webhook_url,
+            attempt_count=1,
+            delivered=False,
+            next_attempt_at=utc_now() + timedelta(milliseconds=300),
+        )
+        db.add(event)
+
+    async with session_scope() as db:
+        # Interval far longer than the test: only the wheel can fire it
+        task = asyncio.create_task(
+            WebhookRetryScheduler.run_forever(db, interval_seconds=3600)
+        )
+        await asyncio.sleep(1.0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async with session_scope() as db:
+        retried = await db.get(WebhookEvent, event.id)
+        assert retried.attempt_count == 2
+        assert retried.delivered is False
+        await db.execute(delete(WebhookEvent).where(WebhookEvent.id == event.id))
+
+
+@pytest.mark.asyncio
+async def test_batched_delivery_coalesces_per_endpoint(db_session, monkeypatch):
+    from app.workers import webhook_dispatcher
+    from app.workers.webhook_dispatcher import WebhookDispatcher
+
+    posts = []
+
+    class _Response:
+        status_code = 200
+
+    class _Pool:
+        async def post(self, url, content, headers):
+            posts.append((url, content, headers))
+            return _Response()
+
+    monkeypatch.setattr(webhook_dispatcher, "get_http_client_pool", lambda: _Pool())
+    monkeypatch.setattr(webhook_dispatcher.settings, "WEBHOOK_BATCH_MAX_EVENTS", 3)
+
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Batch Merchant",
+        email="batch@test.com",
+        webhook_url="https://example.com/webhook",
+    )
+    await MerchantService.set_webhook_batching(
+        db=db_session, merchant_id=merchant.id, enabled=True
+    )
+
+    events = [
+        WebhookEvent(
+            merchant_id=merchant.id,
+            event_type="payment.created",
+            payload=json.dumps({"n": n}),
+            target_url=merchant.webhook_url,
+            attempt_count=0,
+            delivered=False,
+            created_at=utc_now(),
+        )
+        for n in range(4)
+    ]
+    db_session.add_all(events)
+    await db_session.flush()
+
+    # A fresh partial group lingers; a full one does not
+    merchants = await WebhookDispatcher._merchant_settings(db_session, events)
+    assert WebhookDispatcher._lingering(events[:2], merchants, utc_now()) == events[:2]
+    assert WebhookDispatcher._lingering(events[:3], merchants, utc_now()) == []
+
+    await WebhookDispatcher.dispatch_many(db_session, events)
+
+    # Bounded by WEBHOOK_BATCH_MAX_EVENTS: 3 + 1
+    assert sorted(int(headers["X-Webhook-Batch-Size"]) for _, _, headers in posts) == [1, 3]
+    delivered = [item["n"] for _, body, _ in posts for item in json.loads(body)]
+    assert sorted(delivered) == [0, 1, 2, 3]
+
+    assert all(event.delivered and event.attempt_count == 1 for event in events)
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_defers_delivery(db_session, monkeypatch):
+    from app.core.circuit_breaker import CircuitBreaker
+    from app.workers import webhook_dispatcher
+    from app.workers.webhook_dispatcher import WebhookDispatcher
+
+    posts = []
+
+    class _Pool:
+        async def post(self, url, content, headers):
+            posts.append(url)
+            raise ConnectionError("connection refused")
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60, half_open_probes=1)
+    monkeypatch.setattr(webhook_dispatcher, "get_http_client_pool", lambda: _Pool())
+    monkeypatch.setattr(webhook_dispatcher, "get_circuit_breaker", lambda: breaker)
+
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Breaker Merchant",
+        email="breaker@test.com",
+        webhook_url="https://down.example.com/webhook",
+    )
+    events = [
+        WebhookEvent(
+            merchant_id=merchant.id,
+            event_type="payment.created",
+            payload="{}",
+            target_url=merchant.webhook_url,
+            attempt_count=0,
+            delivered=False,
+        )
+        for _ in range(3)
+    ]
+    db_session.add_all(events)
+
+    for event in events:
+        await WebhookDispatcher.dispatch(
+            db=db_session, event=event, webhook_secret=merchant.webhook_secret
+        )
+
+    # Two real failures open the circuit; the third never leaves the process
+    assert len(posts) == 2
+    assert [event.attempt_count for event in events] == [1, 1, 0]
+    short_circuited = events[2]
+    assert short_circuited.next_attempt_at >= utc_now() + timedelta(seconds=59)
+
+
+@pytest.mark.asyncio
+async def test_short_circuits_do_not_use_up_retries(db_session, monkeypatch):
+    from app.core.circuit_breaker import CircuitBreaker
+    from app.workers import webhook_dispatcher
+    from app.workers.webhook_dispatcher import WebhookDispatcher
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60, half_open_probes=1)
+    monkeypatch.setattr(webhook_dispatcher, "get_circuit_breaker", lambda: breaker)
+
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Deferred Merchant",
+        email="deferred@test.com",
+        webhook_url="https://down.example.com/webhook",
+    )
+    breaker.record_failure(breaker.host_of(merchant.webhook_url))
+
+    retrying = WebhookEvent(
+        merchant_id=merchant.id,
+        event_type="payment.created",
+        payload="{}",
+        target_url=merchant.webhook_url,
+        attempt_count=1,
+        delivered=False,
+    )
+    fresh = WebhookEvent(
+        merchant_id=merchant.id,
+        event_type="payment.created",
+        payload="{}",
+        target_url=merchant.webhook_url,
+        attempt_count=0,
+        delivered=False,
+        next_attempt_at=utc_now(),
+    )
+    db_session.add_all([retrying, fresh])
+    await db_session.flush()
+
+    for _ in range(webhook_dispatcher.settings.WEBHOOK_MAX_RETRIES + 2):
+        for event in (retrying, fresh):
+            await WebhookDispatcher.dispatch(
+                db=db_session, event=event, webhook_secret=merchant.webhook_secret
+            )
+    await db_session.flush()
+
+    assert (retrying.attempt_count, fresh.attempt_count) == (1, 0)
+
+    # Not claimable while deferred; once the circuit resets the first attempt
+    # goes back to the dispatcher and the retry to the retry scheduler
+    now = utc_now()
+    assert await WebhookEventRepository.claim_pending(
+        db_session, worker_id="w", now=now, lease_seconds=60
+    ) == []
+    later = now + timedelta(seconds=61)
+    assert await WebhookEventRepository.claim_pending(
+        db_session, worker_id="w", now=later, lease_seconds=60
+    ) == [fresh]
+    assert await WebhookEventRepository.claim_due(
+        db_session,
+        worker_id="w",
+        now=later,
+        lease_seconds=60,
+        max_attempts=webhook_dispatcher.settings.WEBHOOK_MAX_RETRIES,
+    ) == [retrying]
+
+
+@pytest.mark.asyncio
+async def test_slow_merchant_is_held_to_its_concurrency_cap(db_session, monkeypatch):
+    import asyncio
+
+    from app.workers import webhook_dispatcher
+    from app.workers.webhook_dispatcher import WebhookDispatcher
+
+    release = asyncio.Event()
+    in_flight = {"slow": 0, "fast": 0}
+    peak = {"slow": 0, "fast": 0, "total": 0}
+    fast_done = []
+
+    class _Response:
+        status_code = 200
+
+    class _Pool:
+        async def post(self, url, content, headers):
+            host = "slow" if "slow" in url else "fast"
+            in_flight[host] += 1
+            peak[host] = max(peak[host], in_flight[host])
+            peak["total"] = max(peak["total"], in_flight["slow"] + in_flight["fast"])
+            try:
+                if host == "slow":
+                    await release.wait()
+                else:
+                    await asyncio.sleep(0.01)
+                    fast_done.append(url)
+            finally:
+                in_flight[host] -= 1
+            return _Response()
+
+    monkeypatch.setattr(webhook_dispatcher, "get_http_client_pool", lambda: _Pool())
+    monkeypatch.setattr(webhook_dispatcher.settings, "WEBHOOK_DISPATCH_CONCURRENCY", 3)
+    monkeypatch.setattr(
+        webhook_dispatcher.settings, "WEBHOOK_DISPATCH_PER_MERCHANT_CONCURRENCY", 2
+    )
+
+    events = []
+    for name, count in (("slow", 6), ("fast", 5)):
+        merchant, _ = await MerchantService.create_merchant(
+            db=db_session,
+            name=f"{name} merchant",
+            email=f"{name}-concurrency@test.com",
+            webhook_url=f"https://{name}.example.com/webhook",
+        )
+        events += [
+            WebhookEvent(
+                merchant_id=merchant.id,
+                event_type="payment.created",
+                payload="{}",
+                target_url=merchant.webhook_url,
+                attempt_count=0,
+                delivered=False,
+            )
+            for _ in range(count)
+        ]
+    db_session.add_all(events)
+    await db_session.flush()
+
+    task = asyncio.create_task(WebhookDispatcher.dispatch_many(db_session, events))
+
+    # The fast merchant finishes while the slow one hangs on its own slots
+    for _ in range(200):
+        if len(fast_done) == 5:
+            break
+        await asyncio.sleep(0.01)
+    assert len(fast_done) == 5
+    assert in_flight["slow"] == peak["slow"] == 2
+    # The global cap leaves the fast merchant one slot
+    assert peak["fast"] == 1
+    assert peak["total"] == 3
+
+    release.set()
+    await task
+    assert all(event.delivered for event in events)
+
+
+@pytest.mark.asyncio
+async def test_inline_delivery_batches_for_opted_in_merchants(db_session, monkeypatch):
+    from app.services.webhook_service import WebhookService
+    from app.workers import webhook_dispatcher
+
+    posts = []
+
+    class _Response:
+        status_code = 200
+
+    class _Pool:
+        async def post(self, url, content, headers):
+            posts.append((content, headers))
+            return _Response()
+
+    monkeypatch.setattr(webhook_dispatcher, "get_http_client_pool", lambda: _Pool())
+    monkeypatch.setattr(webhook_dispatcher.settings, "WEBHOOK_DELIVERY_MODE", "inline")
+
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Inline Batch Merchant",
+        email="inline-batch@test.com",
+        webhook_url="https://example.com/webhook",
+    )
+    await MerchantService.set_webhook_batching(
+        db=db_session, merchant_id=merchant.id, enabled=True
+    )
+
+    await WebhookService.emit_events(
+        db=db_session,
+        merchant=merchant,
+        events=[("payment.captured", {"n": n}) for n in range(3)],
+    )
+    await WebhookService.emit_event(
+        db=db_session,
+        merchant=merchant,
+        event_type="payment.refunded",
+        payload={"n": 3},
+    )
+
+    # One array for the bulk call, an array of one for the single event
+    assert [headers["X-Webhook-Batch-Size"] for _, headers in posts] == ["3", "1"]
+    assert [len(json.loads(body)) for body, _ in posts] == [3, 1]
+
+
+@pytest.mark.asyncio
+async def test_events_of_missing_merchant_are_abandoned(db_session):
+    from app.workers import webhook_dispatcher
+    from app.workers.webhook_dispatcher import WebhookDispatcher
+
+    merchant, _ = await MerchantService.create_merchant(
+        db=db_session,
+        name="Orphan Merchant",
+        email="orphan@test.com",
+        webhook_url="https://example.com/webhook",
+    )
+    now = utc_now()
+    event = WebhookEvent(
+        merchant_id=merchant.id,
+        event_type="payment.created",
+        payload="{}",
+        target_url=merchant.webhook_url,
+        attempt_count=0,
+        delivered=False,
+        next_attempt_at=now,
+        claimed_by="w",
+        lease_expires_at=now + timedelta(seconds=60),
+    )
+    db_session.add(event)
+    await db_session.flush()
+
+    # As if the merchant row vanished between the claim and the lookup
+    await WebhookDispatcher.dispatch_many(db_session, [event], merchants={})
+    await db_session.flush()
+
+    max_retries = webhook_dispatcher.settings.WEBHOOK_MAX_RETRIES
+    assert event.claimed_by is None
+    assert event.attempt_count == max_retries
+    assert not event.delivered
+
+    later = now + timedelta(seconds=120)
+    assert await WebhookEventRepository.claim_pending(
+        db_session, worker_id="w", now=later, lease_seconds=60
+    ) == []
+    assert await WebhookEventRepository.claim_due(
+        db_session,
+        worker_id="w",
+        now=later,
+        lease_seconds=60,
+        max_attempts=max_retries,
+    ) == []
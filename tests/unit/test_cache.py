@@ -0,0 +1,57 @@
+from app.utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(max_size=10, ttl_seconds=30, clock=clock)
+
+    cache.set("key", "merchant")
+    assert cache.get("key") == "merchant"
+
+    clock.now = 31
+    assert cache.get("key") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl_seconds=30, clock=FakeClock())
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_cache_invalidate():
+    cache = TTLCache(max_size=10, ttl_seconds=30, clock=FakeClock())
+
+    cache.set("key", "merchant")
+    cache.invalidate("key")
+
+    assert cache.get("key") is None
+
+
+def test_ttl_cache_skips_stores_that_raced_an_invalidation():
+    cache = TTLCache(max_size=10, ttl_seconds=30, clock=FakeClock())
+
+    generation = cache.generation
+    cache.invalidate("key")  # e.g. a commit while the value was loading
+    cache.set("key", "stale", generation=generation)
+    assert cache.get("key") is None
+
+    cache.set("key", "fresh", generation=cache.generation)
+    assert cache.get("key") == "fresh"
@@ -0,0 +1,65 @@
+import pytest
+
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _breaker(clock):
+    return CircuitBreaker(
+        failure_threshold=3, reset_seconds=10, half_open_probes=1, clock=clock
+    )
+
+
+def test_opens_after_consecutive_failures_and_recovers_through_probe():
+    clock = _Clock()
+    breaker = _breaker(clock)
+    host = breaker.host_of("https://hooks.example.com/webhook")
+
+    for _ in range(2):
+        assert breaker.allow(host)
+        breaker.record_failure(host)
+    assert breaker.state(host) == CLOSED
+
+    breaker.record_failure(host)
+    assert breaker.state(host) == OPEN
+    assert not breaker.allow(host)
+    assert breaker.retry_in(host) == pytest.approx(10)
+
+    clock.now = 10
+    assert breaker.state(host) == HALF_OPEN
+    assert breaker.allow(host)
+    # Only one probe at a time
+    assert not breaker.allow(host)
+
+    breaker.record_success(host)
+    assert breaker.state(host) == CLOSED
+    assert breaker.states() == {}
+
+
+def test_failed_probe_reopens_and_success_resets_count():
+    clock = _Clock()
+    breaker = _breaker(clock)
+    host = "hooks.example.com:443"
+
+    breaker.record_failure(host)
+    breaker.record_failure(host)
+    breaker.record_success(host)
+    breaker.record_failure(host)
+    assert breaker.state(host) == CLOSED
+
+    for _ in range(2):
+        breaker.record_failure(host)
+    clock.now = 15
+    assert breaker.allow(host)
+    breaker.record_failure(host)
+
+    assert breaker.states() == {host: OPEN}
+    assert breaker.retry_in(host) == pytest.approx(10)
+    assert not breaker.allow(host)
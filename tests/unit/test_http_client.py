@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.http_client import HttpClientPool
+
+
+def _pool(handler, max_hosts: int = 10) -> HttpClientPool:
+    return HttpClientPool(
+        timeout_seconds=5,
+        max_connections_per_host=10,
+        max_keepalive_per_host=5,
+        keepalive_expiry_seconds=30,
+        max_hosts=max_hosts,
+        http2=False,
+        transport=httpx.MockTransport(handler),
+    )
+
+
+@pytest.mark.asyncio
+async def test_one_client_per_origin_and_hit_miss_counters():
+    connected = set()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        # Report a new connection the first time each origin is seen
+        origin = (request.url.host, request.url.port)
+        if origin not in connected:
+            connected.add(origin)
+            await request.extensions["trace"]("connection.connect_tcp.started", {})
+        return httpx.Response(200)
+
+    pool = _pool(handler)
+    for url in (
+        "https://a.example.com/hook",
+        "https://a.example.com/other",
+        "https://a.example.com:8443/hook",
+        "https://b.example.com/hook",
+    ):
+        response = await pool.post(url, content="{}", headers={})
+        assert response.status_code == 200
+
+    assert pool.stats.as_dict() == {
+        "hits": 1,
+        "misses": 3,
+        "clients_created": 3,
+        "clients_evicted": 0,
+    }
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_eviction_closes_least_recently_used_client():
+    pool = _pool(lambda request: httpx.Response(200), max_hosts=2)
+
+    for host in ("a", "b", "a", "c"):
+        await pool.post(f"https://{host}.example.com/hook", content="{}", headers={})
+
+    # b was least recently used when c arrived
+    assert pool.stats.clients_evicted == 1
+    assert sorted(pool._clients) == [
+        "https://a.example.com:",
+        "https://c.example.com:",
+    ]
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_evicted_client_finishes_in_flight_request_before_closing():
+    release = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "slow.example.com":
+            await release.wait()
+        return httpx.Response(200)
+
+    pool = _pool(handler, max_hosts=1)
+
+    slow = asyncio.create_task(
+        pool.post("https://slow.example.com/hook", content="{}", headers={})
+    )
+    await asyncio.sleep(0)
+    (slow_client,) = pool._clients.values()
+
+    # Evicts the slow origin's client while its request is in flight
+    await pool.post("https://fast.example.com/hook", content="{}", headers={})
+    assert pool.stats.clients_evicted == 1
+    assert not slow_client.is_closed
+
+    release.set()
+    assert (await slow).status_code == 200
+    assert slow_client.is_closed
+    await pool.close()
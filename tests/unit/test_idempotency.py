@@ -0,0 +1,69 @@
+import hashlib
+from datetime import timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from app.db.models.idempotency import IdempotencyKey
+from app.schemas.payment import PaymentCreateRequest
+from app.services.payment_service import PaymentService
+from app.utils.idempotency import canonical_json, hash_request_payload
+from app.utils.time import utc_now
+
+
+def test_hash_ignores_key_order_and_decimal_scale():
+    a = {"amount": Decimal("500"), "currency": "JPY"}
+    b = {"currency": "JPY", "amount": Decimal("500.00")}
+
+    assert hash_request_payload(a) == hash_request_payload(b)
+
+
+def test_hash_detects_payload_changes():
+    a = {"amount": Decimal("500"), "currency": "JPY"}
+    b = {"amount": Decimal("501"), "currency": "JPY"}
+
+    assert hash_request_payload(a) != hash_request_payload(b)
+
+
+def test_canonical_json_encoding():
+    payload = {
+        "payment_id": UUID("00000000-0000-0000-0000-000000000001"),
+        "amount": Decimal("10.50"),
+        "reason": None,
+    }
+
+    assert canonical_json(payload) == (
+        b'{"amount":"10.5","payment_id":"00000000-0000-0000-0000-000000000001",'
+        b'"reason":null}'
+    )
+
+
+
+def test_legacy_hash_matches_until_record_ages_out():
+    request = PaymentCreateRequest(amount=Decimal("10.00"), currency="JPY")
+    # Hash as stored by releases before canonical JSON
+    legacy_hash = hashlib.sha256(
+        str(
+            sorted(
+                {
+                    "amount": Decimal("10.00"),
+                    "currency": "JPY",
+                    "external_reference": None,
+                    "simulation": None,
+                }.items()
+            )
+        ).encode("utf-8")
+    ).hexdigest()
+    payload_hash = hash_request_payload(request.model_dump())
+
+    def record(age: timedelta) -> IdempotencyKey:
+        return IdempotencyKey(request_hash=legacy_hash, created_at=utc_now() - age)
+
+    assert PaymentService._hash_matches(record(timedelta(days=1)), payload_hash, request)
+    assert not PaymentService._hash_matches(
+        record(timedelta(days=365)), payload_hash, request
+    )
+
+    other = PaymentCreateRequest(amount=Decimal("11.00"), currency="JPY")
+    assert not PaymentService._hash_matches(
+        record(timedelta(days=1)), hash_request_payload(other.model_dump()), other
+    )
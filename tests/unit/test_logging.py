@@ -0,0 +1,30 @@
+import json
+import logging
+
+from app.core.logging import JsonFormatter, RequestLogSampler
+
+
+def _record(msg: str, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_emits_json_with_extras():
+    record = _record("application_error", error_code="NOT_FOUND", attempts=3)
+
+    payload = json.loads(JsonFormatter().format(record))
+
+    assert payload["message"] == "application_error"
+    assert payload["level"] == "INFO"
+    assert payload["error_code"] == "NOT_FOUND"
+    assert payload["attempts"] == 3
+    assert "msg" not in payload and "args" not in payload
+
+
+def test_request_log_sampler_keeps_errors():
+    sampler = RequestLogSampler(0.1, rand=lambda: 0.5)
+
+    assert sampler.filter(_record("request_completed", status_code=200)) is False
+    assert sampler.filter(_record("request_completed", status_code=503)) is True
+    assert sampler.filter(_record("webhook_dispatched")) is True
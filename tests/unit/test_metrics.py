@@ -0,0 +1,71 @@
+import pytest
+
+from app.core.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs", ("kind",))
+    registry.gauge("queue_depth", "Depth", callback=lambda: {(): 7})
+
+    counter.inc("a")
+    counter.inc("a")
+    counter.inc('b"q')
+
+    text = registry.render()
+    assert '# TYPE jobs_total counter' in text
+    assert 'jobs_total{kind="a"} 2' in text
+    assert 'jobs_total{kind="b\\"q"} 1' in text
+    assert "queue_depth 7" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/x")
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{route="/x",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/x",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/x"} 4' in lines
+    assert histogram.count("/x") == 4
+
+
+@pytest.mark.asyncio
+async def test_route_label_uses_the_matched_template():
+    import httpx
+
+    from app.core import metrics
+    from app.main import app
+
+    # The parameter value also appears earlier in the path
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        await client.get("/api/v1/payments/v1")
+
+    rendered = metrics.registry.render()
+    assert 'route="/api/v1/payments/{payment_id}"' in rendered
+    assert 'route="/api/{payment_id}' not in rendered
+
+
+@pytest.mark.asyncio
+async def test_metrics_backlog_count_is_cached(monkeypatch):
+    from app import main
+    from app.repositories.webhook_event_repository import WebhookEventRepository
+
+    calls = []
+
+    async def count_backlog(db, *, max_attempts):
+        calls.append(max_attempts)
+        return {"pending": 0, "retrying": 0}
+
+    monkeypatch.setattr(WebhookEventRepository, "count_backlog", count_backlog)
+    monkeypatch.setattr(main, "_backlog_refresh_at", 0.0)
+
+    for _ in range(3):
+        await main.metrics_endpoint()
+    assert len(calls) == 1
@@ -33,3 +33,29 @@ def test_invalid_capture_raises_error():
 
     with pytest.raises(ValueError):
         payment.capture()
+
+
+def test_transition_table_sources():
+    from app.domain.state_machine import FAIL, REFUND, InvalidTransitionError
+
+    assert FAIL.allows("CREATED")
+    assert FAIL.allows(PaymentStatus.AUTHORIZED)
+    assert not FAIL.allows("CAPTURED")
+    assert REFUND.source_values == ("CAPTURED",)
+
+    with pytest.raises(InvalidTransitionError):
+        REFUND.apply(PaymentStatus.REFUNDED)
+
+
+def test_captured_payment_cannot_fail():
+    payment = PaymentDomain(
+        id=uuid4(),
+        merchant_id=uuid4(),
+        amount=Decimal("100.00"),
+        currency="JPY",
+        status=PaymentStatus.CAPTURED,
+    )
+
+    with pytest.raises(ValueError):
+        payment.fail()
+    assert payment.status == PaymentStatus.CAPTURED
@@ -0,0 +1,154 @@
+import pytest
+
+from starlette.requests import Request
+
+from app.core.config import get_settings
+from app.core.rate_limiter import (
+    InMemoryGCRARateLimiter,
+    TokenBucketRateLimiter,
+    client_identifier,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_gcra_allows_limit_then_rejects():
+    limiter = InMemoryGCRARateLimiter(
+        max_requests=5, window_seconds=10, clock=FakeClock()
+    )
+
+    results = [await limiter.hit("merchant") for _ in range(6)]
+
+    assert results == [True] * 5 + [False]
+
+
+@pytest.mark.asyncio
+async def test_gcra_replenishes_gradually():
+    clock = FakeClock()
+    limiter = InMemoryGCRARateLimiter(max_requests=5, window_seconds=10, clock=clock)
+
+    for _ in range(5):
+        await limiter.hit("merchant")
+
+    # One emission interval (10s / 5) frees exactly one slot
+    clock.now += 2
+    assert await limiter.hit("merchant") is True
+    assert await limiter.hit("merchant") is False
+
+
+@pytest.mark.asyncio
+async def test_gcra_has_no_boundary_burst():
+    clock = FakeClock()
+    limiter = InMemoryGCRARateLimiter(max_requests=5, window_seconds=10, clock=clock)
+
+    for _ in range(5):
+        assert await limiter.hit("merchant") is True
+
+    # A fixed window would reset here and admit another full burst
+    clock.now += 5
+    allowed = [await limiter.hit("merchant") for _ in range(5)]
+    assert allowed.count(True) == 2
+
+
+@pytest.mark.asyncio
+async def test_gcra_keys_are_independent():
+    limiter = InMemoryGCRARateLimiter(
+        max_requests=1, window_seconds=10, clock=FakeClock()
+    )
+
+    assert await limiter.hit("a") is True
+    assert await limiter.hit("b") is True
+    assert await limiter.hit("a") is False
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_and_refills():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(max_requests=5, window_seconds=10, clock=clock)
+
+    results = [await limiter.hit("merchant") for _ in range(6)]
+    assert results == [True] * 5 + [False]
+
+    clock.now += 2
+    assert await limiter.hit("merchant") is True
+    assert await limiter.hit("merchant") is False
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_memory_is_bounded():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(
+        max_requests=5, window_seconds=10, max_keys=100, clock=clock
+    )
+
+    for i in range(1_000):
+        await limiter.hit(f"client-{i}")
+
+    assert len(limiter) == 100
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_drops_idle_keys():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(max_requests=5, window_seconds=10, clock=clock)
+
+    await limiter.hit("idle")
+    clock.now += 11
+    await limiter.hit("active")
+
+    assert len(limiter) == 1
+
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", [InMemoryGCRARateLimiter, TokenBucketRateLimiter])
+async def test_cost_is_charged_per_unit(backend):
+    clock = FakeClock()
+    limiter = backend(max_requests=5, window_seconds=10, clock=clock)
+
+    assert await limiter.hit("merchant", cost=3) is True
+    # Two units left: a batch of three no longer fits, two single hits do
+    assert await limiter.hit("merchant", cost=3) is False
+    assert await limiter.hit("merchant") is True
+    assert await limiter.hit("merchant") is True
+    assert await limiter.hit("merchant") is False
+
+    # A cost above the whole budget drains a full bucket instead of never fitting
+    clock.now += 10
+    assert await limiter.hit("merchant", cost=50) is True
+    assert await limiter.hit("merchant") is False
+
+
+@pytest.mark.asyncio
+async def test_gcra_full_budget_fits_despite_rounding():
+    limiter = InMemoryGCRARateLimiter(
+        max_requests=100, window_seconds=60, clock=FakeClock()
+    )
+
+    results = [await limiter.hit("merchant") for _ in range(101)]
+
+    assert results == [True] * 100 + [False]
+
+def test_client_identifier_never_contains_the_api_key():
+    api_key = "sk_test_" + "a" * 48
+    header = get_settings().API_KEY_HEADER.lower().encode()
+    request = Request(
+        {
+            "type": "http",
+            "headers": [(header, api_key.encode())],
+            "client": ("10.0.0.1", 1234),
+        }
+    )
+    anonymous = Request({"type": "http", "headers": [], "client": ("10.0.0.1", 1234)})
+
+    identifier = client_identifier(request)
+    assert api_key not in identifier
+    assert identifier == client_identifier(request)
+    assert client_identifier(anonymous) == "ip:10.0.0.1"
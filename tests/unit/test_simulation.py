@@ -0,0 +1,55 @@
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from app.domain.simulation import SimulationProfile
+from app.schemas.simulation import SimulationProfileSchema
+
+
+def _profile(**overrides) -> SimulationProfile:
+    data = {
+        "latency_p50_ms": 100,
+        "latency_p99_ms": 800,
+        "timeout_ms": 5_000,
+        "failure_rates": {"bank_error": 0.1, "fraud_detected": 0.05},
+        "seed": 42,
+    }
+    data.update(overrides)
+    return SimulationProfileSchema(**data).to_profile()
+
+
+def test_seeded_profile_is_reproducible_per_key():
+    profile = _profile()
+
+    first = [profile.plan(f"key-{n}") for n in range(200)]
+    second = [profile.plan(f"key-{n}") for n in reversed(range(200))][::-1]
+
+    assert first == second
+    assert _profile(seed=43).plan("key-0") != first[0]
+
+
+def test_latency_matches_percentile_targets():
+    profile = _profile()
+    rng = random.Random(1)
+
+    samples = sorted(profile.sample_latency_seconds(rng) for _ in range(20_000))
+
+    assert samples[10_000] == pytest.approx(0.1, rel=0.05)
+    assert samples[19_800] == pytest.approx(0.8, rel=0.15)
+
+
+def test_slow_responses_become_timeouts_and_explicit_scenarios_win():
+    profile = _profile(latency_p50_ms=1_000, latency_p99_ms=2_000, timeout_ms=10)
+
+    assert profile.plan("a") == ("network_timeout", 0.01)
+    assert profile.plan("a", "fraud_detected") == ("fraud_detected", 0.01)
+
+
+def test_failure_rates_are_validated():
+    with pytest.raises(ValidationError):
+        _profile(failure_rates={"bank_error": 0.7, "fraud_detected": 0.6})
+    with pytest.raises(ValidationError):
+        _profile(failure_rates={"success": 0.5})
+    with pytest.raises(ValidationError):
+        _profile(latency_p99_ms=50)
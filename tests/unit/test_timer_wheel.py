@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from app.workers.timer_wheel import TimerWheel
+
+
+def test_items_fire_once_no_earlier_than_their_deadline():
+    # Small wheel so the run crosses many cascades and the top-level range
+    wheel = TimerWheel(tick_seconds=0.01, slots=8, levels=2, now=100.0)
+    rng = random.Random(7)
+    deadlines = {n: 100.0 + rng.uniform(-1, 5) for n in range(2_000)}
+    for n, deadline in deadlines.items():
+        wheel.schedule(deadline, n)
+
+    fired = {}
+    now = 100.0
+    while now < 106.0:
+        now += rng.uniform(0, 0.05)
+        for n in wheel.advance(now):
+            assert n not in fired
+            fired[n] = now
+
+    assert len(wheel) == 0
+    assert fired.keys() == deadlines.keys()
+    for n, deadline in deadlines.items():
+        assert deadline - 1e-9 <= fired[n] <= max(deadline, 100.0) + 0.06
+
+
+def test_advance_limit_and_next_deadline():
+    wheel = TimerWheel(tick_seconds=1, slots=4, levels=2, now=0)
+    assert wheel.next_deadline() is None
+
+    for n in range(5):
+        wheel.schedule(2, f"a{n}")
+    wheel.schedule(3, "b")
+
+    assert wheel.next_deadline() == 2
+    assert sorted(wheel.advance(10, limit=2)) == ["a0", "a1", "a2", "a3", "a4"]
+    assert wheel.advance(10) == ["b"]
+
+
+def test_deadline_past_top_level_waits_for_it():
+    # Two levels of 4 one-second slots cover 15 ticks
+    wheel = TimerWheel(tick_seconds=1, slots=4, levels=2, now=0)
+    wheel.schedule(100, "far")
+
+    for now in range(1, 100):
+        assert wheel.advance(now) == []
+    assert wheel.advance(100) == ["far"]
+    assert len(wheel) == 0
+
+
+def test_single_level_wheel_is_rejected():
+    with pytest.raises(ValueError):
+        TimerWheel(levels=1)
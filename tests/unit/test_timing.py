@@ -0,0 +1,32 @@
+import contextvars
+
+from app.core import timing
+
+
+def test_phases_are_ignored_outside_a_request():
+    def run():
+        with timing.phase("db"):
+            pass
+        timing.record("auth", 1.0)
+        return timing._phases.get()
+
+    assert contextvars.Context().run(run) is None
+
+
+def test_phases_accumulate_and_format_in_order():
+    def run():
+        phases = timing.start_request()
+        timing.record("webhook", 0.002)
+        timing.record("db", 0.001)
+        timing.record("db", 0.0005)
+        with timing.phase("serialization"):
+            pass
+        return phases
+
+    phases = contextvars.Context().run(run)
+    header = timing.server_timing_header(phases, 0.01)
+
+    names = [part.split(";")[0] for part in header.split(", ")]
+    assert names == ["db", "serialization", "webhook", "total"]
+    assert header.startswith("db;dur=1.50, ")
+    assert header.endswith("webhook;dur=2.00, total;dur=10.00")
@@ -0,0 +1,37 @@
+import pytest
+
+from app.core import tracing
+
+
+class _CollectingExporter:
+    def __init__(self):
+        self.traces = []
+
+    def submit(self, spans):
+        self.traces.append(spans)
+
+
+def test_span_is_noop_when_disabled():
+    assert tracing.span("anything") is tracing._NOOP_SPAN
+
+
+def test_child_spans_are_exported_with_root(monkeypatch):
+    exporter = _CollectingExporter()
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+
+    trace_id = tracing.trace_id_from_request_id("5f0c6a0e-8a9e-4a7e-9d43-2a3c1f6f0b11")
+    with tracing.span("root", trace_id=trace_id) as root:
+        with tracing.span("child", table="payments"):
+            pass
+        with pytest.raises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError("boom")
+
+    [spans] = exporter.traces
+    assert [s.name for s in spans] == ["child", "failing", "root"]
+    assert {s.trace_id for s in spans} == {"5f0c6a0e8a9e4a7e9d432a3c1f6f0b11"}
+    assert spans[0].parent_id == root.span_id
+    assert spans[1].to_otlp()["status"]["code"] == 2
+    assert spans[0].to_otlp()["attributes"] == [
+        {"key": "table", "value": {"stringValue": "payments"}}
+    ]